@@ -1,21 +1,59 @@
+import asyncio
+import uuid
 from abc import ABC, abstractmethod
 from collections import namedtuple
+from concurrent.futures import as_completed, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from decimal import Decimal
-from typing import List, Optional, Tuple
+from functools import partial
+from threading import Lock, RLock
+from time import perf_counter, sleep
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING, TypeVar
 
-from binance.client import Client
+from binance.exceptions import BinanceAPIException
 
+from automation.api.rate_limiter import RateLimiter
+from automation.api.resilience import CircuitBreaker, is_transient
 from automation.functions import parse_decimal
 from automation.order import Order
 
+if TYPE_CHECKING:
+    from binance.client import Client
+
 SymbolInfo = namedtuple('SymbolInfo', 'quantity_precision, price_precision, min_notional')
+ExchangeSymbol = namedtuple('ExchangeSymbol', 'symbol, base, quote, info')
+T = TypeVar('T')
 
 
 class Api(ABC):
     _STOP_PRICE_CORRECTION = Decimal(0.5) / 100  # 0.5%
 
-    def __init__(self, client: Client) -> None:
-        self._client: Client = client
+    _UNKNOWN_ORDER_CODES = (-2011, -2013)
+    _STATUS_TRADING = 'TRADING'
+    _MAX_RETRIES = 2
+    _RETRY_DELAY = 0.2  # seconds, doubled after every attempt
+    _HEDGE_AFTER = 0.3  # seconds
+
+    def __init__(self, client: 'Client', rate_limiter: RateLimiter) -> None:
+        self._client: 'Client' = client
+        self._rate_limiter: RateLimiter = rate_limiter
+        self._circuits: Dict[str, CircuitBreaker] = {}
+        self._hedge_executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='hedge')
+        self.hedged: int = 0
+        self._prefetch_executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='prefetch')
+        self._stop_loss_executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=2,
+                                                                          thread_name_prefix='stop_loss')
+        self._prefetched: Dict[str, Tuple[float, Dict[str, Future]]] = {}  # start time and lookups by symbol
+        self.prefetch_enabled: bool = True
+        self._symbol_locks: Dict[str, RLock] = {}
+        self._symbol_locks_lock: Lock = Lock()
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self._rate_limiter
+
+    @property
+    def circuit_states(self) -> Dict[str, str]:
+        return {name: circuit.state for name, circuit in self._circuits.items()}
 
     @abstractmethod
     def market_buy(self, symbol: str, amount: Decimal) -> Order:
@@ -33,6 +71,28 @@ class Api(ABC):
     def oco_sell(self, symbol: str, quantity: Decimal, targets: List[Decimal], stop_loss: Decimal) -> None:
         pass
 
+    @abstractmethod
+    def replace_stop_loss(self, symbol: str, stop_loss: Decimal) -> None:
+        pass
+
+    @abstractmethod
+    def get_target_orders(self, symbol: str) -> List[Order]:
+        pass
+
+    @abstractmethod
+    def cancel_target_orders(self, symbol: str, orders: List[Order]) -> Decimal:
+        pass
+
+    @abstractmethod
+    def resize_target_orders(self, symbol: str, fraction: Decimal) -> Decimal:
+        # target orders are created again for quantity remaining after fraction is sold, returns quantity to sell
+        pass
+
+    @abstractmethod
+    def cancel_limit_buy(self, symbol: str, order_id: int) -> Optional[Decimal]:
+        # returns filled quantity, None = order is not open and its fill is received from user data stream
+        pass
+
     @abstractmethod
     def get_symbol_info(self, symbol: str) -> SymbolInfo:
         pass
@@ -41,10 +101,56 @@ class Api(ABC):
     def get_sell_order_pnl(self, sell_order: Order) -> Optional[Decimal]:
         pass
 
+    @property
+    def async_market_orders(self) -> bool:
+        # market orders waiting for market data are executed by market_buy_async and market_sell_async as task
+        return False
+
+    async def market_buy_async(self, symbol: str, amount: Decimal) -> Order:
+        return self.market_buy(symbol, amount)
+
+    async def market_sell_async(self, symbol: str, quantity: Decimal) -> Order:
+        return self.market_sell(symbol, quantity)
+
+    async def replace_stop_loss_async(self, symbol: str, stop_loss: Decimal) -> None:
+        # orders are replaced in thread, so event loop keeps processing messages and market data
+        await asyncio.get_event_loop().run_in_executor(self._stop_loss_executor, self.replace_stop_loss, symbol,
+                                                       stop_loss)
+
+    def watch_depth(self, symbol: str) -> None:
+        pass  # order book is streamed only for depth aware execution
+
+    def unwatch_depth(self, symbol: str) -> None:
+        pass
+
     def get_current_price(self, symbol: str) -> Decimal:
-        info = self._client.get_symbol_ticker(symbol=symbol)
+        # price of accepted signal is hedged only when it was not prefetched
+        return self._get_prefetched(symbol, 'price', partial(self._fetch_current_price, hedge=True))
 
-        return parse_decimal(info['price'])
+    def prefetch(self, symbol: str) -> None:
+        # symbol lookups needed for buy are sent concurrently, methods using them wait only for their own result
+        if self.prefetch_enabled:
+            self._prefetched[symbol] = (perf_counter(), {
+                name: self._prefetch_executor.submit(self._timed_call, method, symbol)
+                for name, method in self._get_prefetch_methods(symbol).items()
+            })
+
+    def finish_prefetch(self, symbol: str) -> Dict[str, float]:
+        # returns time of lookups sent one by one compared to time of concurrent lookups
+        if symbol not in self._prefetched:
+            return {}
+
+        started_at, futures = self._prefetched.pop(symbol)
+        results = [future.result() for future in futures.values() if future.done() and future.exception() is None]
+
+        if len(results) == 0:
+            return {}
+
+        sequential = sum(duration for _, duration, _ in results)
+        concurrent = max(finished_at for _, _, finished_at in results) - started_at
+
+        return dict(sequential_ms=sequential * 1000, concurrent_ms=concurrent * 1000,
+                    saved_ms=(sequential - concurrent) * 1000)
 
     def check_min_notional(self, symbol: str, buy_price: Decimal, amount: Decimal,
                            targets: List[Decimal], stop_loss: Decimal, futures: bool) -> None:
@@ -75,6 +181,140 @@ class Api(ABC):
 
         return target_amounts, stop_loss_amount
 
+    def _fetch_current_price(self, symbol: str, hedge: bool = False) -> Decimal:
+        info = self._request(RateLimiter.PRIORITY_ENTRY, self._client.get_symbol_ticker, hedge=hedge, symbol=symbol)
+
+        return parse_decimal(info['price'])
+
+    def _get_prefetch_methods(self, symbol: str) -> Dict[str, Callable[[str], Any]]:
+        return {'price': self._fetch_current_price}
+
+    def _get_prefetched(self, symbol: str, name: str, method: Callable[[str], T]) -> T:
+        future = self._prefetched[symbol][1].get(name) if symbol in self._prefetched else None
+
+        if future is not None:
+            try:
+                return future.result()[0]
+            except Exception:
+                pass  # failed lookup is sent again, so its error is raised from regular request
+
+        return method(symbol)
+
+    @staticmethod
+    def _timed_call(method: Callable[[str], Any], symbol: str) -> Tuple[Any, float, float]:
+        start = perf_counter()
+        result = method(symbol)
+        finished_at = perf_counter()
+
+        return result, finished_at - start, finished_at
+
+    def _request(self, priority: int, method: Callable[..., Any], weight: int = 1, orders: int = 0,
+                 client_order_id_key: Optional[str] = None, hedge: bool = False, retry: bool = True,
+                 cancel: bool = False, **kwargs: Any) -> Any:
+        # orders are retried only with client order id, so exchange can tell whether first attempt was executed,
+        # cancel of order by id can be repeated, unknown order after failed attempt means that it was executed
+        # and None is returned, requests which are not safe to repeat are sent with retry False
+        circuit = self._get_circuit(method.__name__)
+
+        if priority != RateLimiter.PRIORITY_PROTECTIVE:
+            circuit.check()  # protective orders are always tried
+
+        if client_order_id_key is not None:
+            kwargs[client_order_id_key] = self._new_client_order_id()
+
+        for attempt in range(self._MAX_RETRIES + 1):
+            try:
+                if hedge:
+                    result = self._hedged_call(priority, method, weight, kwargs)
+                else:
+                    result = self._call(priority, method, weight, orders, kwargs)
+            except Exception as e:
+                if cancel and attempt != 0 and isinstance(e, BinanceAPIException):
+                    if e.code in self._UNKNOWN_ORDER_CODES:
+                        circuit.record_success()
+
+                        return None
+
+                if not is_transient(e):
+                    raise
+
+                circuit.record_failure()
+
+                if attempt == self._MAX_RETRIES or not retry or (orders != 0 and client_order_id_key is None):
+                    raise
+
+                sleep(self._RETRY_DELAY * 2 ** attempt)
+
+                if client_order_id_key is not None:
+                    existing = self._get_order_by_client_order_id(kwargs['symbol'], kwargs[client_order_id_key],
+                                                                  client_order_id_key)
+
+                    if existing is not None:
+                        return existing
+            else:
+                circuit.record_success()
+
+                return result
+
+        raise Exception('Unreachable')
+
+    def _call(self, priority: int, method: Callable[..., Any], weight: int, orders: int,
+              kwargs: Dict[str, Any]) -> Any:
+        self._rate_limiter.acquire(priority, weight, orders)
+
+        try:
+            return method(**kwargs)
+        finally:
+            # response of this thread, client is shared by hedged and prefetched requests
+            pop_response = getattr(self._client, 'pop_response', None)
+            self._rate_limiter.update(pop_response() if pop_response is not None else None)
+
+    def _hedged_call(self, priority: int, method: Callable[..., Any], weight: int, kwargs: Dict[str, Any]) -> Any:
+        # read only request is sent once more when it is slow, faster response wins
+        first = self._hedge_executor.submit(self._call, priority, method, weight, 0, kwargs)
+
+        try:
+            return first.result(timeout=self._HEDGE_AFTER)
+        except FutureTimeoutError:
+            pass
+
+        self.hedged += 1
+        second = self._hedge_executor.submit(self._call, priority, method, weight, 0, kwargs)
+        error: Optional[BaseException] = None
+
+        for future in as_completed((first, second)):
+            error = future.exception()
+
+            if error is None:
+                return future.result()
+
+        assert error is not None
+        raise error
+
+    def _get_order_by_client_order_id(self, symbol: str, client_order_id: str,
+                                      client_order_id_key: str) -> Optional[Dict[str, Any]]:
+        # order created by failed request, it is returned instead of sending order again
+        return None
+
+    def _lock_symbol(self, symbol: str) -> RLock:
+        # sell orders of symbol are changed by one thread at once, stop loss is moved in thread while sell signals
+        # cancel the same orders on event loop, which waits until running replacement is finished
+        with self._symbol_locks_lock:
+            if symbol not in self._symbol_locks:
+                self._symbol_locks[symbol] = RLock()
+
+            return self._symbol_locks[symbol]
+
+    def _get_circuit(self, name: str) -> CircuitBreaker:
+        if name not in self._circuits:
+            self._circuits[name] = CircuitBreaker(name)
+
+        return self._circuits[name]
+
+    @staticmethod
+    def _new_client_order_id() -> str:
+        return uuid.uuid4().hex
+
     @classmethod
     def _get_target_quantities(cls, total_quantity: Decimal, targets_count: int, quantity_precision: int,
                                ) -> List[Decimal]:
@@ -0,0 +1,202 @@
+import asyncio
+from decimal import Decimal, ROUND_DOWN
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING, TypeVar
+
+from automation.api.rate_limiter import RateLimiter
+from automation.api.spot_api import SpotApi
+from automation.depth_cache import DepthCache, DepthCacheManager, PriceLevel
+from automation.functions import parse_decimal
+from automation.logger import Logger
+from automation.order import Order
+
+if TYPE_CHECKING:
+    from binance.client import Client
+
+T = TypeVar('T')
+
+
+class DepthSpotApi(SpotApi):
+    # market orders run as event loop task, so order book stream is applied between slices
+    _SLICE_DELAY = 0.2  # seconds, time for order book to refill
+    _DEPTH_TIMEOUT = 1  # seconds, order is sent without order book when it is not received in time
+
+    def __init__(self, client: 'Client', start_depth_socket: Callable[[str, Callable[[Dict[str, Any]], None]], str],
+                 stop_socket: Callable[[str], None], max_slippage: Decimal, max_slices: int, logger: Logger) -> None:
+        super().__init__(client)
+        self._depth_caches: DepthCacheManager = DepthCacheManager(self._get_order_book, start_depth_socket,
+                                                                  stop_socket)
+        self._max_slippage: Decimal = max_slippage / 100
+        self._max_slices: int = max_slices
+        self._logger: Logger = logger
+
+    @property
+    def async_market_orders(self) -> bool:
+        return True
+
+    def prefetch(self, symbol: str) -> None:
+        # order book is streamed while other lookups of accepted buy signal are sent
+        self._depth_caches.watch(symbol)
+        super().prefetch(symbol)
+
+    def watch_depth(self, symbol: str) -> None:
+        self._depth_caches.watch(symbol)
+
+    def unwatch_depth(self, symbol: str) -> None:
+        self._depth_caches.unwatch(symbol)
+
+    async def market_buy_async(self, symbol: str, amount: Decimal) -> Order:
+        cache = await self._wait_depth(symbol)
+
+        if cache is None:
+            return await self._run(self.market_buy, symbol, amount)
+
+        min_notional = self.get_symbol_info(symbol).min_notional
+        fills: List[Order] = []
+        remaining = amount
+
+        for i in range(self._max_slices):
+            if remaining < min_notional:
+                break
+
+            if i != 0:
+                await asyncio.sleep(self._SLICE_DELAY)  # order book and other messages are processed meanwhile
+
+            fill = await self._limit_slice(cache, Order.SIDE_BUY, remaining)
+
+            if fill is None:
+                break
+
+            fills.append(fill)
+            remaining -= fill.price * fill.quantity
+
+        if remaining >= min_notional or len(fills) == 0:
+            # amount not filled within slippage is bought anyway, so targets get quantity checked before buy
+            fills.append(await self._run(self.market_buy, symbol, remaining))
+
+        return self._merge_fills(fills)
+
+    async def market_sell_async(self, symbol: str, quantity: Decimal) -> Order:
+        cache = await self._wait_depth(symbol)
+        min_notional = self.get_symbol_info(symbol).min_notional
+        fills: List[Order] = []
+        remaining = quantity
+
+        for i in range(self._max_slices if cache is not None else 0):
+            assert cache is not None
+
+            if i != 0:
+                await asyncio.sleep(self._SLICE_DELAY)
+
+            fill = await self._limit_slice(cache, Order.SIDE_SELL, remaining)
+
+            if fill is None:
+                break
+
+            fills.append(fill)
+            remaining -= fill.quantity
+
+            if remaining == Decimal(0):
+                break
+
+        if len(fills) != 0 and remaining * fills[-1].price < min_notional:
+            # exchange rejects remainder below min notional, it is left after most of position is sold
+            if remaining != Decimal(0):
+                self._logger.log_event('depth_dust', symbol=symbol, quantity=remaining)
+        else:
+            # rest of position must be sold anyway
+            fills.append(await self._run(self.market_sell, symbol, remaining))
+
+        return self._merge_fills(fills)
+
+    async def _wait_depth(self, symbol: str) -> Optional[DepthCache]:
+        cache = await self._depth_caches.wait(symbol, self._DEPTH_TIMEOUT)
+
+        if cache is None:
+            self._logger.log_event('depth_fallback', symbol=symbol, timeout=self._DEPTH_TIMEOUT)
+
+        return cache
+
+    async def _limit_slice(self, cache: DepthCache, side: str, remaining: Decimal) -> Optional[Order]:
+        buy = side == Order.SIDE_BUY
+        levels = cache.get_asks() if buy else cache.get_bids()
+
+        if len(levels) == 0:
+            return None
+
+        best_price = levels[0][0]
+        worst_price = best_price * (1 + self._max_slippage if buy else 1 - self._max_slippage)
+        price, available = self._get_available(levels, worst_price, remaining, buy)
+        symbol_info = self.get_symbol_info(cache.symbol)
+        quantity = self._round_down(min(remaining, available) / price if buy else min(remaining, available),
+                                    symbol_info.quantity_precision)
+
+        if quantity == Decimal(0) or quantity * price < symbol_info.min_notional:
+            return None
+
+        # marketable limit order takes liquidity up to given price, rest is expired
+        info = await self._run(partial(
+            self._request,
+            RateLimiter.PRIORITY_ENTRY if buy else RateLimiter.PRIORITY_PROTECTIVE,
+            self._client.create_order,
+            orders=1,
+            client_order_id_key='newClientOrderId',
+            symbol=cache.symbol,
+            side=side,
+            type=Order.TYPE_LIMIT,
+            timeInForce=Order.TIME_IN_FORCE_IOC,
+            quantity=quantity,
+            price=price,
+        ))
+        executed_quantity = parse_decimal(info['executedQty'])
+
+        if executed_quantity == Decimal(0):
+            return None
+
+        fill_price = parse_decimal(info['cummulativeQuoteQty']) / executed_quantity
+        slippage = (fill_price - best_price) / best_price * (1 if buy else -1)
+        self._logger.log_event('depth_fill', symbol=cache.symbol, side=side, best_price=best_price,
+                               limit_price=price, price=fill_price, quantity=executed_quantity,
+                               slippage_percent=round(slippage * 100, 4))
+
+        return Order.from_dict(info, price=fill_price, quantity_key='executedQty')
+
+    @staticmethod
+    async def _run(method: Callable[..., T], *args: Any) -> T:
+        # requests of order task are sent from thread, so event loop keeps applying order book meanwhile
+        return await asyncio.get_event_loop().run_in_executor(None, method, *args)
+
+    @staticmethod
+    def _get_available(levels: List[PriceLevel], worst_price: Decimal, remaining: Decimal,
+                       buy: bool) -> Tuple[Decimal, Decimal]:
+        # returns limit price and available amount (buy) or quantity (sell) up to worst price
+        price, available = levels[0][0], Decimal(0)
+
+        for level_price, level_quantity in levels:
+            if (level_price > worst_price) if buy else (level_price < worst_price):
+                break
+
+            price = level_price
+            available += level_price * level_quantity if buy else level_quantity
+
+            if available >= remaining:
+                break
+
+        return price, available
+
+    @staticmethod
+    def _round_down(num: Decimal, precision: int) -> Decimal:
+        return num.quantize(Decimal(10) ** -precision, rounding=ROUND_DOWN)
+
+    @staticmethod
+    def _merge_fills(fills: List[Order]) -> Order:
+        quantity = sum((fill.quantity for fill in fills), Decimal(0))
+        price = sum((fill.price * fill.quantity for fill in fills), Decimal(0)) / quantity
+        last = fills[-1]
+
+        return Order(last.symbol, last.side, Order.TYPE_MARKET, Order.STATUS_FILLED, last.order_id, None, quantity,
+                     price)
+
+    def _get_order_book(self, symbol: str) -> Dict[str, Any]:
+        return self._request(RateLimiter.PRIORITY_INFO, self._client.get_order_book, weight=10, symbol=symbol,
+                             limit=1000)
@@ -1,24 +1,32 @@
 from decimal import Decimal
 from time import sleep
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING
 
-from binance.client import Client
 from binance.exceptions import BinanceAPIException
 
-from automation.api.api import Api, SymbolInfo
+from automation.api.api import Api, ExchangeSymbol, SymbolInfo
+from automation.api.rate_limiter import RateLimiter
 from automation.functions import parse_decimal
 from automation.order import Order
 
+if TYPE_CHECKING:
+    from binance.client import Client
+
 
 class FuturesApi(Api):
     MARGIN_TYPE_ISOLATED = 'ISOLATED'
     MARGIN_TYPE_CROSS = 'CROSS'
 
     _NO_NEED_TO_CHANGE_MARGIN = -4046
+    _WEIGHT_LIMIT = 2400
+    _ORDER_LIMIT = 1200
+    _ORDER_INTERVAL = 60  # seconds
+    _BATCH_SIZE = 10  # max orders in one batch request
 
-    def __init__(self, margin_type: str, *args, **kwargs) -> None:
+    def __init__(self, margin_type: str, client: 'Client') -> None:
         assert margin_type in (self.MARGIN_TYPE_ISOLATED, self.MARGIN_TYPE_CROSS)
-        super().__init__(*args, **kwargs)
+        super().__init__(client, RateLimiter(self._WEIGHT_LIMIT, self._ORDER_LIMIT, self._ORDER_INTERVAL,
+                                             'X-MBX-ORDER-COUNT-1M'))
         self._margin_type: str = margin_type
         self._leverage: Optional[int] = None
         self.__symbol_infos: Dict[str, SymbolInfo] = {}
@@ -37,13 +45,35 @@ class FuturesApi(Api):
     def is_futures_symbol(self, symbol: str) -> bool:
         return symbol in self._symbol_infos.keys()
 
+    def get_exchange_symbols(self) -> List[ExchangeSymbol]:
+        all_info = self._request(RateLimiter.PRIORITY_ENTRY, self._client.futures_exchange_info)
+        symbols = []
+
+        for info in all_info['symbols']:
+            # delivery contracts and symbols which are not trading have no usable filters
+            min_notionals = [parse_decimal(f['notional']) for f in info['filters'] if f['filterType'] == 'MIN_NOTIONAL']
+
+            if info['status'] != self._STATUS_TRADING or len(min_notionals) == 0:
+                continue
+
+            min_notional = min_notionals[0]
+            symbol_info = SymbolInfo(int(info['quantityPrecision']), int(info['pricePrecision']), min_notional)
+            self.__symbol_infos[info['symbol']] = symbol_info
+            symbols.append(ExchangeSymbol(info['symbol'], info['baseAsset'], info['quoteAsset'], symbol_info))
+
+        return symbols
+
     def market_buy(self, symbol: str, amount: Decimal) -> Order:
-        self._check_is_empty(symbol)
+        self._get_prefetched(symbol, 'empty', self._check_is_empty)
         self._set_futures_settings(symbol, self.leverage)
         symbol_info = self.get_symbol_info(symbol)
         price = self.get_current_price(symbol)
         quantity = self._round(amount / price, symbol_info.quantity_precision)
-        info = self._client.futures_create_order(
+        info = self._request(
+            RateLimiter.PRIORITY_ENTRY,
+            self._client.futures_create_order,
+            orders=1,
+            client_order_id_key='newClientOrderId',
             side=Order.SIDE_BUY,
             type=Order.TYPE_MARKET,
             symbol=symbol,
@@ -52,7 +82,8 @@ class FuturesApi(Api):
 
         if info['status'] != Order.STATUS_FILLED:
             sleep(1)
-            info = self._client.futures_get_order(symbol=info['symbol'], orderId=info['orderId'])
+            info = self._request(RateLimiter.PRIORITY_ENTRY, self._client.futures_get_order,
+                                 symbol=info['symbol'], orderId=info['orderId'])
 
         order = Order.from_dict(info, quantity_key='executedQty', price_key='avgPrice', futures=True)
         assert order.status == Order.STATUS_FILLED, f'Got {order.status} status'
@@ -60,17 +91,21 @@ class FuturesApi(Api):
         return order
 
     def limit_buy(self, symbol: str, price: Decimal, amount: Decimal) -> Order:
-        self._check_is_empty(symbol)
+        self._get_prefetched(symbol, 'empty', self._check_is_empty)
         self._set_futures_settings(symbol, self.leverage)
         symbol_info = self.get_symbol_info(symbol)
         quantity = self._round(amount / price, symbol_info.quantity_precision)
-        info = self._client.futures_create_order(
+        info = self._request(
+            RateLimiter.PRIORITY_ENTRY,
+            self._client.futures_create_order,
+            orders=1,
+            client_order_id_key='newClientOrderId',
             side=Order.SIDE_BUY,
             type=Order.TYPE_LIMIT,
             symbol=symbol,
             price=price,
             quantity=quantity,
-            timeInForce=Client.TIME_IN_FORCE_GTC,
+            timeInForce=Order.TIME_IN_FORCE_GTC,
         )
         order = Order.from_dict(info, quantity_key='origQty', futures=True)
         assert order.status == Order.STATUS_NEW, f'Got {order.status} status'
@@ -78,7 +113,11 @@ class FuturesApi(Api):
         return order
 
     def market_sell(self, symbol: str, quantity: Decimal) -> Order:
-        info = self._client.futures_create_order(
+        info = self._request(
+            RateLimiter.PRIORITY_PROTECTIVE,
+            self._client.futures_create_order,
+            orders=1,
+            client_order_id_key='newClientOrderId',
             side=Order.SIDE_SELL,
             type=Order.TYPE_MARKET,
             symbol=symbol,
@@ -88,7 +127,8 @@ class FuturesApi(Api):
 
         if info['status'] != Order.STATUS_FILLED:
             sleep(1)
-            info = self._client.futures_get_order(symbol=info['symbol'], orderId=info['orderId'])
+            info = self._request(RateLimiter.PRIORITY_PROTECTIVE, self._client.futures_get_order,
+                                 symbol=info['symbol'], orderId=info['orderId'])
 
         order = Order.from_dict(info, quantity_key='executedQty', price_key='avgPrice', futures=True)
         assert order.status == Order.STATUS_FILLED, f'Got {order.status} status'
@@ -103,8 +143,91 @@ class FuturesApi(Api):
         for price, quantity in zip(targets, quantities):
             self._limit_sell(symbol, quantity, price)
 
+    def replace_stop_loss(self, symbol: str, stop_loss: Decimal) -> None:
+        # only one close position stop order is allowed, so old one is cancelled first and it is created again
+        # when new one fails
+        with self._lock_symbol(symbol):
+            stop_loss = self._round(stop_loss, self.get_symbol_info(symbol).price_precision)
+            stop_orders = [info for info in self._request(RateLimiter.PRIORITY_PROTECTIVE,
+                                                          self._client.futures_get_open_orders, symbol=symbol)
+                           if info['type'] == Order.TYPE_STOP_MARKET]
+            assert len(stop_orders) != 0, f'No futures stop loss order {symbol}'
+
+            for info in stop_orders:
+                self._request(RateLimiter.PRIORITY_PROTECTIVE, self._client.futures_cancel_order, cancel=True,
+                              symbol=symbol, orderId=info['orderId'])
+
+            try:
+                self._stop_market_sell(symbol, stop_loss)
+            except:
+                self._stop_market_sell(symbol, parse_decimal(stop_orders[0]['stopPrice']))
+                raise
+
+    def get_target_orders(self, symbol: str) -> List[Order]:
+        # limit sell orders sorted by price, quantity is not filled part
+        orders = []
+
+        for info in self._request(RateLimiter.PRIORITY_PROTECTIVE, self._client.futures_get_open_orders,
+                                  symbol=symbol):
+            if info['side'] == Order.SIDE_SELL and info['type'] == Order.TYPE_LIMIT:
+                order = Order.from_dict(info, quantity_key='origQty', futures=True)
+                order.quantity -= parse_decimal(info['executedQty'])
+                orders.append(order)
+
+        return sorted(orders, key=lambda o: o.price)
+
+    def cancel_target_orders(self, symbol: str, orders: List[Order]) -> Decimal:
+        with self._lock_symbol(symbol):
+            quantity = Decimal(0)
+
+            for i in range(0, len(orders), self._BATCH_SIZE):
+                # repeated batch reports orders cancelled by lost attempt as failed
+                order_ids = [order.order_id for order in orders[i:i + self._BATCH_SIZE]]
+                infos = self._request(RateLimiter.PRIORITY_PROTECTIVE, self._client.futures_cancel_orders, retry=False,
+                                      symbol=symbol, orderidlist=order_ids)
+
+                for info in infos:
+                    assert 'code' not in info, f'Cancel failed {info.get("msg")}'
+                    quantity += parse_decimal(info['origQty']) - parse_decimal(info['executedQty'])
+
+            return quantity
+
+    def resize_target_orders(self, symbol: str, fraction: Decimal) -> Decimal:
+        # stop market order closes whole position, so only target orders are replaced
+        with self._lock_symbol(symbol):
+            quantity_precision = self.get_symbol_info(symbol).quantity_precision
+            orders = self.get_target_orders(symbol)
+            assert len(orders) != 0, f'No target orders {symbol}'
+            total_quantity = self.cancel_target_orders(symbol, orders)
+            quantity = self._round(total_quantity * fraction, quantity_precision)
+            assert quantity != Decimal(0), f'Nothing to sell {symbol}'
+            quantities = self._get_target_quantities(total_quantity - quantity, len(orders), quantity_precision)
+
+            for order, target_quantity in zip(orders, quantities):
+                self._limit_sell(symbol, target_quantity, order.price)
+
+            return quantity
+
+    def cancel_limit_buy(self, symbol: str, order_id: int) -> Optional[Decimal]:
+        # order filled or cancelled meanwhile is read instead
+        try:
+            info = self._request(RateLimiter.PRIORITY_ENTRY, self._client.futures_cancel_order, cancel=True,
+                                 symbol=symbol, orderId=order_id)
+        except BinanceAPIException as e:
+            if e.code not in self._UNKNOWN_ORDER_CODES:
+                raise
+
+            info = None
+
+        if info is None:
+            info = self._request(RateLimiter.PRIORITY_ENTRY, self._client.futures_get_order, symbol=symbol,
+                                 orderId=order_id)
+
+        return parse_decimal(info['executedQty'])
+
     def get_open_position_quantity(self, symbol: str) -> Decimal:
-        info = self._client.futures_position_information(symbol=symbol)
+        info = self._request(RateLimiter.PRIORITY_PROTECTIVE, self._client.futures_position_information, weight=5,
+                             symbol=symbol)
         assert len(info) == 1
 
         return parse_decimal(info[0]['positionAmt'])
@@ -115,14 +238,19 @@ class FuturesApi(Api):
     def get_sell_order_pnl(self, sell_order: Order) -> Optional[Decimal]:
         assert sell_order.side == Order.SIDE_SELL
         assert sell_order.status == Order.STATUS_FILLED
-        trades = self._client.futures_account_trades(symbol=sell_order.symbol)
+        trades = self._request(RateLimiter.PRIORITY_INFO, self._client.futures_account_trades, weight=5,
+                               symbol=sell_order.symbol)
         pln = [parse_decimal(info['realizedPnl']) for info in trades
                if info['orderId'] == sell_order.order_id]
 
         return pln[0] if len(pln) != 0 else None
 
     def _stop_market_sell(self, symbol: str, stop_loss: Decimal) -> None:
-        info = self._client.futures_create_order(
+        info = self._request(
+            RateLimiter.PRIORITY_PROTECTIVE,
+            self._client.futures_create_order,
+            orders=1,
+            client_order_id_key='newClientOrderId',
             side=Order.SIDE_SELL,
             type=Order.TYPE_STOP_MARKET,
             symbol=symbol,
@@ -133,43 +261,63 @@ class FuturesApi(Api):
         assert info['status'] == Order.STATUS_NEW, f'Got {info["status"]} status'
 
     def _limit_sell(self, symbol: str, quantity: Decimal, price: Decimal) -> None:
-        info = self._client.futures_create_order(
+        info = self._request(
+            RateLimiter.PRIORITY_PROTECTIVE,
+            self._client.futures_create_order,
+            orders=1,
+            client_order_id_key='newClientOrderId',
             side=Order.SIDE_SELL,
             type=Order.TYPE_LIMIT,
             symbol=symbol,
             price=price,
             quantity=quantity,
             reduceOnly=True,
-            timeInForce=Client.TIME_IN_FORCE_GTC,
+            timeInForce=Order.TIME_IN_FORCE_GTC,
         )
         assert info['status'] == Order.STATUS_NEW, f'Got {info["status"]} status'
 
+    def _get_order_by_client_order_id(self, symbol: str, client_order_id: str,
+                                      client_order_id_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self._request(RateLimiter.PRIORITY_PROTECTIVE, self._client.futures_get_order, symbol=symbol,
+                                 origClientOrderId=client_order_id)
+        except BinanceAPIException as e:
+            if e.code in self._UNKNOWN_ORDER_CODES:
+                return None
+
+            raise
+
     def _check_is_empty(self, symbol: str) -> None:
-        positions = self._client.futures_position_information(symbol=symbol)
+        positions = self._request(RateLimiter.PRIORITY_ENTRY, self._client.futures_position_information, weight=5,
+                                  symbol=symbol)
         assert len(positions) == 1
         assert parse_decimal(positions[0]['positionAmt']) == Decimal(0), f'{symbol} has open future position'
-        assert len(self._client.futures_get_open_orders(symbol=symbol)) == 0, f'{symbol} has open future order'
+        open_orders = self._request(RateLimiter.PRIORITY_ENTRY, self._client.futures_get_open_orders, symbol=symbol)
+        assert len(open_orders) == 0, f'{symbol} has open future order'
 
     def _set_futures_settings(self, symbol: str, leverage: int) -> None:
+        self._set_margin_type(symbol)
+        self._request(RateLimiter.PRIORITY_ENTRY, self._client.futures_change_leverage, symbol=symbol,
+                      leverage=leverage)
+
+    def _set_margin_type(self, symbol: str) -> None:
         try:
-            self._client.futures_change_margin_type(symbol=symbol, marginType=self._margin_type)
+            self._request(RateLimiter.PRIORITY_ENTRY, self._client.futures_change_margin_type, symbol=symbol,
+                          marginType=self._margin_type)
         except BinanceAPIException as e:
             if e.code != self._NO_NEED_TO_CHANGE_MARGIN:
                 raise
 
-        self._client.futures_change_leverage(symbol=symbol, leverage=leverage)
+    def _get_prefetch_methods(self, symbol: str) -> Dict[str, Callable[[str], Any]]:
+        # only lookups are prefetched, margin type and leverage are changed by order of accepted signal
+        methods = super()._get_prefetch_methods(symbol)
+        methods['empty'] = self._check_is_empty
+
+        return methods
 
     @property
     def _symbol_infos(self) -> Dict[str, SymbolInfo]:
         if len(self.__symbol_infos) == 0:
-            all_info = self._client.futures_exchange_info()
-
-            for info in all_info['symbols']:
-                symbol = info['symbol']
-                min_notional = [parse_decimal(f['notional']) for f in info['filters']
-                                if f['filterType'] == 'MIN_NOTIONAL'][0]
-                self.__symbol_infos[symbol] = SymbolInfo(int(info['quantityPrecision']),
-                                                         int(info['pricePrecision']),
-                                                         min_notional)
+            self.get_exchange_symbols()
 
         return self.__symbol_infos
@@ -0,0 +1,207 @@
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from automation.api.api import ExchangeSymbol, SymbolInfo
+from automation.api.futures_api import FuturesApi
+from automation.api.spot_api import SpotApi
+from automation.order import Order
+from automation.paper_exchange import PaperExchange
+
+if TYPE_CHECKING:
+    from binance.client import Client
+
+
+# paper APIs trade on simulated exchange at prices of streamed trades, symbol infos are shared with live APIs,
+# so no extra requests are sent
+
+class PaperSpotApi(SpotApi):
+    def __init__(self, client: 'Client', live_api: SpotApi, exchange: PaperExchange) -> None:
+        super().__init__(client)
+        self._live_api: SpotApi = live_api
+        self._exchange: PaperExchange = exchange
+
+    def market_buy(self, symbol: str, amount: Decimal) -> Order:
+        price = self.get_current_price(symbol)
+        quantity = self._round(amount / price, self.get_symbol_info(symbol).quantity_precision)
+
+        return self._exchange.market_order(symbol, False, Order.SIDE_BUY, quantity, price)
+
+    def limit_buy(self, symbol: str, price: Decimal, amount: Decimal) -> Order:
+        symbol_info = self.get_symbol_info(symbol)
+        price = self._round(price, symbol_info.price_precision)
+        quantity = self._round(amount / price, symbol_info.quantity_precision)
+
+        return self._exchange.limit_order(symbol, False, Order.SIDE_BUY, Order.TYPE_LIMIT, quantity, price)
+
+    def market_sell(self, symbol: str, quantity: Decimal) -> Order:
+        return self._exchange.market_order(symbol, False, Order.SIDE_SELL, quantity, self.get_current_price(symbol))
+
+    async def replace_stop_loss_async(self, symbol: str, stop_loss: Decimal) -> None:
+        self.replace_stop_loss(symbol, stop_loss)  # simulated exchange is used only on event loop
+
+    def get_target_orders(self, symbol: str) -> List[Order]:
+        return sorted((order for order in self._exchange.get_open_orders(symbol, False)
+                       if order.side == Order.SIDE_SELL and order.type == Order.TYPE_LIMIT_MAKER),
+                      key=lambda o: o.price)
+
+    def cancel_target_orders(self, symbol: str, orders: List[Order]) -> Decimal:
+        assert all(order.order_list_id is not None for order in orders)
+        cancelled = [cancelled_order for order in orders
+                     for cancelled_order in self._exchange.cancel_order_list(order.order_list_id)]  # type: ignore
+
+        return sum((order.quantity for order in cancelled if order.type == Order.TYPE_LIMIT_MAKER), Decimal(0))
+
+    def cancel_order(self, symbol: str, order_id: int) -> None:
+        self._exchange.cancel_order(order_id)
+
+    def cancel_limit_buy(self, symbol: str, order_id: int) -> Optional[Decimal]:
+        # simulated order is filled at once, fill event of order which is not open is not processed yet
+        if not self._exchange.is_open(order_id):
+            return None
+
+        self._exchange.cancel_order(order_id)
+
+        return Decimal(0)
+
+    def get_current_price(self, symbol: str) -> Decimal:
+        return self._exchange.get_price(symbol)
+
+    def get_symbol_info(self, symbol: str) -> SymbolInfo:
+        return self._live_api.get_symbol_info(symbol)
+
+    def get_exchange_symbols(self) -> List[ExchangeSymbol]:
+        return self._live_api.get_exchange_symbols()
+
+    def get_balances(self) -> Dict[str, Decimal]:
+        return {}
+
+    def get_sell_order_pnl(self, sell_order: Order) -> Optional[Decimal]:
+        return self._exchange.get_pnl(sell_order.order_id)
+
+    def _oco_sell(self, symbol: str, quantity: Decimal, price: Decimal, stop_loss: Decimal) -> None:
+        stop_price = self._round(stop_loss * (1 + self._STOP_PRICE_CORRECTION),
+                                 self.get_symbol_info(symbol).price_precision)
+        self._exchange.oco_order(symbol, quantity, price, stop_price, stop_loss)
+
+    def _cancel_open_oco_sell_orders(self, symbol: str) -> Tuple[List[Tuple[Decimal, Decimal]], Optional[Decimal]]:
+        targets = []
+        stop_loss = None
+
+        for order in self._exchange.get_open_orders(symbol, False):
+            if order.order_list_id is None:
+                continue  # pending limit buy
+
+            self._exchange.cancel_order(order.order_id)
+
+            if order.side == Order.SIDE_SELL and order.type == Order.TYPE_LIMIT_MAKER:
+                targets.append((order.price, order.quantity))
+            elif order.side == Order.SIDE_SELL and order.type == Order.TYPE_STOP_LOSS_LIMIT:
+                stop_loss = order.price
+
+        return targets, stop_loss
+
+    def _get_prefetch_methods(self, symbol: str) -> Dict[str, Callable[[str], Any]]:
+        return {}
+
+    def _request(self, priority: int, method: Callable[..., Any], weight: int = 1, orders: int = 0,
+                 client_order_id_key: Optional[str] = None, hedge: bool = False, retry: bool = True,
+                 cancel: bool = False, **kwargs: Any) -> Any:
+        raise Exception(f'Paper API can not call exchange {method.__name__}')
+
+
+class PaperFuturesApi(FuturesApi):
+    def __init__(self, client: 'Client', live_api: FuturesApi, exchange: PaperExchange) -> None:
+        super().__init__(self.MARGIN_TYPE_ISOLATED, client)
+        self._live_api: FuturesApi = live_api
+        self._exchange: PaperExchange = exchange
+
+    def is_futures_symbol(self, symbol: str) -> bool:
+        return self._live_api.is_futures_symbol(symbol)
+
+    def get_exchange_symbols(self) -> List[ExchangeSymbol]:
+        return self._live_api.get_exchange_symbols()
+
+    def market_buy(self, symbol: str, amount: Decimal) -> Order:
+        self._check_is_empty(symbol)
+        self._leverage = None  # margin is not simulated
+        price = self.get_current_price(symbol)
+        quantity = self._round(amount / price, self.get_symbol_info(symbol).quantity_precision)
+
+        return self._exchange.market_order(symbol, True, Order.SIDE_BUY, quantity, price)
+
+    def limit_buy(self, symbol: str, price: Decimal, amount: Decimal) -> Order:
+        self._check_is_empty(symbol)
+        self._leverage = None
+        quantity = self._round(amount / price, self.get_symbol_info(symbol).quantity_precision)
+
+        return self._exchange.limit_order(symbol, True, Order.SIDE_BUY, Order.TYPE_LIMIT, quantity, price)
+
+    def market_sell(self, symbol: str, quantity: Decimal) -> Order:
+        return self._exchange.market_order(symbol, True, Order.SIDE_SELL, quantity, self.get_current_price(symbol))
+
+    def replace_stop_loss(self, symbol: str, stop_loss: Decimal) -> None:
+        # same order of requests as live API, old stop order is cancelled before new one is created
+        stop_loss = self._round(stop_loss, self.get_symbol_info(symbol).price_precision)
+        stop_orders = [order for order in self._exchange.get_open_orders(symbol, True)
+                       if order.type == Order.TYPE_STOP_MARKET]
+        assert len(stop_orders) != 0, f'No futures stop loss order {symbol}'
+
+        for order in stop_orders:
+            self._exchange.cancel_order(order.order_id)
+
+        try:
+            self._stop_market_sell(symbol, stop_loss)
+        except:
+            self._stop_market_sell(symbol, stop_orders[0].price)
+            raise
+
+    async def replace_stop_loss_async(self, symbol: str, stop_loss: Decimal) -> None:
+        self.replace_stop_loss(symbol, stop_loss)  # simulated exchange is used only on event loop
+
+    def get_target_orders(self, symbol: str) -> List[Order]:
+        return sorted((order for order in self._exchange.get_open_orders(symbol, True)
+                       if order.side == Order.SIDE_SELL and order.type == Order.TYPE_LIMIT),
+                      key=lambda o: o.price)
+
+    def cancel_target_orders(self, symbol: str, orders: List[Order]) -> Decimal:
+        return sum((self._exchange.cancel_order(order.order_id).quantity for order in orders), Decimal(0))
+
+    def cancel_limit_buy(self, symbol: str, order_id: int) -> Optional[Decimal]:
+        # simulated order is filled at once, fill event of order which is not open is not processed yet
+        if not self._exchange.is_open(order_id):
+            return None
+
+        self._exchange.cancel_order(order_id)
+
+        return Decimal(0)
+
+    def get_open_position_quantity(self, symbol: str) -> Decimal:
+        return self._exchange.get_position_quantity(symbol, True)
+
+    def get_current_price(self, symbol: str) -> Decimal:
+        return self._exchange.get_price(symbol)
+
+    def get_symbol_info(self, symbol: str) -> SymbolInfo:
+        return self._live_api.get_symbol_info(symbol)
+
+    def get_sell_order_pnl(self, sell_order: Order) -> Optional[Decimal]:
+        return self._exchange.get_pnl(sell_order.order_id)
+
+    def _stop_market_sell(self, symbol: str, stop_loss: Decimal) -> None:
+        self._exchange.limit_order(symbol, True, Order.SIDE_SELL, Order.TYPE_STOP_MARKET, Decimal(0), stop_loss,
+                                   stop_loss)
+
+    def _limit_sell(self, symbol: str, quantity: Decimal, price: Decimal) -> None:
+        self._exchange.limit_order(symbol, True, Order.SIDE_SELL, Order.TYPE_LIMIT, quantity, price)
+
+    def _check_is_empty(self, symbol: str) -> None:
+        assert self._exchange.get_position_quantity(symbol, True) == Decimal(0), f'{symbol} has open future position'
+        assert len(self._exchange.get_open_orders(symbol, True)) == 0, f'{symbol} has open future order'
+
+    def _get_prefetch_methods(self, symbol: str) -> Dict[str, Callable[[str], Any]]:
+        return {}
+
+    def _request(self, priority: int, method: Callable[..., Any], weight: int = 1, orders: int = 0,
+                 client_order_id_key: Optional[str] = None, hedge: bool = False, retry: bool = True,
+                 cancel: bool = False, **kwargs: Any) -> Any:
+        raise Exception(f'Paper API can not call exchange {method.__name__}')
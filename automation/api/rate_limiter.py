@@ -0,0 +1,141 @@
+import heapq
+import itertools
+import time
+from threading import Condition
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from requests import Response
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class RateLimiter:
+    PRIORITY_PROTECTIVE = 0  # orders protecting open position (stop loss, take profit, market sell)
+    PRIORITY_ENTRY = 1  # orders opening new position
+    PRIORITY_INFO = 2  # informational calls (PNL, ...), dropped instead of waiting
+
+    # part of limit which can be used by priority, rest is reserved for more important requests
+    _PRIORITY_SHARES = {
+        PRIORITY_PROTECTIVE: 1.0,
+        PRIORITY_ENTRY: 0.8,
+        PRIORITY_INFO: 0.6,
+    }
+    _WEIGHT_INTERVAL = 60  # seconds
+    _WEIGHT_HEADER = 'X-MBX-USED-WEIGHT-1M'
+    _BANNED_STATUS_CODES = (418, 429)
+
+    def __init__(self, weight_limit: int, order_limit: int, order_interval: int, order_header: str) -> None:
+        self._weight_limit: int = weight_limit
+        self._order_limit: int = order_limit
+        self._order_interval: int = order_interval
+        self._order_header: str = order_header
+        self._condition: Condition = Condition()
+        self._waiting: List[Tuple[int, int]] = []
+        self._counter = itertools.count()
+        self._weight_window: int = 0
+        self._used_weight: int = 0
+        self._order_window: int = 0
+        self._used_orders: int = 0
+        self._banned_until: float = 0
+        self.throttled: Dict[int, int] = {priority: 0 for priority in self._PRIORITY_SHARES.keys()}
+
+    @property
+    def used_weight(self) -> int:
+        with self._condition:
+            self._reset_windows(time.time())
+            return self._used_weight
+
+    @property
+    def used_orders(self) -> int:
+        with self._condition:
+            self._reset_windows(time.time())
+            return self._used_orders
+
+    def acquire(self, priority: int, weight: int, orders: int) -> None:
+        assert priority in self._PRIORITY_SHARES
+        ticket = (priority, next(self._counter))
+
+        with self._condition:
+            if priority == self.PRIORITY_INFO and (len(self._waiting) != 0
+                                                   or self._get_wait_time(priority, weight, orders) != 0):
+                # informational requests are sent from event loop, which can not wait for budget
+                self.throttled[priority] += 1
+                raise RateLimitExceeded(f'Rate limit exceeded for informational request with weight {weight}')
+
+            heapq.heappush(self._waiting, ticket)
+            self._condition.notify_all()  # let waiting request know there is more important one
+            throttled = False
+
+            try:
+                while True:
+                    wait = self._get_wait_time(priority, weight, orders) if self._waiting[0] == ticket else None
+
+                    if wait == 0:
+                        break
+
+                    throttled = True
+                    self._condition.wait(wait)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+
+            if throttled:
+                self.throttled[priority] += 1
+
+            self._used_weight += weight
+            self._used_orders += orders
+
+    def update(self, response: Optional['Response']) -> None:
+        if response is None:
+            return
+
+        now = time.time()
+
+        with self._condition:
+            self._reset_windows(now)
+            used_weight = response.headers.get(self._WEIGHT_HEADER)
+            used_orders = response.headers.get(self._order_header)
+
+            # local counters can be higher because of requests which are still waiting for response
+            if used_weight is not None:
+                self._used_weight = max(self._used_weight, int(used_weight))
+
+            if used_orders is not None:
+                self._used_orders = max(self._used_orders, int(used_orders))
+
+            if response.status_code in self._BANNED_STATUS_CODES:
+                retry_after = int(response.headers.get('Retry-After', self._WEIGHT_INTERVAL))
+                self._banned_until = max(self._banned_until, now + retry_after)
+
+            self._condition.notify_all()
+
+    def _get_wait_time(self, priority: int, weight: int, orders: int) -> float:
+        now = time.time()
+        self._reset_windows(now)
+
+        if self._banned_until > now:
+            return self._banned_until - now
+
+        share = self._PRIORITY_SHARES[priority]
+
+        if self._used_weight + weight > self._weight_limit * share:
+            return (self._weight_window + 1) * self._WEIGHT_INTERVAL - now
+
+        if orders != 0 and self._used_orders + orders > self._order_limit * share:
+            return (self._order_window + 1) * self._order_interval - now
+
+        return 0
+
+    def _reset_windows(self, now: float) -> None:
+        weight_window = int(now // self._WEIGHT_INTERVAL)
+        order_window = int(now // self._order_interval)
+
+        if weight_window != self._weight_window:
+            self._weight_window, self._used_weight = weight_window, 0
+
+        if order_window != self._order_window:
+            self._order_window, self._used_orders = order_window, 0
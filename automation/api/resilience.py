@@ -0,0 +1,70 @@
+import time
+from threading import Lock
+
+from binance.exceptions import BinanceAPIException, BinanceRequestException
+from requests.exceptions import ConnectionError, Timeout
+
+_TRANSIENT_CODES = (
+    -1001,  # internal error, unable to process request
+    -1006,  # unexpected response, execution status unknown
+    -1007,  # timeout waiting for response, execution status unknown
+)
+
+
+def is_transient(e: Exception) -> bool:
+    # errors after which same request can succeed
+    if isinstance(e, (ConnectionError, Timeout, BinanceRequestException)):
+        return True
+
+    if isinstance(e, BinanceAPIException):
+        return e.status_code >= 500 or e.code in _TRANSIENT_CODES
+
+    return False
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    STATE_CLOSED = 'CLOSED'
+    STATE_OPEN = 'OPEN'
+    STATE_HALF_OPEN = 'HALF_OPEN'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30) -> None:
+        self._name: str = name
+        self._failure_threshold: int = failure_threshold
+        self._reset_timeout: float = reset_timeout
+        self._lock: Lock = Lock()
+        self._failures: int = 0
+        self._opened_at: float = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._get_state()
+
+    def check(self) -> None:
+        # in half open state requests are let through, first result closes or opens circuit again
+        with self._lock:
+            if self._get_state() == self.STATE_OPEN:
+                raise CircuitOpenError(f'Circuit of {self._name} is open')
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+
+            if self._failures >= self._failure_threshold:
+                self._opened_at = time.time()
+
+    def _get_state(self) -> str:
+        if self._failures < self._failure_threshold:
+            return self.STATE_CLOSED
+        elif time.time() - self._opened_at < self._reset_timeout:
+            return self.STATE_OPEN
+        else:
+            return self.STATE_HALF_OPEN
@@ -0,0 +1,90 @@
+import hashlib
+import hmac
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from binance.client import Client
+from binance.exceptions import BinanceAPIException
+from requests import Response, Session
+
+
+class SignedClient(Client):
+    # faster signing of private requests and local clock synchronized with server time
+    _INVALID_TIMESTAMP = -1021
+    CLOCK_SYNC_INTERVAL = 60  # seconds
+
+    def __init__(self, api_key: str, api_secret: str, **kwargs: Any) -> None:
+        super().__init__(api_key, api_secret, **kwargs)
+        self._hmac = hmac.new(api_secret.encode('utf-8'), digestmod=hashlib.sha256)  # key is padded only once
+        self._param_orders: Dict[Tuple[str, ...], List[str]] = {}  # sorted keys by keys of endpoint parameters
+
+    def pop_response(self) -> Optional[Response]:
+        # last response received by calling thread, attribute response is overwritten by concurrent requests
+        response = getattr(self._responses, 'response', None)
+        self._responses.response = None
+
+        return response
+
+    def sync_clock(self) -> None:
+        # server time is compared with middle of request, half of round trip is not counted as drift
+        start = time.time()
+        server_time = self.get_server_time()['serverTime']
+        end = time.time()
+        self.timestamp_offset = server_time - int((start + end) / 2 * 1000)
+
+    def refresh_clock(self) -> None:
+        # periodic sync, called every CLOCK_SYNC_INTERVAL by scheduler
+        try:
+            self.sync_clock()
+        except Exception:
+            pass  # keep last offset, next attempt can succeed
+
+    def _init_session(self) -> Session:
+        # called by constructor of client before first request
+        self._responses = threading.local()
+        session = super()._init_session()
+        session.hooks['response'].append(self._keep_response)
+
+        return session
+
+    def _keep_response(self, response: Response, *args: Any, **kwargs: Any) -> None:
+        self._responses.response = response
+
+    def _request(self, method: str, uri: str, signed: bool, force_params: bool = False, **kwargs: Any) -> Any:
+        data = dict(kwargs['data']) if 'data' in kwargs else None
+
+        try:
+            return super()._request(method, uri, signed, force_params, **kwargs)
+        except BinanceAPIException as e:
+            # rejected request was not executed, so it is safe to send it again with fixed timestamp
+            if not signed or e.code != self._INVALID_TIMESTAMP:
+                raise
+
+            self.sync_clock()
+
+            if data is not None:
+                kwargs['data'] = data
+
+            return super()._request(method, uri, signed, force_params, **kwargs)
+
+    def _hmac_signature(self, query_string: str) -> str:
+        m = self._hmac.copy()
+        m.update(query_string.encode('utf-8'))
+
+        return m.hexdigest()
+
+    def _order_params(self, data: Dict) -> List[Tuple[str, str]]:  # type: ignore
+        # every endpoint is called with same parameters, so their order is computed only once
+        keys = tuple(data.keys())
+        order = self._param_orders.get(keys)
+
+        if order is None:
+            order = sorted(key for key in keys if key != 'signature')
+
+            if 'signature' in data:
+                order.append('signature')
+
+            self._param_orders[keys] = order
+
+        return [(key, str(data[key])) for key in order if data[key] is not None]
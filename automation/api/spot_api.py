@@ -1,29 +1,45 @@
 import math
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+from functools import partial
 from time import sleep
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
 
-from binance.client import Client
+from binance.exceptions import BinanceAPIException
 
-from automation.api.api import Api, SymbolInfo
+from automation.api.api import Api, ExchangeSymbol, SymbolInfo
+from automation.api.rate_limiter import RateLimiter
 from automation.functions import parse_decimal
 from automation.order import Order
 
+if TYPE_CHECKING:
+    from binance.client import Client
+
 
 class SpotApi(Api):
-    def __init__(self, *args, **kwargs) -> None:
-        super().__init__(*args, **kwargs)
+    _WEIGHT_LIMIT = 1200
+    _ORDER_LIMIT = 50
+    _ORDER_INTERVAL = 10  # seconds
+
+    def __init__(self, client: 'Client') -> None:
+        super().__init__(client, RateLimiter(self._WEIGHT_LIMIT, self._ORDER_LIMIT, self._ORDER_INTERVAL,
+                                             'X-MBX-ORDER-COUNT-10S'))
         self._symbol_infos: Dict[str, SymbolInfo] = {}
 
     def market_buy(self, symbol: str, amount: Decimal) -> Order:
-        info = self._client.order_market_buy(
+        info = self._request(
+            RateLimiter.PRIORITY_ENTRY,
+            self._client.order_market_buy,
+            orders=1,
+            client_order_id_key='newClientOrderId',
             symbol=symbol,
             quoteOrderQty=amount,
         )
 
         if info['status'] != Order.STATUS_FILLED:
             sleep(1)
-            info = self._client.get_order(symbol=info['symbol'], orderId=info['orderId'])
+            info = self._request(RateLimiter.PRIORITY_ENTRY, self._client.get_order, weight=2,
+                                 symbol=info['symbol'], orderId=info['orderId'])
 
         # price is zero in original response
         price = parse_decimal(info['cummulativeQuoteQty']) / parse_decimal(info['executedQty'])
@@ -35,7 +51,11 @@ class SpotApi(Api):
     def limit_buy(self, symbol: str, price: Decimal, amount: Decimal) -> Order:
         symbol_info = self.get_symbol_info(symbol)
         quantity = self._round(amount / price, symbol_info.quantity_precision)
-        info = self._client.order_limit_buy(
+        info = self._request(
+            RateLimiter.PRIORITY_ENTRY,
+            self._client.order_limit_buy,
+            orders=1,
+            client_order_id_key='newClientOrderId',
             symbol=symbol,
             price=price,
             quantity=quantity,
@@ -46,14 +66,19 @@ class SpotApi(Api):
         return order
 
     def market_sell(self, symbol: str, quantity: Decimal) -> Order:
-        info = self._client.order_market_sell(
+        info = self._request(
+            RateLimiter.PRIORITY_PROTECTIVE,
+            self._client.order_market_sell,
+            orders=1,
+            client_order_id_key='newClientOrderId',
             symbol=symbol,
             quantity=quantity,
         )
 
         if info['status'] != Order.STATUS_FILLED:
             sleep(1)
-            info = self._client.get_order(symbol=info['symbol'], orderId=info['orderId'])
+            info = self._request(RateLimiter.PRIORITY_PROTECTIVE, self._client.get_order, weight=2,
+                                 symbol=info['symbol'], orderId=info['orderId'])
 
         # price is zero in original response
         price = parse_decimal(info['cummulativeQuoteQty']) / parse_decimal(info['executedQty'])
@@ -64,23 +89,42 @@ class SpotApi(Api):
 
     def oco_sell(self, symbol: str, quantity: Decimal, targets: List[Decimal], stop_loss: Decimal) -> None:
         symbol_info = self.get_symbol_info(symbol)
-        stop_price = self._round(stop_loss * (1 + self._STOP_PRICE_CORRECTION), symbol_info.price_precision)
         quantities = self._get_target_quantities(quantity, len(targets), symbol_info.quantity_precision)
 
+        if min(stop_loss * target_quantity for target_quantity in quantities) < symbol_info.min_notional:
+            # bought quantity is smaller than checked one (partial fill), it is protected by one OCO of first target
+            targets, quantities = targets[:1], [quantity]
+
         for price, quantity in zip(targets, quantities):
-            info = self._client.order_oco_sell(
-                symbol=symbol,
-                quantity=quantity,
-                price=price,
-                stopPrice=stop_price,
-                stopLimitPrice=stop_loss,
-                stopLimitTimeInForce=Client.TIME_IN_FORCE_FOK,
-            )
-            assert info['listStatusType'] == 'EXEC_STARTED', f'Got {info["listStatusType"]}'
+            self._oco_sell(symbol, quantity, price, stop_loss)
+
+    def replace_stop_loss(self, symbol: str, stop_loss: Decimal) -> None:
+        # OCO order can not be amended, remaining targets are created again with new stop loss
+        with self._lock_symbol(symbol):
+            stop_loss = self._round(stop_loss, self.get_symbol_info(symbol).price_precision)
+            targets, old_stop_loss = self._cancel_open_oco_sell_orders(symbol)
+            assert len(targets) != 0 and old_stop_loss is not None, f'Empty spot OCO sell orders {symbol}'
+            self._create_oco_sell_orders(symbol, targets, stop_loss, targets, old_stop_loss)
+
+    def resize_target_orders(self, symbol: str, fraction: Decimal) -> Decimal:
+        with self._lock_symbol(symbol):
+            quantity_precision = self.get_symbol_info(symbol).quantity_precision
+            targets, stop_loss = self._cancel_open_oco_sell_orders(symbol)
+            assert len(targets) != 0 and stop_loss is not None, f'Empty spot OCO sell orders {symbol}'
+            total_quantity = sum((quantity for _, quantity in targets), Decimal(0))
+            quantity = self._round(total_quantity * fraction, quantity_precision)
+            quantities = self._get_target_quantities(total_quantity - quantity, len(targets), quantity_precision)
+            # targets are created again before nothing to sell is reported, so position keeps its stop loss
+            self._create_oco_sell_orders(symbol, [(price, target_quantity) for (price, _), target_quantity
+                                                  in zip(targets, quantities)], stop_loss, targets, stop_loss)
+            assert quantity != Decimal(0), f'Nothing to sell {symbol}'
+
+            return quantity
 
     def get_oco_sell_orders(self, symbol: str) -> List[Tuple[Order, Order]]:
         all_orders = [Order.from_dict(info, quantity_key='origQty')
-                      for info in self._client.get_open_orders(symbol=symbol)
+                      for info in self._request(RateLimiter.PRIORITY_PROTECTIVE, self._client.get_open_orders,
+                                                weight=3, symbol=symbol)
                       if info['side'] == Order.SIDE_SELL and info['status'] == Order.STATUS_NEW
                       and info['type'] in (Order.TYPE_LIMIT_MAKER, Order.TYPE_STOP_LOSS_LIMIT)]
         all_orders.sort(key=lambda o: o.type)
@@ -101,30 +145,68 @@ class SpotApi(Api):
 
         return oco_orders
 
+    def get_target_orders(self, symbol: str) -> List[Order]:
+        # limit maker orders of OCO sell orders sorted by price, quantity is not filled part
+        return self._parse_target_orders(self._get_open_orders(symbol))
+
+    def cancel_target_orders(self, symbol: str, orders: List[Order]) -> Decimal:
+        with self._lock_symbol(symbol):
+            return sum(self._cancel_oco_sell_orders(symbol, orders), Decimal(0))
+
+    def cancel_open_orders(self, symbol: str) -> Decimal:
+        # returns quantity released from OCO sell orders
+        with self._lock_symbol(symbol):
+            targets, _ = self._cancel_open_oco_sell_orders(symbol)
+
+            return sum((quantity for _, quantity in targets), Decimal(0))
+
     def cancel_order(self, symbol: str, order_id: int) -> None:
-        info = self._client.cancel_order(symbol=symbol, orderId=order_id)
-        assert info['listStatusType'] == 'ALL_DONE', f'Got {info["listStatusType"]}'
+        info = self._request(RateLimiter.PRIORITY_PROTECTIVE, self._client.cancel_order, cancel=True, symbol=symbol,
+                             orderId=order_id)
+        assert info is None or info['listStatusType'] == 'ALL_DONE', f'Got {info["listStatusType"]}'
+
+    def cancel_limit_buy(self, symbol: str, order_id: int) -> Optional[Decimal]:
+        # order filled or cancelled meanwhile is read instead
+        try:
+            info = self._request(RateLimiter.PRIORITY_ENTRY, self._client.cancel_order, cancel=True, symbol=symbol,
+                                 orderId=order_id)
+        except BinanceAPIException as e:
+            if e.code not in self._UNKNOWN_ORDER_CODES:
+                raise
+
+            info = None
+
+        if info is None:
+            info = self._request(RateLimiter.PRIORITY_ENTRY, self._client.get_order, weight=2, symbol=symbol,
+                                 orderId=order_id)
+
+        return parse_decimal(info['executedQty'])
 
     def get_symbol_info(self, symbol: str) -> SymbolInfo:
         if symbol not in self._symbol_infos:
-            info = self._client.get_symbol_info(symbol=symbol)
-            quantity_precision, price_precision, min_notional = None, None, None
+            self._symbol_infos[symbol] = self._get_prefetched(symbol, 'symbol_info',
+                                                              partial(self._fetch_symbol_info, hedge=True))
 
-            def parse(key: str) -> int:
-                return int(round(-math.log(Decimal(f[key]), 10), 0))
+        return self._symbol_infos[symbol]
 
-            for f in info['filters']:
-                if f['filterType'] == 'LOT_SIZE':
-                    quantity_precision = parse('stepSize')
-                elif f['filterType'] == 'PRICE_FILTER':
-                    price_precision = parse('tickSize')
-                elif f['filterType'] == 'MIN_NOTIONAL':
-                    min_notional = parse_decimal(f['minNotional'])
+    def get_exchange_symbols(self) -> List[ExchangeSymbol]:
+        # symbol infos of all symbols are cached, so they are not requested before first order
+        all_info = self._request(RateLimiter.PRIORITY_ENTRY, self._client.get_exchange_info, weight=20)
+        symbols = []
 
-            assert quantity_precision is not None and price_precision is not None and min_notional is not None
-            self._symbol_infos[symbol] = SymbolInfo(quantity_precision, price_precision, min_notional)
+        for info in all_info['symbols']:
+            if info['status'] == self._STATUS_TRADING:
+                symbol_info = self._parse_symbol_info(info)
+                self._symbol_infos[info['symbol']] = symbol_info
+                symbols.append(ExchangeSymbol(info['symbol'], info['baseAsset'], info['quoteAsset'], symbol_info))
 
-        return self._symbol_infos[symbol]
+        return symbols
+
+    def get_balances(self) -> Dict[str, Decimal]:
+        # free balances, later changes are received from user data stream, risk checks of entries need them
+        info = self._request(RateLimiter.PRIORITY_ENTRY, self._client.get_account, weight=20)
+
+        return {balance['asset']: parse_decimal(balance['free']) for balance in info['balances']}
 
     def get_sell_order_pnl(self, sell_order: Order) -> Optional[Decimal]:
         assert sell_order.side == Order.SIDE_SELL
@@ -137,8 +219,56 @@ class SpotApi(Api):
         else:
             return None
 
+    def _fetch_symbol_info(self, symbol: str, hedge: bool = False) -> SymbolInfo:
+        info = self._request(RateLimiter.PRIORITY_ENTRY, self._client.get_symbol_info, weight=10, hedge=hedge,
+                             symbol=symbol)
+
+        return self._parse_symbol_info(info)
+
+    def _get_prefetch_methods(self, symbol: str) -> Dict[str, Callable[[str], Any]]:
+        methods = super()._get_prefetch_methods(symbol)
+
+        if symbol not in self._symbol_infos:
+            methods['symbol_info'] = self._fetch_symbol_info  # symbol listed after exchange info was loaded
+
+        return methods
+
+    @staticmethod
+    def _parse_symbol_info(info: Dict[str, Any]) -> SymbolInfo:
+        quantity_precision, price_precision, min_notional = None, None, None
+
+        def parse(key: str) -> int:
+            return int(round(-math.log(Decimal(f[key]), 10), 0))
+
+        for f in info['filters']:
+            if f['filterType'] == 'LOT_SIZE':
+                quantity_precision = parse('stepSize')
+            elif f['filterType'] == 'PRICE_FILTER':
+                price_precision = parse('tickSize')
+            elif f['filterType'] in ('MIN_NOTIONAL', 'NOTIONAL'):
+                min_notional = parse_decimal(f['minNotional'])
+
+        assert quantity_precision is not None and price_precision is not None and min_notional is not None
+
+        return SymbolInfo(quantity_precision, price_precision, min_notional)
+
+    def _get_order_by_client_order_id(self, symbol: str, client_order_id: str,
+                                      client_order_id_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            if client_order_id_key == 'listClientOrderId':
+                return self._request(RateLimiter.PRIORITY_PROTECTIVE, self._client._get, weight=2, path='orderList',
+                                     signed=True, data=dict(origClientOrderId=client_order_id))
+            else:
+                return self._request(RateLimiter.PRIORITY_PROTECTIVE, self._client.get_order, weight=2,
+                                     symbol=symbol, origClientOrderId=client_order_id)
+        except BinanceAPIException as e:
+            if e.code in self._UNKNOWN_ORDER_CODES:
+                return None
+
+            raise
+
     def _get_last_buy_order(self, symbol: str) -> Optional[Order]:
-        api_orders = self._client.get_all_orders(symbol=symbol)
+        api_orders = self._request(RateLimiter.PRIORITY_INFO, self._client.get_all_orders, weight=10, symbol=symbol)
         api_orders.sort(key=lambda o: o['updateTime'], reverse=True)
 
         for info in api_orders:
@@ -149,3 +279,108 @@ class SpotApi(Api):
                 return Order.from_dict(info, price=price, quantity_key='executedQty')
         else:
             return None
+
+    def _oco_sell(self, symbol: str, quantity: Decimal, price: Decimal, stop_loss: Decimal) -> None:
+        symbol_info = self.get_symbol_info(symbol)
+        stop_price = self._round(stop_loss * (1 + self._STOP_PRICE_CORRECTION), symbol_info.price_precision)
+        info = self._request(
+            RateLimiter.PRIORITY_PROTECTIVE,
+            self._client.order_oco_sell,
+            orders=2,
+            client_order_id_key='listClientOrderId',
+            symbol=symbol,
+            quantity=quantity,
+            price=price,
+            stopPrice=stop_price,
+            stopLimitPrice=stop_loss,
+            stopLimitTimeInForce=Order.TIME_IN_FORCE_FOK,
+        )
+        assert info['listStatusType'] == 'EXEC_STARTED', f'Got {info["listStatusType"]}'
+
+    def _cancel_open_oco_sell_orders(self, symbol: str) -> Tuple[List[Tuple[Decimal, Decimal]], Optional[Decimal]]:
+        # only OCO order lists are cancelled, so pending limit buy of symbol stays open,
+        # returns unfilled targets (price, quantity) and stop loss
+        infos = self._get_open_orders(symbol)
+        orders = self._parse_target_orders(infos)
+        _, stop_loss = self._parse_oco_sell_reports(infos)
+        quantities = self._cancel_oco_sell_orders(symbol, orders)
+
+        return [(order.price, quantity) for order, quantity in zip(orders, quantities) if quantity != 0], stop_loss
+
+    def _cancel_oco_sell_orders(self, symbol: str, orders: List[Order]) -> List[Decimal]:
+        # every OCO order has to be cancelled by its own request, so they are sent concurrently,
+        # returns cancelled quantity of every target
+        def cancel(order: Order) -> Decimal:
+            info = self._request(RateLimiter.PRIORITY_PROTECTIVE, self._client._delete, path='orderList', signed=True,
+                                 cancel=True, data=dict(symbol=symbol, orderListId=order.order_list_id))
+
+            if info is None:
+                # cancelled by attempt without response, target was filled when it is not cancelled
+                info = self._request(RateLimiter.PRIORITY_PROTECTIVE, self._client.get_order, weight=2,
+                                     symbol=symbol, orderId=order.order_id)
+
+                return order.quantity if info['status'] == Order.STATUS_CANCELED else Decimal(0)
+
+            targets, _ = self._parse_oco_sell_reports([info])
+
+            return sum((quantity for _, quantity in targets), Decimal(0))
+
+        assert all(order.order_list_id is not None for order in orders)
+
+        with ThreadPoolExecutor(max_workers=max(len(orders), 1)) as executor:
+            return list(executor.map(cancel, orders))
+
+    def _create_oco_sell_orders(self, symbol: str, targets: List[Tuple[Decimal, Decimal]], stop_loss: Decimal,
+                                original_targets: List[Tuple[Decimal, Decimal]], original_stop_loss: Decimal) -> None:
+        # targets (price, quantity) replace cancelled ones, when any of them fails the created ones are cancelled
+        # and all original targets are created again, so position is not left with partly changed orders
+        try:
+            for price, quantity in targets:
+                self._oco_sell(symbol, quantity, price, stop_loss)
+        except:
+            self._cancel_open_oco_sell_orders(symbol)
+            unprotected = Decimal(0)
+
+            for price, quantity in original_targets:
+                try:
+                    self._oco_sell(symbol, quantity, price, original_stop_loss)
+                except Exception:
+                    unprotected += quantity
+
+            if unprotected != Decimal(0):
+                raise Exception(f'Position {symbol} is without stop loss for quantity {unprotected}')
+
+            raise
+
+    def _get_open_orders(self, symbol: str) -> List[Dict[str, Any]]:
+        return self._request(RateLimiter.PRIORITY_PROTECTIVE, self._client.get_open_orders, weight=3, symbol=symbol)
+
+    @staticmethod
+    def _parse_target_orders(infos: List[Dict[str, Any]]) -> List[Order]:
+        orders = []
+
+        for info in infos:
+            if info['side'] == Order.SIDE_SELL and info['type'] == Order.TYPE_LIMIT_MAKER:
+                order = Order.from_dict(info, quantity_key='origQty')
+                order.quantity -= parse_decimal(info['executedQty'])
+                orders.append(order)
+
+        return sorted(orders, key=lambda o: o.price)
+
+    @staticmethod
+    def _parse_oco_sell_reports(infos: List[Dict[str, Any]]) -> Tuple[List[Tuple[Decimal, Decimal]],
+                                                                       Optional[Decimal]]:
+        targets = []
+        stop_loss = None
+
+        for info in infos:
+            for report in info.get('orderReports', [info]):
+                if report['side'] != Order.SIDE_SELL:
+                    continue
+                elif report['type'] == Order.TYPE_LIMIT_MAKER:
+                    quantity = parse_decimal(report['origQty']) - parse_decimal(report['executedQty'])
+                    targets.append((parse_decimal(report['price']), quantity))
+                elif report['type'] == Order.TYPE_STOP_LOSS_LIMIT:
+                    stop_loss = parse_decimal(report['price'])
+
+        return targets, stop_loss
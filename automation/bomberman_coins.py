@@ -1,19 +1,33 @@
+import asyncio
 import math
 import re
+import time
+import traceback
 from decimal import Decimal
-from typing import Dict, List, Optional, Union
+from typing import Awaitable, Callable, Dict, List, Optional, TYPE_CHECKING, Union
 
 from automation.api.api import Api
-from automation.api.futures_api import FuturesApi
+from automation.api.rate_limiter import RateLimitExceeded
 from automation.api.spot_api import SpotApi
 from automation.functions import parse_decimal
+from automation.leverage_engine import LeverageEngine
 from automation.logger import Logger
 from automation.message.buy_message import BuyMessage
+from automation.message.message import Message
 from automation.message.sell_message import SellMessage
 from automation.message.unknown_message import UnknownMessage
 from automation.order import Order
 from automation.order_storage import OrderStorage
 from automation.parser.message_parser import MessageParser
+from automation.position_manager import PositionManager
+from automation.risk_engine import RiskEngine
+from automation.symbol_registry import SymbolRegistry
+from automation.symbol_watcher import SymbolWatcher
+
+if TYPE_CHECKING:
+    from automation.api.futures_api import FuturesApi
+
+TradeAmounts = Dict[str, Dict[str, Decimal]]  # amounts by market type and currency
 
 
 class BombermanCoins:
@@ -21,54 +35,146 @@ class BombermanCoins:
     MARKET_TYPE_FUTURES = 'FUTURES'
 
     LEVERAGE_SMART = 'SMART'
+    _MAX_LEVERAGE = 125
 
     def __init__(self, market_type: str, spot_trade_amounts: Dict[str, Decimal],
                  futures_trade_amounts: Dict[str, Decimal], futures_leverage: Union[str, int],
-                 futures_max_leverage: int, spot_api: SpotApi, futures_api: FuturesApi, order_storage: OrderStorage,
+                 futures_max_leverage: int, spot_api: SpotApi, futures_api: Optional['FuturesApi'],
+                 order_storage: OrderStorage, position_manager: PositionManager,
+                 symbol_watcher: Optional[SymbolWatcher], symbol_registry: SymbolRegistry, risk_engine: RiskEngine,
                  logger: Logger) -> None:
         assert market_type in (self.MARKET_TYPE_SPOT, self.MARKET_TYPE_FUTURES)
-        assert isinstance(futures_leverage, int) or futures_leverage == self.LEVERAGE_SMART
+        self.check_settings(spot_trade_amounts, futures_trade_amounts, futures_leverage, futures_max_leverage)
         self._market_type: str = market_type
-        self._trade_amounts: Dict[str, Dict[str, Decimal]] = {
+        self._trade_amounts: TradeAmounts = {
             self.MARKET_TYPE_SPOT: spot_trade_amounts,
             self.MARKET_TYPE_FUTURES: futures_trade_amounts,
         }
         self._futures_leverage: Union[str, int] = futures_leverage
-        self._futures_max_leverage: int = futures_max_leverage
         self._spot_api: SpotApi = spot_api
-        self._futures_api: FuturesApi = futures_api
+        self._futures_api: Optional['FuturesApi'] = futures_api  # not needed for spot market type
         self._order_storage: OrderStorage = order_storage
+        self._position_manager: PositionManager = position_manager
+        self._symbol_watcher: Optional[SymbolWatcher] = symbol_watcher  # not needed for paper trading
+        self._symbol_registry: SymbolRegistry = symbol_registry
+        self._risk_engine: RiskEngine = risk_engine
         self._logger: Logger = logger
+        self._leverage_engine: Optional[LeverageEngine] = (LeverageEngine(futures_api, futures_max_leverage)
+                                                           if futures_api is not None else None)
+        self.limit_buy_ttl: float = 0  # seconds, 0 = pending limit buy does not expire
+        self.cancel_limit_buy_above_target: bool = False
+
+    def reload(self) -> None:
+        # standby instance takes over orders and positions saved by previous active instance
+        self._order_storage.reload()
+        self._position_manager.reload()
+
+    def watch_symbols(self) -> None:
+        # market data of stored orders and positions, called after event loop is started
+        symbols = ({order.symbol for order in self._order_storage.get_orders()}
+                   | {position.symbol for position in self._position_manager.get_positions()})
+
+        for symbol in symbols:
+            self._update_watched_symbol(symbol)
+
+    def update_settings(self, spot_trade_amounts: Dict[str, Decimal], futures_trade_amounts: Dict[str, Decimal],
+                        futures_leverage: Union[str, int], futures_max_leverage: int) -> None:
+        # called on event loop between messages, every message is processed with one version of settings
+        self.check_settings(spot_trade_amounts, futures_trade_amounts, futures_leverage, futures_max_leverage)
+        self._trade_amounts = {
+            self.MARKET_TYPE_SPOT: spot_trade_amounts,
+            self.MARKET_TYPE_FUTURES: futures_trade_amounts,
+        }
+        self._futures_leverage = futures_leverage
+
+        if self._leverage_engine is not None:
+            self._leverage_engine.max_leverage = futures_max_leverage
 
     def process_channel_message(self, content: str, parent_content: Optional[str]) -> None:
-        message = MessageParser.parse(content, parent_content)
+        self.process_message(MessageParser.parse(content, parent_content))
+
+    def process_message(self, message: Message, trade_amounts: Optional[TradeAmounts] = None) -> None:
+        # parsed message can be shared by live and paper trading instance,
+        # channel can override trade amounts of market types
+        trade_amounts = {**self._trade_amounts, **(trade_amounts or {})}
 
         if isinstance(message, BuyMessage):
-            return self._process_channel_buy(message)
+            return self._process_channel_buy(message, trade_amounts)
         elif isinstance(message, SellMessage):
-            return self._process_channel_sell(message)
+            return self._process_channel_sell(message, trade_amounts)
 
         raise UnknownMessage()
 
     def process_api_spot_message(self, msg: dict) -> None:
-        if msg['e'] == 'executionReport':
+        if msg['e'] == 'outboundAccountPosition':
+            self._risk_engine.process_balances(msg['B'])
+        elif msg['e'] == 'executionReport':
             order_list_id = msg['g'] if msg['g'] != -1 else None
             order = Order(symbol=msg['s'], side=msg['S'], order_type=msg['o'], status=msg['X'], order_id=msg['i'],
                           order_list_id=order_list_id, quantity=parse_decimal(msg['l']), price=parse_decimal(msg['L']))
             self._process_api_order(order)
+            self._risk_engine.process_order(msg)
 
     def process_api_futures_message(self, message: dict) -> None:
-        if message['data']['e'] == 'ORDER_TRADE_UPDATE':
-            msg = message['data']['o']
+        if message['e'] == 'ORDER_TRADE_UPDATE':
+            msg = message['o']
             order = Order(symbol=msg['s'], side=msg['S'], order_type=msg['o'], original_type=msg['ot'], status=msg['X'],
                           order_id=msg['i'], order_list_id=None, quantity=parse_decimal(msg['l']),
                           price=parse_decimal(msg['L']), futures=True)
             self._process_api_order(order)
+            self._risk_engine.process_order(msg)
+
+    def expire_limit_orders(self) -> None:
+        # pending limit buy is cancelled after TTL or when price reached first target without filling it,
+        # prices are known only for symbols streamed by symbol watcher (paper prices are not)
+        now = time.time()
+
+        for order in self._order_storage.get_orders():
+            buy_message = order.buy_message
+            assert buy_message is not None
+            price = self._symbol_watcher.get_price(order.symbol) if self._symbol_watcher is not None else None
+
+            if self.limit_buy_ttl != 0 and now - order.created_at >= self.limit_buy_ttl:
+                reason = 'TTL'
+            elif self.cancel_limit_buy_above_target and price is not None and price >= min(buy_message.targets):
+                reason = 'price above target'
+            else:
+                continue
+
+            try:
+                self._expire_limit_order(order, reason)
+            except Exception:
+                # other orders are expired anyway
+                self._logger.log('ERROR', Logger.join_contents(buy_message.content, buy_message.parent_content)
+                                 + '\n\n' + traceback.format_exc())
+
+    def _expire_limit_order(self, order: Order, reason: str) -> None:
+        buy_message = order.buy_message
+        assert buy_message is not None
+        filled_quantity = self._get_api(order.futures).cancel_limit_buy(order.symbol, order.order_id)
+
+        if filled_quantity is None:
+            return  # filled meanwhile, fill is processed from user data stream
+
+        self._order_storage.remove(order)  # cancel event of user data stream finds no stored order
+        market_type = self._get_market_type(order.futures)
+        log_content = Logger.join_contents(buy_message.content, buy_message.parent_content)
+        self._logger.log_message(order.symbol, log_content, [
+            f'{market_type} limit buy order cancelled {order.symbol}',
+            f'reason: {reason}',
+            f'filled: {filled_quantity}',
+        ])
 
-    def _process_channel_buy(self, message: BuyMessage) -> None:
+        if filled_quantity != Decimal(0):
+            # partially filled quantity is protected like filled order
+            self._open_limit_buy_position(order, filled_quantity)
+
+        self._update_watched_symbol(order.symbol)
+
+    def _process_channel_buy(self, message: BuyMessage, trade_amounts: TradeAmounts) -> None:
         symbol = message.symbol
-        futures = self._is_futures_symbol(symbol)
-        amount = self._get_trade_amount(symbol, futures)
+        futures = self._is_futures_symbol(symbol, trade_amounts)
+        amount = self._get_trade_amount(symbol, futures, trade_amounts)
 
         if amount == Decimal(0):
             market_type = self._get_market_type(futures)
@@ -78,18 +184,54 @@ class BombermanCoins:
             )
             return
 
+        reason = self._risk_engine.check(symbol, amount, futures)
+
+        if reason is not None:
+            market_type = self._get_market_type(futures)
+            self._logger.log_event('risk_rejected', symbol=symbol, amount=amount, reason=reason)
+            self._logger.log(
+                f'SKIPPING {market_type} {symbol}',
+                body=Logger.join_contents(message.content, message.parent_content) + f'\n\nRisk: {reason}',
+            )
+            return
+
+        api = self._get_api(futures)
+        api.prefetch(symbol)
+
+        try:
+            self._buy(message, symbol, amount, futures)
+        except:
+            self._update_watched_symbol(symbol)  # streams started for failed buy are stopped
+            raise
+        finally:
+            self._logger.log_event('buy_prefetch', symbol=symbol, **api.finish_prefetch(symbol))
+
+    def _buy(self, message: BuyMessage, symbol: str, amount: Decimal, futures: bool) -> None:
         api = self._get_api(futures)
         current_price = api.get_current_price(symbol)
         self._fix_small_prices(message, current_price)
         buy_price = message.buy_price if message.buy_price is not None else current_price
-        buy_order = self._create_buy_order(message.buy_type, symbol, amount, buy_price, message.targets,
-                                           message.stop_loss, futures)
+        self._check_buy_order(symbol, amount, buy_price, message.targets, message.stop_loss, futures)
+
+        if message.buy_type == BuyMessage.BUY_MARKET:
+            self._execute_market_order(api, api.market_buy, api.market_buy_async, symbol, amount, message,
+                                       lambda buy_order: self._process_buy_order(message, amount, futures, buy_order))
+        elif message.buy_type == BuyMessage.BUY_LIMIT:
+            self._process_buy_order(message, amount, futures, api.limit_buy(symbol, buy_price, amount))
+        else:
+            raise UnknownMessage()
+
+    def _process_buy_order(self, message: BuyMessage, amount: Decimal, futures: bool, buy_order: Order) -> None:
+        symbol = message.symbol
+        api = self._get_api(futures)
+        self._risk_engine.reserve(symbol, amount)
         market_type = self._get_market_type(futures)
         symbol_info = api.get_symbol_info(symbol)
 
         if buy_order.status == Order.STATUS_NEW:
             buy_order.buy_message = message
             self._order_storage.add_limit_order(buy_order)
+            self._update_watched_symbol(symbol)
 
             self._logger.log_message(symbol, Logger.join_contents(message.content, message.parent_content), [
                 f'{market_type} limit buy order created {symbol}',
@@ -97,6 +239,9 @@ class BombermanCoins:
             ])
         elif buy_order.status == Order.STATUS_FILLED:
             api.oco_sell(symbol, buy_order.quantity, message.targets, message.stop_loss)
+            self._position_manager.open(symbol, futures, buy_order.price, buy_order.quantity, message.targets,
+                                        message.stop_loss)
+            self._update_watched_symbol(symbol)
             self._logger.log_message(symbol, Logger.join_contents(message.content, message.parent_content), [
                 f'{market_type} market bought {symbol}',
                 f'price: {round(buy_order.price, symbol_info.price_precision)}',
@@ -126,21 +271,29 @@ class BombermanCoins:
 
             message.stop_loss /= exp
 
-    def _create_buy_order(self, buy_type: str, symbol: str, amount: Decimal, buy_price: Decimal, targets: List[Decimal],
-                          stop_loss: Decimal, futures: bool) -> Order:
+    def _check_buy_order(self, symbol: str, amount: Decimal, buy_price: Decimal, targets: List[Decimal],
+                         stop_loss: Decimal, futures: bool) -> None:
         if futures:
-            self._futures_api.leverage = self._get_futures_leverage(symbol, amount, buy_price, targets, stop_loss)
+            self._get_futures_api().leverage = self._get_futures_leverage(symbol, amount, buy_price, targets, stop_loss)
 
-        api = self._get_api(futures)
-        api.check_min_notional(symbol, buy_price, amount, targets, stop_loss, futures)
+        self._get_api(futures).check_min_notional(symbol, buy_price, amount, targets, stop_loss, futures)
 
-        if buy_type == BuyMessage.BUY_MARKET:
-            return api.market_buy(symbol, amount)
-        elif buy_type == BuyMessage.BUY_LIMIT:
-            assert buy_price is not None
-            return api.limit_buy(symbol, buy_price, amount)
-        else:
-            raise UnknownMessage()
+    def _execute_market_order(self, api: Api, order: Callable[[str, Decimal], Order],
+                              async_order: Callable[[str, Decimal], Awaitable[Order]], symbol: str, size: Decimal,
+                              message: Message, callback: Callable[[Order], None]) -> None:
+        # order waiting for market data runs as event loop task, rest of message is processed when it is filled
+        if not api.async_market_orders:
+            return callback(order(symbol, size))
+
+        def finish(task: 'asyncio.Future[Order]') -> None:
+            try:
+                callback(task.result())
+            except Exception:
+                self._update_watched_symbol(symbol)
+                self._logger.log('ERROR', Logger.join_contents(message.content, message.parent_content) + '\n\n'
+                                 + traceback.format_exc())
+
+        asyncio.ensure_future(async_order(symbol, size)).add_done_callback(finish)
 
     def _get_futures_leverage(self, symbol: str, amount: Decimal, buy_price: Decimal, targets: List[Decimal],
                               stop_loss: Decimal) -> int:
@@ -149,35 +302,35 @@ class BombermanCoins:
 
             return self._futures_leverage
 
-        # calculate leverage based on stop loss
-        leverage = min(int(buy_price / (buy_price - stop_loss)),
-                       self._futures_max_leverage)
-        leverage_divisor = self._get_leverage_divisor(symbol, buy_price, targets, stop_loss,
-                                                      trade_amount=amount / leverage)
-
-        return max(int(leverage / leverage_divisor), 1)
+        assert self._leverage_engine is not None
 
-    def _get_leverage_divisor(self, symbol: str, buy_price: Decimal, targets: List[Decimal], stop_loss: Decimal,
-                              trade_amount: Decimal) -> Decimal:
-        target_amounts, stop_loss_amount = self._spot_api.get_buy_order_amounts(symbol, trade_amount, buy_price,
-                                                                                targets, stop_loss, futures=True)
-        min_notional = self._futures_api.get_symbol_info(symbol).min_notional
+        return self._leverage_engine.get_leverage(symbol, amount, buy_price, targets, stop_loss)
 
-        # calculate leverage divisor when trade amount is smaller than min notional
-        return max(
-            min_notional / stop_loss_amount,
-            *[min_notional / target_amount for target_amount in target_amounts],
-            Decimal(1),
-        )
+    def _process_channel_sell(self, message: SellMessage, trade_amounts: TradeAmounts) -> None:
+        if message.sell_type == SellMessage.SELL_PARTIAL:
+            return self._process_channel_partial_sell(message, trade_amounts)
 
-    def _process_channel_sell(self, message: SellMessage) -> None:
         assert message.sell_type == SellMessage.SELL_MARKET
         symbol = message.symbol
-        futures = self._is_futures_symbol(symbol)
+        futures = self._is_futures_symbol(symbol, trade_amounts)
+        start = time.perf_counter()
         quantity = self._get_sell_quantity(symbol, futures)
+        quantity_time = time.perf_counter()
+        api = self._get_api(futures)
+        self._execute_market_order(api, api.market_sell, api.market_sell_async, symbol, quantity, message,
+                                   lambda sell_order: self._process_sell_order(message, futures, sell_order, start,
+                                                                               quantity_time))
+
+    def _process_sell_order(self, message: SellMessage, futures: bool, sell_order: Order, start: float,
+                            quantity_time: float) -> None:
+        symbol = message.symbol
         api = self._get_api(futures)
-        sell_order = api.market_sell(symbol, quantity)
-        pnl = api.get_sell_order_pnl(sell_order)
+        self._position_manager.close(symbol)
+        self._update_watched_symbol(symbol)
+        sell_time = time.perf_counter()
+        self._logger.log_event('market_sell_timing', symbol=symbol, quantity_ms=(quantity_time - start) * 1000,
+                               sell_ms=(sell_time - quantity_time) * 1000)
+        pnl = self._get_pnl(api, sell_order)
 
         market_type = self._get_market_type(futures)
         symbol_info = api.get_symbol_info(symbol)
@@ -189,18 +342,72 @@ class BombermanCoins:
             'PNL: ' + f'{round(pnl, symbol_info.price_precision)} {currency}' if pnl else 'unknown',
         ])
 
+    def _process_channel_partial_sell(self, message: SellMessage, trade_amounts: TradeAmounts) -> None:
+        symbol = message.symbol
+        futures = self._is_futures_symbol(symbol, trade_amounts)
+        api = self._get_api(futures)
+
+        if message.fraction is not None:
+            # fraction of position quantity is sold, remaining targets keep their prices with smaller quantities
+            target_orders: List[Order] = []
+            quantity = api.resize_target_orders(symbol, message.fraction)
+        else:
+            target_orders = self._select_target_orders(symbol, api.get_target_orders(symbol), message,
+                                                       api.get_symbol_info(symbol).price_precision)
+            assert len(target_orders) != 0, f'No target orders to close {symbol}'
+            quantity = api.cancel_target_orders(symbol, target_orders)
+
+        self._execute_market_order(api, api.market_sell, api.market_sell_async, symbol, quantity, message,
+                                   lambda sell_order: self._process_partial_sell_order(message, futures, target_orders,
+                                                                                       sell_order))
+
+    def _process_partial_sell_order(self, message: SellMessage, futures: bool, target_orders: List[Order],
+                                    sell_order: Order) -> None:
+        symbol = message.symbol
+        api = self._get_api(futures)
+        self._position_manager.process_partial_sell(symbol, [order.price for order in target_orders])
+        self._update_watched_symbol(symbol)
+
+        if message.stop_loss_to_entry:
+            self._position_manager.move_stop_loss_to_entry(symbol)
+
+        pnl = self._get_pnl(api, sell_order)
+        market_type = self._get_market_type(futures)
+        symbol_info = api.get_symbol_info(symbol)
+        currency = self._get_currency(symbol)
+        position = self._position_manager.get(symbol)
+        log_content = Logger.join_contents(message.content, message.parent_content)
+        self._logger.log_message(symbol, log_content, [
+            f'{market_type} partially market sold {symbol}',
+            'closed TP: ' + ', '.join(f'{round(order.price, symbol_info.price_precision)}' for order in target_orders)
+            if message.fraction is None else f'closed: {round(message.fraction * 100)}% of position',
+            f'price: {round(sell_order.price, symbol_info.price_precision)}',
+            'PNL: ' + f'{round(pnl, symbol_info.price_precision)} {currency}' if pnl else 'unknown',
+            f'SL: {round(position.stop_loss, symbol_info.price_precision)}' if position is not None else 'SL: unknown',
+        ])
+
+    def _select_target_orders(self, symbol: str, orders: List[Order], message: SellMessage,
+                              price_precision: int) -> List[Order]:
+        assert message.targets is not None
+        position = self._position_manager.get(symbol)
+
+        if position is None:
+            # without known position target numbers are counted from open targets
+            return [orders[number - 1] for number in message.targets if number <= len(orders)]
+
+        # order prices are rounded by exchange
+        prices = {round(position.initial_targets[number - 1], price_precision) for number in message.targets
+                  if number <= len(position.initial_targets)}
+
+        return [order for order in orders if round(order.price, price_precision) in prices]
+
     def _get_sell_quantity(self, symbol: str, futures: bool) -> Decimal:
         if futures:
-            total_quantity = self._futures_api.get_open_position_quantity(symbol)
+            total_quantity = self._get_futures_api().get_open_position_quantity(symbol)
             assert total_quantity != Decimal(0), f'Empty futures position {symbol}'
         else:
-            oco_orders = self._spot_api.get_oco_sell_orders(symbol)
-            assert len(oco_orders) != 0, f'Empty spot OCO sell orders'
-            total_quantity = Decimal(0)
-
-            for limit_maker, _ in oco_orders:
-                self._spot_api.cancel_order(limit_maker.symbol, limit_maker.order_id)
-                total_quantity += limit_maker.quantity
+            total_quantity = self._spot_api.cancel_open_orders(symbol)
+            assert total_quantity != Decimal(0), f'Empty spot OCO sell orders'
 
         return total_quantity
 
@@ -218,29 +425,37 @@ class BombermanCoins:
 
         if api_order.status == Order.STATUS_CANCELED:
             self._order_storage.remove(buy_order)
+            self._update_watched_symbol(buy_order.symbol)
         elif api_order.status == Order.STATUS_FILLED:
-            buy_message = buy_order.buy_message
-            assert buy_message is not None
-
-            api = self._get_api(buy_order.futures)
-            api.oco_sell(buy_order.symbol, api_order.quantity, buy_message.targets,
-                         buy_message.stop_loss)
             self._order_storage.remove(buy_order)
-
-            market_type = self.MARKET_TYPE_FUTURES if api_order.futures else self.MARKET_TYPE_SPOT
-            symbol_info = self._spot_api.get_symbol_info(buy_order.symbol)
-            log_content = Logger.join_contents(buy_message.content, buy_message.parent_content)
-            self._logger.log_message(buy_message.symbol, log_content, [
-                f'{market_type} limit bought {buy_order.symbol}',
-                f'price: {round(buy_order.price, symbol_info.price_precision)}',
-                'Sell order created',
-                'TP: ' + ', '.join(f'{round(price, symbol_info.price_precision)}' for price in buy_message.targets),
-                f'SL: {round(buy_message.stop_loss, symbol_info.price_precision)}',
-            ])
+            self._open_limit_buy_position(buy_order, api_order.quantity)
+            self._update_watched_symbol(buy_order.symbol)
+
+    def _open_limit_buy_position(self, buy_order: Order, quantity: Decimal) -> None:
+        buy_message = buy_order.buy_message
+        assert buy_message is not None
+        api = self._get_api(buy_order.futures)
+        api.oco_sell(buy_order.symbol, quantity, buy_message.targets, buy_message.stop_loss)
+        self._position_manager.open(buy_order.symbol, buy_order.futures, buy_order.price, quantity,
+                                    buy_message.targets, buy_message.stop_loss)
+
+        market_type = self._get_market_type(buy_order.futures)
+        symbol_info = api.get_symbol_info(buy_order.symbol)
+        log_content = Logger.join_contents(buy_message.content, buy_message.parent_content)
+        self._logger.log_message(buy_message.symbol, log_content, [
+            f'{market_type} limit bought {buy_order.symbol}',
+            f'price: {round(buy_order.price, symbol_info.price_precision)}',
+            f'quantity: {quantity}',
+            'Sell order created',
+            'TP: ' + ', '.join(f'{round(price, symbol_info.price_precision)}' for price in buy_message.targets),
+            f'SL: {round(buy_message.stop_loss, symbol_info.price_precision)}',
+        ])
 
     def _process_api_filled_oco_sell_order(self, sell_order: Order) -> None:
+        self._position_manager.process_filled_sell_order(sell_order)
+        self._update_watched_symbol(sell_order.symbol)
         api = self._get_api(sell_order.futures)
-        pnl = api.get_sell_order_pnl(sell_order)
+        pnl = self._get_pnl(api, sell_order)
         market_type = self._get_market_type(sell_order.futures)
         typ = (sell_order.original_type or sell_order.type).replace('_', ' ').lower()
         symbol_info = api.get_symbol_info(sell_order.symbol)
@@ -251,6 +466,15 @@ class BombermanCoins:
             'PNL: ' + f'{round(pnl, symbol_info.price_precision)} {currency}' if pnl else 'unknown',
         ])
 
+    def _get_pnl(self, api: Api, sell_order: Order) -> Optional[Decimal]:
+        # PNL is only logged, so it is not requested when rate limit is used by orders
+        try:
+            return api.get_sell_order_pnl(sell_order)
+        except RateLimitExceeded:
+            self._logger.log_event('pnl_skipped', symbol=sell_order.symbol, order_id=sell_order.order_id)
+
+            return None
+
     @staticmethod
     def _is_api_filled_oco_sell_order(order: Order) -> bool:
         if order.status != Order.STATUS_FILLED:
@@ -262,28 +486,57 @@ class BombermanCoins:
         else:
             return order.type in (Order.TYPE_LIMIT_MAKER, Order.TYPE_STOP_LOSS_LIMIT)
 
-    def _get_trade_amount(self, symbol: str, futures: bool) -> Decimal:
+    def _update_watched_symbol(self, symbol: str) -> None:
+        # market data are streamed only for symbols with pending order or open position,
+        # order book only for spot positions, so market sell does not wait for it
+        if self._symbol_watcher is None:
+            return
+
+        position = self._position_manager.get(symbol)
+
+        if self._order_storage.has_symbol(symbol) or position is not None:
+            self._symbol_watcher.add_symbol(symbol)
+        else:
+            self._symbol_watcher.remove(symbol)
+
+        if position is not None and not position.futures:
+            self._spot_api.watch_depth(symbol)
+        else:
+            self._spot_api.unwatch_depth(symbol)
+
+    @classmethod
+    def check_settings(cls, spot_trade_amounts: Dict[str, Decimal], futures_trade_amounts: Dict[str, Decimal],
+                        futures_leverage: Union[str, int], futures_max_leverage: int) -> None:
+        for amount in (*spot_trade_amounts.values(), *futures_trade_amounts.values()):
+            assert amount >= Decimal(0), f'Negative trade amount {amount}'
+
+        assert (isinstance(futures_leverage, int) and 1 <= futures_leverage <= cls._MAX_LEVERAGE
+                or futures_leverage == cls.LEVERAGE_SMART), f'Invalid leverage {futures_leverage}'
+        assert isinstance(futures_max_leverage, int) and 1 <= futures_max_leverage <= cls._MAX_LEVERAGE, (
+            f'Invalid max leverage {futures_max_leverage}')
+
+    def _get_trade_amount(self, symbol: str, futures: bool, trade_amounts: TradeAmounts) -> Decimal:
         currency = self._get_currency(symbol)
         market_type = self._get_market_type(futures)
-        amounts = self._trade_amounts[market_type]
+        amounts = trade_amounts[market_type]
 
         return amounts.get(currency, Decimal(0))
 
-    def _is_futures_symbol(self, symbol: str) -> bool:
-        return (self._market_type == self.MARKET_TYPE_FUTURES and self._futures_api.is_futures_symbol(symbol)
-                and self._get_trade_amount(symbol, futures=True) != Decimal(0))
+    def _is_futures_symbol(self, symbol: str, trade_amounts: TradeAmounts) -> bool:
+        return (self._market_type == self.MARKET_TYPE_FUTURES and self._symbol_registry.is_futures(symbol)
+                and self._get_trade_amount(symbol, True, trade_amounts) != Decimal(0))
 
     def _get_api(self, futures: bool) -> Api:
-        return self._futures_api if futures else self._spot_api
+        return self._get_futures_api() if futures else self._spot_api
+
+    def _get_futures_api(self) -> 'FuturesApi':
+        assert self._futures_api is not None, 'Futures API is not enabled'
+
+        return self._futures_api
 
     @classmethod
     def _get_market_type(cls, futures: bool) -> str:
         return cls.MARKET_TYPE_FUTURES if futures else cls.MARKET_TYPE_SPOT
 
-    @staticmethod
-    def _get_currency(symbol: str) -> str:
-        for currency in ('USDT', 'BTC'):
-            if currency in symbol:
-                return currency
-        else:
-            raise Exception(f'Unknown currency for {symbol}')
+    def _get_currency(self, symbol: str) -> str:
+        return self._symbol_registry.get_quote(symbol)
@@ -0,0 +1,109 @@
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type, TYPE_CHECKING
+
+from automation.message.message import Message
+from automation.message.unknown_message import UnknownMessage
+from automation.metrics import Metrics
+from automation.parser.buy_message_parser import BuyMessageParser
+from automation.parser.message_parser import MessageParser
+from automation.parser.parser import Parser
+from automation.parser.sell_message_parser import SellMessageParser
+
+if TYPE_CHECKING:
+    from automation.bomberman_coins import TradeAmounts
+
+OFFICIAL_CHANNEL = 759070661888704613
+
+
+class Channel:
+    def __init__(self, channel_id: int, name: str, parsers: Tuple[Type[Parser], ...],
+                 trade_amounts: Optional['TradeAmounts'], test_user: Optional[str]) -> None:
+        self.channel_id: int = channel_id
+        self.name: str = name
+        self.parsers: Tuple[Type[Parser], ...] = parsers
+        self.trade_amounts: Optional['TradeAmounts'] = trade_amounts  # None = trade amounts of app
+        self.test_user: Optional[str] = test_user  # only messages of this user are processed
+        self.messages: int = 0
+        self.unknown_messages: int = 0
+
+
+class ChannelRouter:
+    # messages of all followed channels come through one discord connection, every channel has its own parsers
+    # and trade amounts while API clients and caches are shared
+    PARSERS: Dict[str, Type[Parser]] = {'buy': BuyMessageParser, 'sell': SellMessageParser}
+
+    def __init__(self, channels: Iterable[Channel], metrics: Metrics) -> None:
+        self._channels: Dict[int, Channel] = {channel.channel_id: channel for channel in channels}
+        self._metrics: Metrics = metrics
+
+    @classmethod
+    def from_config(cls, discord_config: Dict[str, Any], metrics: Metrics) -> 'ChannelRouter':
+        return cls(cls.parse_channels(discord_config), metrics)
+
+    def update_channels(self, parsed_channels: List[Channel]) -> None:
+        # reloaded channels are updated in place, so their message counters continue
+        channels = {}
+
+        for channel in parsed_channels:
+            current = self._channels.get(channel.channel_id)
+
+            if current is not None:
+                current.name, current.parsers = channel.name, channel.parsers
+                current.trade_amounts, current.test_user = channel.trade_amounts, channel.test_user
+                channel = current
+
+            channels[channel.channel_id] = channel
+
+        self._channels = channels
+
+    @property
+    def channels(self) -> List[Channel]:
+        return list(self._channels.values())
+
+    def get(self, channel_id: int, author: str) -> Optional[Channel]:
+        channel = self._channels.get(channel_id)
+
+        if channel is None or (channel.test_user is not None and author != channel.test_user):
+            return None
+
+        return channel
+
+    def find(self, channel_id: int) -> Optional[Channel]:
+        # channel of message already filtered by ingestion process
+        return self._channels.get(channel_id)
+
+    def parse(self, channel: Channel, content: str, parent_content: Optional[str]) -> Message:
+        start = time.perf_counter()
+        channel.messages += 1
+        self._metrics.increment(f'channel_{channel.name}_messages')
+
+        try:
+            return MessageParser.parse(content, parent_content, channel.parsers)
+        except UnknownMessage:
+            channel.unknown_messages += 1
+            self._metrics.increment(f'channel_{channel.name}_unknown_messages')
+            raise
+        finally:
+            self._metrics.observe(f'channel_{channel.name}_parse_seconds', time.perf_counter() - start)
+
+    def get_unknown_rates(self) -> Dict[str, float]:
+        return {channel.name: channel.unknown_messages / channel.messages if channel.messages != 0 else 0.0
+                for channel in self._channels.values()}
+
+    @classmethod
+    def parse_channels(cls, discord_config: Dict[str, Any]) -> List[Channel]:
+        # main channel uses app settings, other channels can override parsers and trade amounts,
+        # raises when config is not valid
+        channel_id = discord_config['channel']
+        test_user = discord_config.get('test_user') if channel_id != OFFICIAL_CHANNEL else None
+        channels = [Channel(channel_id, 'main', MessageParser.PARSERS, None, test_user)]
+
+        for channel_id, values in (discord_config.get('channels') or {}).items():
+            values = values or {}
+            parsers = tuple(cls.PARSERS[name] for name in values.get('parsers', cls.PARSERS.keys()))
+            trade_amounts = ({market_type.upper(): amounts for market_type, amounts in values['trade_amount'].items()}
+                             if values.get('trade_amount') is not None else None)
+            channels.append(Channel(int(channel_id), values.get('name', str(channel_id)), parsers, trade_amounts,
+                                    values.get('test_user')))
+
+        return channels
@@ -0,0 +1,77 @@
+import os
+import traceback
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from automation.functions import get_config_path, load_config
+from automation.logger import Logger
+
+Changes = Dict[str, Tuple[Any, Any]]  # dotted key: (old value, new value)
+Apply = Callable[[Dict[str, Any], Changes], Callable[[], None]]  # validates config, returns function applying it
+
+
+def diff_configs(old: Dict[str, Any], new: Dict[str, Any], prefix: str = '') -> Changes:
+    changes: Changes = {}
+
+    for key in old.keys() | new.keys():
+        old_value, new_value = old.get(key), new.get(key)
+
+        if isinstance(old_value, dict) and isinstance(new_value, dict):
+            changes.update(diff_configs(old_value, new_value, f'{prefix}{key}.'))
+        elif old_value != new_value:
+            changes[f'{prefix}{key}'] = (old_value, new_value)
+
+    return changes
+
+
+class ConfigWatcher:
+    # polls modification time of config file, new config is applied on event loop between messages
+    _SECRET_KEYS = ('key', 'secret', 'token', 'password')
+
+    def __init__(self, file_name: Optional[str], config: Dict[str, Any],
+                 apply: Apply, logger: Logger, interval: float = 2) -> None:
+        self._file_name: Optional[str] = file_name
+        self._config: Dict[str, Any] = config
+        self._apply: Apply = apply
+        self._logger: Logger = logger
+        self._interval: float = interval
+        self._mtime: float = self._get_mtime()
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    def check(self) -> None:
+        # called every interval by scheduler
+        mtime = self._get_mtime()
+
+        if mtime != self._mtime:
+            self._mtime = mtime
+            self.reload()
+
+    def reload(self) -> str:
+        try:
+            config = load_config(self._file_name)
+            changes = diff_configs(self._config, config)
+
+            if len(changes) == 0:
+                return 'No changes'
+
+            # whole config is validated before any part of it is applied, so invalid one changes nothing
+            commit = self._apply(config, changes)
+        except Exception:
+            self._logger.log_event('config_invalid', error=traceback.format_exc())
+            return 'Config is not valid, previous one is used'
+
+        commit()  # only assignments of validated values
+        self._config = config
+        logged_changes = {key: ('***', '***') if key.split('.')[-1] in self._SECRET_KEYS else values
+                          for key, values in changes.items()}
+        self._logger.log_event('config_reloaded', changes=logged_changes)
+
+        return '\n'.join(f'{key}: {old} -> {new}' for key, (old, new) in sorted(logged_changes.items()))
+
+    def _get_mtime(self) -> float:
+        try:
+            return os.stat(get_config_path(self._file_name)).st_mtime
+        except OSError:
+            return 0
@@ -0,0 +1,46 @@
+import asyncio
+import os
+from typing import Callable, Dict, List, Optional
+
+from automation.logger import Logger
+
+Command = Callable[[List[str]], str]
+
+
+class ControlServer:
+    # local unix socket accepting one line commands, e.g. `echo "profile 30" | nc -U data/control.sock`
+    def __init__(self, path: str, logger: Logger) -> None:
+        self._path: str = path
+        self._logger: Logger = logger
+        self._commands: Dict[str, Command] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def add_command(self, name: str, command: Command) -> None:
+        assert name not in self._commands
+        self._commands[name] = command
+
+    async def start(self) -> None:
+        if os.path.exists(self._path):
+            os.remove(self._path)  # left by previous process
+
+        self._server = await asyncio.start_unix_server(self._handle, self._path)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            os.remove(self._path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        line = (await reader.readline()).decode().strip()
+        name, *args = line.split() or ['']
+
+        try:
+            response = self._commands[name](args) if name in self._commands else f'Unknown command {name}'
+        except Exception as e:
+            response = f'ERROR {e!r}'
+
+        self._logger.log_event('control_command', command=line, response=response)
+        writer.write(f'{response}\n'.encode())
+        await writer.drain()
+        writer.close()
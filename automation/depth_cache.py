@@ -0,0 +1,135 @@
+import asyncio
+import time
+from decimal import Decimal
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from automation.functions import parse_decimal
+
+PriceLevel = Tuple[Decimal, Decimal]  # price, quantity
+
+
+class DepthCache:
+    def __init__(self, symbol: str) -> None:
+        self.symbol: str = symbol
+        self._bids: Dict[Decimal, Decimal] = {}
+        self._asks: Dict[Decimal, Decimal] = {}
+        self._last_update_id: Optional[int] = None
+        self._pending: List[Dict[str, Any]] = []  # diff events received before snapshot
+        self.loading: bool = False  # snapshot is requested by manager
+        self._lock: Lock = Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._last_update_id is not None
+
+    def apply_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        with self._lock:
+            self._bids = {parse_decimal(price): parse_decimal(quantity) for price, quantity in snapshot['bids']}
+            self._asks = {parse_decimal(price): parse_decimal(quantity) for price, quantity in snapshot['asks']}
+            self._last_update_id = snapshot['lastUpdateId']
+            pending, self._pending = self._pending, []
+
+            for event in pending:
+                if not self._apply_diff(event):
+                    break
+
+    def apply_diff(self, event: Dict[str, Any]) -> bool:
+        with self._lock:
+            if self._last_update_id is None:
+                self._pending.append(event)
+                return True
+
+            return self._apply_diff(event)
+
+    def get_bids(self) -> List[PriceLevel]:
+        with self._lock:
+            return sorted(self._bids.items(), reverse=True)
+
+    def get_asks(self) -> List[PriceLevel]:
+        with self._lock:
+            return sorted(self._asks.items())
+
+    def _apply_diff(self, event: Dict[str, Any]) -> bool:
+        assert self._last_update_id is not None
+
+        if event['u'] <= self._last_update_id:
+            return True  # already included in snapshot
+
+        if event['U'] > self._last_update_id + 1:
+            # some event was missed, cache needs new snapshot
+            self._last_update_id = None
+            self._pending = []
+            return False
+
+        for levels, updates in ((self._bids, event['b']), (self._asks, event['a'])):
+            for price, quantity in updates:
+                price, quantity = parse_decimal(price), parse_decimal(quantity)
+
+                if quantity == Decimal(0):
+                    levels.pop(price, None)
+                else:
+                    levels[price] = quantity
+
+        self._last_update_id = event['u']
+
+        return True
+
+
+class DepthCacheManager:
+    _WAIT_INTERVAL = 0.01  # seconds
+
+    def __init__(self, load_snapshot: Callable[[str], Dict[str, Any]],
+                 start_socket: Callable[[str, Callable[[Dict[str, Any]], None]], str],
+                 stop_socket: Callable[[str], None]) -> None:
+        self._load_snapshot: Callable[[str], Dict[str, Any]] = load_snapshot
+        self._start_socket: Callable[[str, Callable[[Dict[str, Any]], None]], str] = start_socket
+        self._stop_socket: Callable[[str], None] = stop_socket
+        self._caches: Dict[str, DepthCache] = {}
+        self._socket_keys: Dict[str, str] = {}
+
+    def watch(self, symbol: str) -> None:
+        if symbol not in self._caches:
+            cache = DepthCache(symbol)
+            self._caches[symbol] = cache
+            self._socket_keys[symbol] = self._start_socket(symbol, lambda msg: self._process_message(cache, msg))
+
+    def unwatch(self, symbol: str) -> None:
+        if symbol in self._caches:
+            del self._caches[symbol]
+            self._stop_socket(self._socket_keys.pop(symbol))
+
+    def get(self, symbol: str) -> Optional[DepthCache]:
+        cache = self._caches.get(symbol)
+
+        return cache if cache is not None and cache.ready else None
+
+    async def wait(self, symbol: str, timeout: float) -> Optional[DepthCache]:
+        # order book of symbol which is not streamed yet is received while event loop runs other tasks,
+        # None = cache is not ready within timeout
+        self.watch(symbol)
+        deadline = time.monotonic() + timeout
+
+        while self.get(symbol) is None and time.monotonic() < deadline:
+            await asyncio.sleep(self._WAIT_INTERVAL)
+
+        return self.get(symbol)
+
+    def _process_message(self, cache: DepthCache, msg: Dict[str, Any]) -> None:
+        if msg.get('e') != 'depthUpdate':
+            return
+
+        # snapshot is loaded when first event arrives, so it does not slow down order placement
+        if (not cache.apply_diff(msg) or not cache.ready) and not cache.loading:
+            self._load(cache)
+
+    def _load(self, cache: DepthCache) -> None:
+        # snapshot request runs in thread, diff events are buffered by cache until it is applied on event loop
+        def apply(future: 'asyncio.Future[Dict[str, Any]]') -> None:
+            cache.loading = False
+
+            if self._caches.get(cache.symbol) is cache:
+                cache.apply_snapshot(future.result())  # failed load is retried with next event
+
+        cache.loading = True
+        asyncio.get_event_loop().run_in_executor(None, self._load_snapshot, cache.symbol).add_done_callback(apply)
@@ -1,28 +1,76 @@
 import os
+from copy import deepcopy
 from decimal import Decimal
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import yaml
 
+# sections added after first release, missing ones keep their features off, so older config.yaml still works
+CONFIG_DEFAULTS: Dict[str, Any] = {
+    'app': {
+        'spot': {
+            'depth_execution': {'enabled': False, 'max_slippage': 0.5, 'max_slices': 3},
+        },
+        'position': {'breakeven': False, 'trailing_stop': 0},
+        'risk': {'max_positions': 0, 'max_symbol_amount': {}, 'max_currency_amount': {}, 'max_total_amount': 0},
+        'limit_buy': {'ttl': 0, 'cancel_above_target': False},
+        'prefetch': False,
+        'processes': {'split': False, 'socket': 'data/signals.sock'},
+        'standby': {'enabled': False, 'lease_file': 'data/active.lock', 'journal_file': 'data/journal.log'},
+        'paper': {
+            'enabled': False,
+            'spot': {'trade_amount': {}},
+            'futures': {'trade_amount': {}, 'leverage': 'SMART', 'max_leverage': 10},
+        },
+    },
+}
 
-def load_config(file_name: str = None) -> Dict[str, Any]:
+
+def get_config_path(file_name: Optional[str] = None) -> str:
     file_name = file_name if file_name is not None else 'config.yaml'
     current_dir = os.path.dirname(os.path.realpath(__file__))
-    config_file = os.path.join(current_dir, '../', file_name)
 
-    with open(config_file) as h:
+    return os.path.join(current_dir, '../', file_name)
+
+
+def load_config(file_name: Optional[str] = None) -> Dict[str, Any]:
+    with open(get_config_path(file_name)) as h:
         config = yaml.safe_load(h)
 
+    set_defaults(config, CONFIG_DEFAULTS)
+
     def to_decimal(values: Dict) -> None:
         for key, value in values.items():
             values[key] = Decimal(str(value))
 
     to_decimal(config['app']['spot']['trade_amount'])
     to_decimal(config['app']['futures']['trade_amount'])
+    depth_execution = config['app']['spot']['depth_execution']
+    depth_execution['max_slippage'] = Decimal(str(depth_execution['max_slippage']))
+    position = config['app']['position']
+    position['trailing_stop'] = Decimal(str(position['trailing_stop']))
+    risk = config['app']['risk']
+    to_decimal(risk['max_symbol_amount'])
+    to_decimal(risk['max_currency_amount'])
+    risk['max_total_amount'] = Decimal(str(risk['max_total_amount']))
+    to_decimal(config['app']['paper']['spot']['trade_amount'])
+    to_decimal(config['app']['paper']['futures']['trade_amount'])
+
+    for channel in (config['discord'].get('channels') or {}).values():
+        for amounts in ((channel or {}).get('trade_amount') or {}).values():
+            to_decimal(amounts)
 
     return config
 
 
+def set_defaults(values: Dict[str, Any], defaults: Dict[str, Any]) -> None:
+    for key, default in defaults.items():
+        if values.get(key) is None:
+            values[key] = deepcopy(default)
+        elif isinstance(default, dict):
+            set_defaults(values[key], default)
+
+
 def parse_decimal(value: str) -> Decimal:
     if '.' in value:
         value = value.rstrip('0')
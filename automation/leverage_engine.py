@@ -0,0 +1,47 @@
+from decimal import Decimal
+from typing import List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from automation.api.futures_api import FuturesApi
+
+
+class LeverageEngine:
+    # symbol infos are cached from futures exchange info, so leverage of signal is computed without requests
+    def __init__(self, futures_api: 'FuturesApi', max_leverage: int) -> None:
+        assert max_leverage >= 1
+        self._futures_api: 'FuturesApi' = futures_api
+        self._max_leverage: int = max_leverage
+
+    @property
+    def max_leverage(self) -> int:
+        return self._max_leverage
+
+    @max_leverage.setter
+    def max_leverage(self, max_leverage: int) -> None:
+        assert max_leverage >= 1
+        self._max_leverage = max_leverage
+
+    def get_leverage(self, symbol: str, amount: Decimal, buy_price: Decimal, targets: List[Decimal],
+                     stop_loss: Decimal) -> int:
+        # leverage based on stop loss, reduced when orders would be smaller than min notional
+        leverage = min(int(buy_price / (buy_price - stop_loss)), self._max_leverage)
+
+        min_notional = self._futures_api.get_symbol_info(symbol).min_notional
+        target_amounts, stop_loss_amount = self._futures_api.get_buy_order_amounts(symbol, amount / leverage,
+                                                                                   buy_price, targets, stop_loss,
+                                                                                   futures=True)
+
+        return self._reduce_leverage(leverage, min_notional, target_amounts, stop_loss_amount)
+
+    @staticmethod
+    def _reduce_leverage(leverage: int, min_notional: Decimal, target_amounts: List[Decimal],
+                         stop_loss_amount: Decimal) -> int:
+        amounts = [stop_loss_amount, *target_amounts]
+
+        if min(amounts) <= Decimal(0):
+            return 1
+
+        # divisor is bigger than one when trade amount is smaller than min notional
+        divisor = max(*[min_notional / amount for amount in amounts], Decimal(1))
+
+        return max(int(leverage / divisor), 1)
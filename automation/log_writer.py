@@ -0,0 +1,100 @@
+import gzip
+import json
+import os
+import shutil
+import time
+from collections import deque
+from threading import Condition, Thread
+from typing import Any, Deque, Dict, IO, List, Optional
+
+
+class LogWriter:
+    def __init__(self, file_path: str, max_bytes: int = 10 * 1024 * 1024, max_age: int = 24 * 60 * 60,
+                 buffer_size: int = 10000, flush_interval: float = 0.5) -> None:
+        self._file_path: str = file_path
+        self._max_bytes: int = max_bytes
+        self._max_age: int = max_age  # seconds
+        self._flush_interval: float = flush_interval
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._condition: Condition = Condition()
+        self._closing: bool = False
+        self._handle: Optional[IO[str]] = None
+        self._segment_started: float = 0
+        self.dropped: int = 0
+        self._thread: Thread = Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        with self._condition:
+            # ring buffer drops oldest record when writer can not keep up
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+
+            self._buffer.append(record)
+            self._condition.notify()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if len(self._buffer) == 0 and not self._closing:
+                    self._condition.wait(self._flush_interval)
+
+                records = list(self._buffer)
+                self._buffer.clear()
+                closing = self._closing
+
+            if len(records) != 0:
+                self._write(records)
+
+            if closing:
+                break
+
+        if self._handle is not None:
+            self._handle.close()
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        data = ''.join(json.dumps(record, default=str, ensure_ascii=False) + '\n' for record in records)
+        handle = self._get_handle(len(data.encode()))
+        handle.write(data)
+        handle.flush()
+
+    def _get_handle(self, size: int) -> IO[str]:
+        if self._handle is None:
+            self._handle = self._open()
+
+        position = self._handle.tell()
+        too_big = position != 0 and position + size > self._max_bytes
+        too_old = time.time() - self._segment_started > self._max_age
+
+        if too_big or too_old:
+            self._handle.close()
+            self._rotate()
+            self._handle = self._open()
+
+        return self._handle
+
+    def _open(self) -> IO[str]:
+        self._segment_started = time.time()
+
+        return open(self._file_path, 'a')
+
+    def _rotate(self) -> None:
+        suffix = time.strftime('%Y%m%d-%H%M%S')
+        rotated, i = f'{self._file_path}.{suffix}', 1
+
+        while os.path.exists(f'{rotated}.gz'):
+            rotated, i = f'{self._file_path}.{suffix}-{i}', i + 1
+
+        os.rename(self._file_path, rotated)
+
+        with open(rotated, 'rb') as source, gzip.open(f'{rotated}.gz', 'wb') as target:
+            shutil.copyfileobj(source, target)
+
+        os.remove(rotated)
@@ -1,13 +1,16 @@
 import smtplib
+import threading
 from datetime import datetime
 from email.message import EmailMessage
-from typing import List, Optional
+from typing import Any, List, Optional
+
+from automation.log_writer import LogWriter
 
 
 class Logger:
     def __init__(self, log_file: str, email_recipient: str, email_host: str, email_user: str,
                  email_password: str) -> None:
-        self._log_file: str = log_file
+        self._writer: LogWriter = LogWriter(log_file)
         self._email_recipient: str = email_recipient
         self._email_host: str = email_host
         self._email_user: str = email_user
@@ -20,10 +23,7 @@ class Logger:
         self.log(subject=', '.join(parts), body=f'{content}\n\n{spot_link}\n{futures_link}\n\n{info}'.strip())
 
     def log(self, subject: str, body: str) -> None:
-        time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        with open(self._log_file, 'a') as h:
-            h.write(f'{time} {subject}\n{body}\n\n')
+        self.log_event('message', subject=subject, body=body)
 
         msg = EmailMessage()
         msg['From'] = self._email_user
@@ -35,6 +35,26 @@ class Logger:
             server.login(self._email_user, self._email_password)
             server.send_message(msg)
 
+    def log_event(self, event: str, **data: Any) -> None:
+        self._writer.write(dict(
+            time=datetime.now().isoformat(timespec='milliseconds'),
+            event=event,
+            thread=threading.current_thread().name,
+            **data,
+        ))
+
+    def close(self) -> None:
+        self._writer.close()
+
     @staticmethod
     def join_contents(content: str, parent_content: Optional[str]) -> str:
         return content + ('\n-----\n' + parent_content if parent_content is not None else '')
+
+
+class PaperLogger(Logger):
+    # paper trading results are only written into log file
+    def __init__(self, log_file: str) -> None:
+        super().__init__(log_file, '', '', '', '')
+
+    def log(self, subject: str, body: str) -> None:
+        self.log_event('message', subject=subject, body=body)
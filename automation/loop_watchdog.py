@@ -0,0 +1,61 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from automation.logger import Logger
+from automation.metrics import Metrics
+
+
+class LoopWatchdog:
+    def __init__(self, metrics: Metrics, logger: Logger, interval: float = 0.1, threshold: float = 0.5) -> None:
+        self._metrics: Metrics = metrics
+        self._logger: Logger = logger
+        self._interval: float = interval  # seconds
+        self._threshold: float = threshold  # seconds
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat: float = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._stopped: threading.Event = threading.Event()
+        self._thread: threading.Thread = threading.Thread(target=self._monitor, name='loop-watchdog', daemon=True)
+
+    def start(self) -> None:
+        # must be called from event loop thread
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = asyncio.get_event_loop().create_task(self._beat())
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _beat(self) -> None:
+        loop = asyncio.get_event_loop()
+
+        while True:
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            self._metrics.observe('loop_lag_seconds', max(loop.time() - expected, 0))
+            self._last_beat = time.monotonic()
+
+    def _monitor(self) -> None:
+        loop_thread_id = self._loop_thread_id
+        assert loop_thread_id is not None
+        blocked_since: Optional[float] = None
+
+        while not self._stopped.wait(self._interval):
+            last_beat = self._last_beat
+            blocked = time.monotonic() - last_beat - self._interval
+
+            if blocked > self._threshold and blocked_since != last_beat:
+                # report every blocking just once, stack shows what is loop doing right now
+                blocked_since = last_beat
+                frame = sys._current_frames().get(loop_thread_id)
+                stack = ''.join(traceback.format_stack(frame)) if frame is not None else ''
+                self._metrics.increment('loop_blocked')
+                self._logger.log_event('loop_blocked', seconds=round(blocked, 3), stack=stack)
@@ -1,11 +1,20 @@
-from typing import Optional
+from decimal import Decimal
+from typing import List, Optional
 
 from automation.message.message import Message
 
 
 class SellMessage(Message):
     SELL_MARKET = 'market'
+    SELL_PARTIAL = 'partial'
 
-    def __init__(self, content: str, parent_content: Optional[str], symbol: str, sell_type: str) -> None:
+    def __init__(self, content: str, parent_content: Optional[str], symbol: str, sell_type: str,
+                 fraction: Optional[Decimal] = None, targets: Optional[List[int]] = None,
+                 stop_loss_to_entry: bool = False) -> None:
         super().__init__(content, parent_content, symbol)
+        # partial sell closes either fraction of position or targets by their number (starting from 1)
+        assert sell_type != self.SELL_PARTIAL or (fraction is None) != (targets is None)
         self.sell_type: str = sell_type
+        self.fraction: Optional[Decimal] = fraction
+        self.targets: Optional[List[int]] = targets
+        self.stop_loss_to_entry: bool = stop_loss_to_entry
@@ -0,0 +1,74 @@
+import json
+import os
+from threading import Lock
+from typing import Any, Dict, List, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)  # seconds
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self._buckets: Tuple[float, ...] = buckets
+        self._counts: List[int] = [0 for _ in range(len(buckets) + 1)]  # last one is for bigger values
+        self._count: int = 0
+        self._total: float = 0
+        self._max: float = 0
+
+    def observe(self, value: float) -> None:
+        for i, bucket in enumerate(self._buckets):
+            if value <= bucket:
+                break
+        else:
+            i = len(self._buckets)
+
+        self._counts[i] += 1
+        self._count += 1
+        self._total += value
+        self._max = max(self._max, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        buckets = {f'le_{bucket}': count for bucket, count in zip(self._buckets, self._counts)}
+        buckets['inf'] = self._counts[-1]
+
+        return dict(count=self._count, sum=self._total, max=self._max, buckets=buckets)
+
+
+class Metrics:
+    def __init__(self, file_path: str) -> None:
+        self._file_path: str = file_path
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, Any] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock: Lock = Lock()
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: Any) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(buckets)
+
+            self._histograms[name].observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                counters=dict(self._counters),
+                gauges=dict(self._gauges),
+                histograms={name: histogram.to_dict() for name, histogram in self._histograms.items()},
+            )
+
+    def write(self) -> None:
+        # rename is atomic, reader never sees half written file
+        tmp_file = f'{self._file_path}.tmp'
+
+        with open(tmp_file, 'w') as h:
+            json.dump(self.snapshot(), h, indent=1, sort_keys=True, default=str)
+
+        os.replace(tmp_file, self._file_path)
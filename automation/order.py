@@ -1,18 +1,18 @@
+import time
 from decimal import Decimal
 from typing import Any, Dict, Optional
 
-from binance.client import Client
-
 from automation.functions import parse_decimal
-from automation.parser.buy_message_parser import BuyMessage
+from automation.message.buy_message import BuyMessage
 
 
 class Order:
-    SIDE_BUY = Client.SIDE_BUY
-    SIDE_SELL = Client.SIDE_SELL
+    # same values as binance.client.Client constants, importing client just for constants is slow
+    SIDE_BUY = 'BUY'
+    SIDE_SELL = 'SELL'
 
-    TYPE_MARKET = Client.ORDER_TYPE_MARKET
-    TYPE_LIMIT = Client.ORDER_TYPE_LIMIT
+    TYPE_MARKET = 'MARKET'
+    TYPE_LIMIT = 'LIMIT'
     TYPE_STOP_MARKET = 'STOP_MARKET'
     TYPE_LIMIT_MAKER = 'LIMIT_MAKER'
     TYPE_STOP_LOSS_LIMIT = 'STOP_LOSS_LIMIT'
@@ -21,6 +21,10 @@ class Order:
     STATUS_FILLED = 'FILLED'
     STATUS_CANCELED = 'CANCELED'
 
+    TIME_IN_FORCE_GTC = 'GTC'
+    TIME_IN_FORCE_IOC = 'IOC'
+    TIME_IN_FORCE_FOK = 'FOK'
+
     def __init__(self, symbol: str, side: str, order_type: str, status: str, order_id: int,
                  order_list_id: Optional[int], quantity: Decimal, price: Decimal, futures: bool = False,
                  original_type: Optional[str] = None) -> None:
@@ -36,6 +40,7 @@ class Order:
         self.futures: bool = futures
         self.original_type: Optional[str] = original_type
         self.buy_message: Optional[BuyMessage] = None
+        self.created_at: float = time.time()
 
     @staticmethod
     def from_dict(values: Dict[str, Any], quantity_key: str, price_key: str = 'price', price: Decimal = None,
@@ -1,4 +1,5 @@
 import pickle
+import time
 from typing import List, Optional
 
 from automation.order import Order
@@ -14,6 +15,12 @@ class OrderStorage:
 
         return orders[0] if len(orders) != 0 else None
 
+    def get_orders(self) -> List[Order]:
+        return list(self._orders)
+
+    def has_symbol(self, symbol: str) -> bool:
+        return any(order.symbol == symbol for order in self._orders)
+
     def add_limit_order(self, order: Order) -> None:
         assert order not in self._orders
         assert order.side == Order.SIDE_BUY
@@ -28,6 +35,10 @@ class OrderStorage:
         self._orders.remove(order)
         self._save()
 
+    def reload(self) -> None:
+        # orders saved by other instance
+        self._orders = self._load()
+
     def _save(self) -> None:
         with open(self._file_path, 'wb') as h:
             pickle.dump(self._orders, h)
@@ -35,6 +46,12 @@ class OrderStorage:
     def _load(self) -> List[Order]:
         try:
             with open(self._file_path, 'rb') as h:
-                return pickle.load(h)
+                orders = pickle.load(h)
         except IOError:
             return []
+
+        for order in orders:
+            if not hasattr(order, 'created_at'):
+                order.created_at = time.time()  # stored before creation time was known, expires after TTL from now
+
+        return orders
@@ -0,0 +1,231 @@
+import asyncio
+import itertools
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from automation.functions import parse_decimal
+from automation.log_writer import LogWriter
+from automation.order import Order
+
+Callback = Callable[[Dict[str, Any]], None]
+
+
+class PriceUnavailable(Exception):
+    # no trade of symbol was streamed yet, live exchange is not requested for price
+    def __init__(self, symbol: str) -> None:
+        super().__init__(f'No streamed price of {symbol}')
+        self.symbol: str = symbol
+
+
+class PaperExchange:
+    # simulated exchange for paper trading, open orders are filled from live trades of shared market data streams,
+    # fills are written into ledger and emitted as user data stream events, fees are not simulated
+    def __init__(self, ledger_file: str, start_socket: Callable[[str, Callback], str],
+                 stop_socket: Callable[[str], None], emit: Callable[[bool, Dict[str, Any]], Any]) -> None:
+        self._ledger: LogWriter = LogWriter(ledger_file)
+        self._start_socket: Callable[[str, Callback], str] = start_socket
+        self._stop_socket: Callable[[str], None] = stop_socket
+        self._emit: Callable[[bool, Dict[str, Any]], Any] = emit  # futures, user data event
+        self._orders: Dict[int, Order] = {}  # open orders
+        self._stop_prices: Dict[int, Decimal] = {}
+        self._positions: Dict[Tuple[str, bool], List[Decimal]] = {}  # quantity, cost by symbol and futures
+        self._pnls: Dict[int, Decimal] = {}  # by sell order id
+        self._prices: Dict[str, Decimal] = {}
+        self._price_waiters: Dict[str, List[Callable[[bool], None]]] = {}
+        self._socket_keys: Dict[str, str] = {}
+        self._order_ids = itertools.count(1)
+        self._order_list_ids = itertools.count(1)
+
+    def get_price(self, symbol: str) -> Decimal:
+        # price of last trade, only symbols with open orders or waiting for price are watched
+        price = self._prices.get(symbol)
+
+        if price is None:
+            raise PriceUnavailable(symbol)
+
+        return price
+
+    def wait_price(self, symbol: str, timeout: float, callback: Callable[[bool], None]) -> None:
+        # callback gets True after first streamed trade of symbol or False after timeout
+        self._price_waiters.setdefault(symbol, []).append(callback)
+        self._watch(symbol)
+
+        def expire() -> None:
+            waiters = self._price_waiters.get(symbol, [])
+
+            if callback in waiters:
+                waiters.remove(callback)
+
+                if len(waiters) == 0:
+                    del self._price_waiters[symbol]
+
+                self._unwatch(symbol)
+                callback(False)
+
+        asyncio.get_event_loop().call_later(timeout, expire)
+
+    def market_order(self, symbol: str, futures: bool, side: str, quantity: Decimal, price: Decimal) -> Order:
+        order = Order(symbol, side, Order.TYPE_MARKET, Order.STATUS_NEW, next(self._order_ids), None, quantity, price,
+                      futures)
+        self._fill(order, price)
+
+        return order
+
+    def limit_order(self, symbol: str, futures: bool, side: str, order_type: str, quantity: Decimal, price: Decimal,
+                    stop_price: Optional[Decimal] = None, order_list_id: Optional[int] = None) -> Order:
+        order = Order(symbol, side, order_type, Order.STATUS_NEW, next(self._order_ids), order_list_id, quantity, price,
+                      futures)
+        self._orders[order.order_id] = order
+
+        if stop_price is not None:
+            self._stop_prices[order.order_id] = stop_price
+
+        self._emit_order(order, Decimal(0), Decimal(0))
+        self._watch(symbol)
+
+        return order
+
+    def oco_order(self, symbol: str, quantity: Decimal, price: Decimal, stop_price: Decimal,
+                  stop_limit_price: Decimal) -> None:
+        order_list_id = next(self._order_list_ids)
+        self.limit_order(symbol, False, Order.SIDE_SELL, Order.TYPE_LIMIT_MAKER, quantity, price,
+                         order_list_id=order_list_id)
+        self.limit_order(symbol, False, Order.SIDE_SELL, Order.TYPE_STOP_LOSS_LIMIT, quantity, stop_limit_price,
+                         stop_price, order_list_id)
+
+    def get_open_orders(self, symbol: str, futures: bool) -> List[Order]:
+        return [order for order in self._orders.values() if order.symbol == symbol and order.futures == futures]
+
+    def is_open(self, order_id: int) -> bool:
+        return order_id in self._orders
+
+    def cancel_order(self, order_id: int) -> Order:
+        order = self._orders.pop(order_id, None)
+        assert order is not None, f'Unknown order {order_id}'
+        self._stop_prices.pop(order_id, None)
+        order.status = Order.STATUS_CANCELED
+        self._emit_order(order, Decimal(0), Decimal(0))
+        self._unwatch(order.symbol)
+
+        return order
+
+    def cancel_order_list(self, order_list_id: int) -> List[Order]:
+        return [self.cancel_order(order.order_id) for order in list(self._orders.values())
+                if order.order_list_id == order_list_id]
+
+    def get_position_quantity(self, symbol: str, futures: bool) -> Decimal:
+        position = self._positions.get((symbol, futures))
+
+        return position[0] if position is not None else Decimal(0)
+
+    def get_pnl(self, order_id: int) -> Optional[Decimal]:
+        return self._pnls.get(order_id)
+
+    def close(self) -> None:
+        for key in self._socket_keys.values():
+            self._stop_socket(key)
+
+        self._socket_keys = {}
+        self._ledger.close()
+
+    def _process_trade(self, symbol: str, msg: Dict[str, Any]) -> None:
+        price = parse_decimal(msg['p'])
+        self._prices[symbol] = price
+
+        for order in [order for order in self._orders.values() if order.symbol == symbol]:
+            # order can be cancelled by fill of other order in this loop
+            if order.order_id not in self._orders or not self._is_triggered(order, price):
+                continue
+
+            del self._orders[order.order_id]
+            stop_price = self._stop_prices.pop(order.order_id, None)
+            self._fill(order, price if stop_price is not None else order.price)
+
+            if order.order_list_id is not None:
+                self.cancel_order_list(order.order_list_id)
+
+        for callback in self._price_waiters.pop(symbol, []):
+            callback(True)
+
+        self._unwatch(symbol)
+
+    def _is_triggered(self, order: Order, price: Decimal) -> bool:
+        stop_price = self._stop_prices.get(order.order_id)
+
+        if stop_price is not None:
+            return price <= stop_price
+        elif order.side == Order.SIDE_BUY:
+            return price <= order.price
+        else:
+            return price >= order.price
+
+    def _fill(self, order: Order, price: Decimal) -> None:
+        key = (order.symbol, order.futures)
+        position = self._positions.setdefault(key, [Decimal(0), Decimal(0)])
+        pnl = None
+
+        if order.type == Order.TYPE_STOP_MARKET:
+            # futures stop market order closes whole position
+            order.quantity = position[0]
+            order.type, order.original_type = Order.TYPE_MARKET, Order.TYPE_STOP_MARKET
+
+        order.status = Order.STATUS_FILLED
+        order.price = price
+
+        if order.side == Order.SIDE_BUY:
+            position[0] += order.quantity
+            position[1] += order.quantity * price
+        else:
+            entry_price = position[1] / position[0] if position[0] != Decimal(0) else price
+            pnl = (price - entry_price) * order.quantity
+            self._pnls[order.order_id] = pnl
+            position[0] -= order.quantity
+            position[1] -= entry_price * order.quantity
+
+        self._ledger.write(dict(
+            time=datetime.now().isoformat(timespec='milliseconds'),
+            symbol=order.symbol,
+            futures=order.futures,
+            side=order.side,
+            type=order.original_type or order.type,
+            quantity=self._format(order.quantity),
+            price=self._format(price),
+            pnl=self._format(pnl) if pnl is not None else None,
+        ))
+        self._emit_order(order, order.quantity, price)
+
+        if position[0] <= Decimal(0):
+            del self._positions[key]
+
+            if order.futures:
+                # reduce only orders are expired with closed position
+                for open_order in self.get_open_orders(order.symbol, True):
+                    self.cancel_order(open_order.order_id)
+
+    def _emit_order(self, order: Order, last_quantity: Decimal, last_price: Decimal) -> None:
+        msg = {
+            's': order.symbol, 'S': order.side, 'o': order.type, 'X': order.status, 'i': order.order_id,
+            'q': str(order.quantity), 'p': str(order.price), 'l': str(last_quantity), 'L': str(last_price),
+            'z': str(order.quantity if order.status == Order.STATUS_FILLED else Decimal(0)),
+        }
+
+        if order.futures:
+            msg['ot'] = order.original_type or order.type
+            self._emit(True, {'e': 'ORDER_TRADE_UPDATE', 'o': msg})
+        else:
+            msg['g'] = order.order_list_id if order.order_list_id is not None else -1
+            self._emit(False, {'e': 'executionReport', **msg})
+
+    @staticmethod
+    def _format(value: Decimal) -> str:
+        return format(value.normalize(), 'f')
+
+    def _watch(self, symbol: str) -> None:
+        if symbol not in self._socket_keys:
+            self._socket_keys[symbol] = self._start_socket(symbol, lambda msg: self._process_trade(symbol, msg))
+
+    def _unwatch(self, symbol: str) -> None:
+        if (symbol in self._socket_keys and symbol not in self._price_waiters
+                and not any(order.symbol == symbol for order in self._orders.values())):
+            self._stop_socket(self._socket_keys.pop(symbol))
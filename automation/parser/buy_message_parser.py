@@ -1,15 +1,21 @@
-import re
 from decimal import Decimal
 from typing import Any, Dict, List, Optional
 
 from automation.message.buy_message import BuyMessage
 from automation.message.unknown_message import UnknownMessage
 from automation.parser.parser import Parser
+from automation.parser.regex_guard import compile_pattern
 
 
 class BuyMessageParser(Parser):
     _NUM = r'\d+(?:\.\d*)?'
     _TARGET = fr'(?:target|take profit)[: ]({_NUM})'
+    _MARKET_BUY = compile_pattern(r'vstup[: ].*market')
+    _LIMIT_BUY = compile_pattern(fr'vstup[: ]({_NUM})')
+    _LIMIT_BUY2 = compile_pattern(fr'limitny (?:vstup|prikaz)[: ]({_NUM})')
+    _TARGETS = compile_pattern(_TARGET)
+    _STOP_LOSS = compile_pattern(fr'stop ?loss[: ]({_NUM})')
+    _TARGET_STOP_LOSS = compile_pattern(fr'{_TARGET}/-{_NUM} ?%')
 
     @classmethod
     def parse(cls, content: str, parent_content: Optional[str]) -> BuyMessage:
@@ -23,17 +29,17 @@ class BuyMessageParser(Parser):
 
     @classmethod
     def _parse_buy(cls, normalized: str) -> Dict[str, Any]:
-        market_match = re.search(r'vstup[: ].*market', normalized)
+        market_match = cls._MARKET_BUY.search(normalized)
 
         if market_match is not None:
             return dict(type=BuyMessage.BUY_MARKET, price=None)
 
-        limit_match = re.search(fr'vstup[: ]({cls._NUM})', normalized)
+        limit_match = cls._LIMIT_BUY.search(normalized)
 
         if limit_match is not None:
             return dict(type=BuyMessage.BUY_LIMIT, price=Decimal(limit_match.group(1)))
 
-        limit_match2 = re.search(fr'limitny (?:vstup|prikaz)[: ]({cls._NUM})', normalized)
+        limit_match2 = cls._LIMIT_BUY2.search(normalized)
 
         if limit_match2 is not None:
             return dict(type=BuyMessage.BUY_LIMIT, price=Decimal(limit_match2.group(1)))
@@ -42,19 +48,19 @@ class BuyMessageParser(Parser):
 
     @classmethod
     def _parse_targets(cls, normalized: str) -> List[Decimal]:
-        targets = [Decimal(price) for price in re.findall(cls._TARGET, normalized)]
+        targets = [Decimal(price) for price in cls._TARGETS.findall(normalized)]
         assert len(targets) != 0, 'No targets found'
 
         return targets
 
     @classmethod
     def _parse_stop_loss(cls, normalized: str, targets: List[Decimal]) -> Decimal:
-        stop_lass_match = re.search(fr'stop ?loss[: ]({cls._NUM})', normalized)
+        stop_lass_match = cls._STOP_LOSS.search(normalized)
 
         if stop_lass_match is not None:
             return Decimal(stop_lass_match.group(1))
 
-        target_match = re.search(fr'{cls._TARGET}/-{cls._NUM} ?%', normalized)
+        target_match = cls._TARGET_STOP_LOSS.search(normalized)
 
         if target_match:
             stop_loss = Decimal(target_match.group(1))
@@ -0,0 +1,108 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from automation.message.buy_message import BuyMessage
+from automation.message.sell_message import SellMessage
+from automation.message.unknown_message import UnknownMessage
+from automation.parser.message_parser import MessageParser
+
+CorpusMessage = Tuple[str, str, Optional[str]]  # message id, content, parent content
+ParseResult = Dict[str, Any]
+
+TYPE_BUY = 'buy'
+TYPE_SELL = 'sell'
+TYPE_UNKNOWN = 'unknown'
+
+
+def load_corpus(file_path: str) -> List[CorpusMessage]:
+    with open(file_path) as h:
+        return [(str(item['id']), item['content'], item.get('parent_content')) for item in json.load(h)]
+
+
+def load_results(file_path: str) -> Dict[str, ParseResult]:
+    try:
+        with open(file_path) as h:
+            return json.load(h)
+    except IOError:
+        return {}
+
+
+def save_results(file_path: str, results: Dict[str, ParseResult]) -> None:
+    with open(file_path, 'w') as h:
+        json.dump(results, h, indent=1, sort_keys=True)
+
+
+def parse_corpus(messages: List[CorpusMessage], workers: Optional[int] = None,
+                 chunk_size: int = 500) -> Dict[str, ParseResult]:
+    chunks = list(_chunks(messages, chunk_size))
+    results: Dict[str, ParseResult] = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_results in executor.map(parse_chunk, chunks):
+            results.update(chunk_results)
+
+    return results
+
+
+def parse_chunk(messages: List[CorpusMessage]) -> Dict[str, ParseResult]:
+    return {message_id: parse_message(content, parent_content) for message_id, content, parent_content in messages}
+
+
+def parse_message(content: str, parent_content: Optional[str]) -> ParseResult:
+    try:
+        message = MessageParser.parse(content, parent_content)
+    except (UnknownMessage, AssertionError):
+        return dict(type=TYPE_UNKNOWN)
+
+    if isinstance(message, BuyMessage):
+        return dict(
+            type=TYPE_BUY,
+            symbol=message.symbol,
+            buy_type=message.buy_type,
+            buy_price=str(message.buy_price) if message.buy_price is not None else None,
+            targets=[str(target) for target in message.targets],
+            stop_loss=str(message.stop_loss),
+        )
+    elif isinstance(message, SellMessage):
+        result: ParseResult = dict(type=TYPE_SELL, symbol=message.symbol, sell_type=message.sell_type)
+
+        if message.sell_type == SellMessage.SELL_PARTIAL:
+            result.update(
+                fraction=str(message.fraction) if message.fraction is not None else None,
+                targets=message.targets,
+                stop_loss_to_entry=message.stop_loss_to_entry,
+            )
+
+        return result
+    else:
+        raise Exception(f'Unknown message {type(message)}')
+
+
+def diff_results(baseline: Dict[str, ParseResult], results: Dict[str, ParseResult]) -> Dict[str, List[str]]:
+    diff: Dict[str, List[str]] = dict(newly_unknown=[], newly_parsed=[], changed=[], added=[])
+
+    for message_id, result in results.items():
+        if message_id not in baseline:
+            diff['added'].append(message_id)
+            continue
+
+        old = baseline[message_id]
+
+        if old == result:
+            continue
+        elif result['type'] == TYPE_UNKNOWN:
+            diff['newly_unknown'].append(message_id)
+        elif old['type'] == TYPE_UNKNOWN:
+            diff['newly_parsed'].append(message_id)
+        else:
+            diff['changed'].append(message_id)
+
+    return diff
+
+
+def _chunks(messages: List[CorpusMessage], chunk_size: int) -> Iterator[List[CorpusMessage]]:
+    assert chunk_size > 0
+
+    for i in range(0, len(messages), chunk_size):
+        yield messages[i:i + chunk_size]
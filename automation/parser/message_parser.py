@@ -1,17 +1,21 @@
-from typing import Optional
+from typing import Optional, Tuple, Type
 
 from automation.message.unknown_message import UnknownMessage
 from automation.parser.buy_message_parser import BuyMessageParser
 from automation.message.message import Message
+from automation.parser.parser import Parser
 from automation.parser.sell_message_parser import SellMessageParser
 
 
 class MessageParser:
+    PARSERS: Tuple[Type[Parser], ...] = (BuyMessageParser, SellMessageParser)
+
     @classmethod
-    def parse(cls, content: str, parent_content: Optional[str]) -> Message:
-        for parser in (BuyMessageParser, SellMessageParser):
+    def parse(cls, content: str, parent_content: Optional[str],
+              parsers: Optional[Tuple[Type[Parser], ...]] = None) -> Message:
+        for parser in parsers if parsers is not None else cls.PARSERS:
             try:
-                # "Type[object]" has no attribute "parse"
+                # parsers implement abstract "parse" method as classmethod
                 return parser.parse(content, parent_content)  # type: ignore
             except UnknownMessage:
                 pass
@@ -1,28 +1,58 @@
-import re
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
 from unidecode import unidecode
 
 from automation.message.message import Message
+from automation.message.unknown_message import UnknownMessage
+from automation.parser.regex_guard import compile_pattern, MAX_CONTENT_LENGTH
+
+if TYPE_CHECKING:
+    from automation.symbol_registry import SymbolRegistry
 
 
 class Parser(ABC):
+    # when set, only listed symbols are parsed from messages
+    symbol_registry: Optional['SymbolRegistry'] = None
+    _SPACES = compile_pattern(r'[ \t]+')
+    _SEPARATOR = compile_pattern(r'([:/])')
+    # lookbehind starts match only at beginning of word, otherwise search is quadratic for long words
+    _SYMBOL = compile_pattern(r'(?<![\da-z])([\da-z]+/(?:usdt?|btc))')
+
     @abstractmethod
     def parse(self, content: str, parent_content: Optional[str]) -> Message:
         pass
 
-    @staticmethod
-    def _normalize(msg: str) -> str:
+    @classmethod
+    def _normalize(cls, msg: str) -> str:
+        if len(msg) > MAX_CONTENT_LENGTH:
+            raise UnknownMessage()
+
         msg = unidecode(msg)  # remove diacritic
-        msg = re.sub(r'[ \t]+', ' ', msg)  # remove multiple spaces, keep new lines
-        msg = re.sub(r'\s*([:/])\s*', r'\1', msg)  # remove spaces around colon and slash
+        msg = cls._SPACES.sub(' ', msg)  # remove multiple spaces, keep new lines
+        # remove spaces around colon and slash, split instead of \s*([:/])\s* which is quadratic for long whitespace
+        parts = cls._SEPARATOR.split(msg)
+        msg = ''.join(part if i % 2 == 1 else cls._strip(part, i != 0, i != len(parts) - 1)
+                      for i, part in enumerate(parts))
 
         return msg.lower()
 
     @staticmethod
-    def _parse_symbol(normalized: str) -> str:
-        symbols = re.findall(r'([\da-z]+/(?:usdt?|btc))', normalized)
+    def _strip(part: str, left: bool, right: bool) -> str:
+        if left:
+            part = part.lstrip()
+
+        return part.rstrip() if right else part
+
+    @classmethod
+    def _parse_symbol(cls, normalized: str) -> str:
+        if cls.symbol_registry is not None:
+            symbols = cls.symbol_registry.find_symbols(normalized)
+            assert len(symbols) == 1, 'None or more than one listed symbol found'
+
+            return symbols[0]
+
+        symbols = cls._SYMBOL.findall(normalized)
         assert len(symbols) == 1, 'None or more than one symbol found'
         symbol = symbols[0].replace('/', '').upper()
 
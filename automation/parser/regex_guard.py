@@ -0,0 +1,60 @@
+import re
+from typing import Any, List, Pattern
+
+try:
+    from re import _parser as sre_parse  # type: ignore  # Python 3.11+
+except ImportError:
+    import sre_parse  # type: ignore
+
+# discord messages have at most 2000 characters (4000 with nitro), longer content is not parsed
+MAX_CONTENT_LENGTH = 4000
+
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+
+
+def compile_pattern(pattern: str, flags: int = 0) -> Pattern[str]:
+    # parser patterns run on untrusted text, so patterns with super-linear backtracking fail already on import
+    problems = audit_pattern(pattern, flags)
+    assert len(problems) == 0, f'Unsafe pattern {pattern}: ' + ', '.join(problems)
+
+    return re.compile(pattern, flags)
+
+
+def audit_pattern(pattern: str, flags: int = 0) -> List[str]:
+    # finds nested unbounded quantifiers like (a+)+ (exponential) and unbounded quantifier at start of pattern
+    # followed by other items like \s*: (quadratic, search retries it from every position of failed run)
+    problems: List[str] = []
+    items = list(sre_parse.parse(pattern, flags))
+    _audit_items(items, False, problems)
+
+    while len(items) != 0 and items[0][0] == sre_parse.SUBPATTERN:
+        items = list(items[0][1][-1]) + items[1:]
+
+    if len(items) > 1 and _is_unbounded_repeat(items[0]):
+        problems.append('leading unbounded quantifier')
+
+    return problems
+
+
+def _audit_items(items: Any, in_repeat: bool, problems: List[str]) -> None:
+    for op, av in items:
+        if op in _REPEATS:
+            unbounded = av[1] == sre_parse.MAXREPEAT
+
+            if unbounded and in_repeat:
+                problems.append('nested unbounded quantifier')
+
+            _audit_items(av[2], in_repeat or unbounded, problems)
+        elif op == sre_parse.SUBPATTERN:
+            _audit_items(av[-1], in_repeat, problems)
+        elif op == sre_parse.BRANCH:
+            for branch in av[1]:
+                _audit_items(branch, in_repeat, problems)
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            _audit_items(av[1], in_repeat, problems)
+
+
+def _is_unbounded_repeat(item: Any) -> bool:
+    op, av = item
+
+    return op in _REPEATS and av[1] == sre_parse.MAXREPEAT
@@ -1,29 +1,46 @@
+from decimal import Decimal
 from typing import Optional
 
 from automation.message.sell_message import SellMessage
 from automation.message.unknown_message import UnknownMessage
 from automation.parser.parser import Parser
+from automation.parser.regex_guard import compile_pattern
 
 
 class SellMessageParser(Parser):
+    _STOP_LOSS_TO_ENTRY = compile_pattern(r'stop ?loss[^.]*na vstup')
+    _TARGETS = compile_pattern(r'(\d)\. ?target')
+
     @classmethod
     def parse(cls, content: str, parent_content: Optional[str]) -> SellMessage:
         normalized = cls._normalize(content)
         parent_normalized = cls._normalize(parent_content) if parent_content is not None else None
-        cls._check_is_sell(normalized)
+        partial = cls._check_is_sell(normalized)
         symbol = cls._parse_message_symbol(normalized, parent_normalized)
 
-        return SellMessage(content, parent_content, symbol, sell_type=SellMessage.SELL_MARKET)
+        if not partial:
+            return SellMessage(content, parent_content, symbol, sell_type=SellMessage.SELL_MARKET)
+
+        stop_loss_to_entry = cls._STOP_LOSS_TO_ENTRY.search(normalized) is not None
+
+        if 'polovicu' in normalized:
+            return SellMessage(content, parent_content, symbol, sell_type=SellMessage.SELL_PARTIAL,
+                               fraction=Decimal(1) / 2, stop_loss_to_entry=stop_loss_to_entry)
+
+        targets = [int(target) for target in cls._TARGETS.findall(normalized)]
+
+        if len(targets) == 0:
+            raise UnknownMessage()
+
+        return SellMessage(content, parent_content, symbol, sell_type=SellMessage.SELL_PARTIAL, targets=targets,
+                           stop_loss_to_entry=stop_loss_to_entry)
 
     @staticmethod
-    def _check_is_sell(normalized: str) -> None:
-        # must contain stop word but can not contain saving word
+    def _check_is_sell(normalized: str) -> bool:
+        # must contain stop word, saving word means that only part of position is sold
         for stop in ('uzavrite', 'ukoncite', 'predajte', 'skoncite'):
             if stop in normalized:
-                if 'zvysok' in normalized or 'polovicu' in normalized:
-                    raise UnknownMessage()
-                else:
-                    return  # is valid sell message
+                return 'zvysok' in normalized or 'polovicu' in normalized
 
         raise UnknownMessage()
 
@@ -0,0 +1,190 @@
+import asyncio
+import pickle
+import time
+import traceback
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from automation.api.api import Api
+from automation.functions import parse_decimal
+from automation.logger import Logger
+from automation.order import Order
+
+Callback = Callable[[Dict[str, Any]], None]
+
+
+class Position:
+    def __init__(self, symbol: str, futures: bool, entry_price: Decimal, quantity: Decimal, targets: List[Decimal],
+                 stop_loss: Decimal) -> None:
+        self.symbol: str = symbol
+        self.futures: bool = futures
+        self.entry_price: Decimal = entry_price
+        self.quantity: Decimal = quantity  # bought quantity
+        self.initial_targets: List[Decimal] = list(targets)
+        self.targets: List[Decimal] = list(targets)  # targets which are not filled yet
+        self.stop_loss: Decimal = stop_loss
+        self.highest_price: Decimal = entry_price
+        self.filled_targets: int = 0
+
+
+class PositionManager:
+    _MIN_STOP_LOSS_MOVE = Decimal('0.2') / 100  # trailing stop loss is replaced after it moves at least 0.2%
+    _MIN_STOP_LOSS_INTERVAL = 2.0  # seconds between replacements of one symbol, latest stop loss is applied after it
+    # spot stop price is 0.5% above stop loss, so trailing stop loss is kept at least 1% below price
+    _MIN_TRAILING_DISTANCE = Decimal(1) / 100
+
+    def __init__(self, file_path: str, breakeven: bool, trailing_stop: Decimal, spot_api: Api,
+                 futures_api: Optional[Api], start_socket: Callable[[str, Callback], str],
+                 stop_socket: Callable[[str], None], logger: Logger) -> None:
+        self._file_path: str = file_path
+        self._breakeven: bool = breakeven
+        self._trailing_stop: Decimal = trailing_stop / 100
+        self._apis: Dict[bool, Optional[Api]] = {False: spot_api, True: futures_api}
+        self._start_socket: Callable[[str, Callback], str] = start_socket
+        self._stop_socket: Callable[[str], None] = stop_socket
+        self._logger: Logger = logger
+        self._positions: Dict[str, Position] = self._load()
+        self._socket_keys: Dict[str, str] = {}
+        self._moves: Dict[str, Optional[Tuple[Decimal, str]]] = {}  # next stop loss by symbol with move in flight
+
+    def start(self) -> None:
+        # streams run on event loop, so positions loaded from file are watched after loop is started
+        for symbol in self._positions.keys():
+            self._watch(symbol)
+
+    def reload(self) -> None:
+        # positions saved by other instance, called before start
+        assert len(self._socket_keys) == 0
+        self._positions = self._load()
+
+    def get(self, symbol: str) -> Optional[Position]:
+        return self._positions.get(symbol)
+
+    def get_positions(self) -> List[Position]:
+        return list(self._positions.values())
+
+    def open(self, symbol: str, futures: bool, entry_price: Decimal, quantity: Decimal, targets: List[Decimal],
+             stop_loss: Decimal) -> None:
+        self._positions[symbol] = Position(symbol, futures, entry_price, quantity, targets, stop_loss)
+        self._save()
+        self._watch(symbol)
+
+    def close(self, symbol: str) -> None:
+        if self._positions.pop(symbol, None) is not None:
+            self._save()
+
+        if symbol in self._socket_keys:
+            self._stop_socket(self._socket_keys.pop(symbol))
+
+    def process_filled_sell_order(self, order: Order) -> None:
+        position = self._positions.get(order.symbol)
+
+        if position is None or len(position.targets) == 0:
+            return
+
+        if order.type in (Order.TYPE_LIMIT_MAKER, Order.TYPE_LIMIT):
+            target = min(position.targets, key=lambda price: abs(price - order.price))
+            position.targets.remove(target)
+            position.filled_targets += 1
+        elif order.futures:
+            position.targets.clear()  # futures stop loss closes whole position
+        else:
+            position.targets.pop()  # spot stop loss closes one OCO order
+
+        if len(position.targets) == 0:
+            return self.close(position.symbol)
+
+        self._save()
+
+        if self._breakeven and position.filled_targets == 1 and position.stop_loss < position.entry_price:
+            self._move_stop_loss(position, position.entry_price, 'breakeven')
+
+    def process_partial_sell(self, symbol: str, targets: List[Decimal]) -> None:
+        position = self._positions.get(symbol)
+
+        if position is None:
+            return
+
+        for target in targets:
+            if target in position.targets:
+                position.targets.remove(target)
+
+        if len(position.targets) == 0:
+            return self.close(symbol)
+
+        self._save()
+
+    def move_stop_loss_to_entry(self, symbol: str) -> None:
+        position = self._positions.get(symbol)
+
+        if position is not None and position.stop_loss < position.entry_price:
+            self._move_stop_loss(position, position.entry_price, 'message')
+
+    def _process_trade(self, symbol: str, msg: Dict[str, Any]) -> None:
+        # called for every trade, only price comparison is done unless stop loss needs to be moved
+        position = self._positions.get(symbol)
+
+        if position is None:
+            return
+
+        price = parse_decimal(msg['p'])
+
+        if price <= position.highest_price:
+            return
+
+        position.highest_price = price
+        stop_loss = price * (1 - max(self._trailing_stop, self._MIN_TRAILING_DISTANCE))
+
+        if stop_loss > position.stop_loss * (1 + self._MIN_STOP_LOSS_MOVE):
+            self._move_stop_loss(position, stop_loss, 'trailing')
+
+    def _move_stop_loss(self, position: Position, stop_loss: Decimal, reason: str) -> None:
+        # orders are replaced off event loop, one replacement of symbol runs at once
+        symbol = position.symbol
+
+        if symbol in self._moves:
+            self._moves[symbol] = (stop_loss, reason)
+            return
+
+        api = self._apis[position.futures]
+        assert api is not None
+        self._moves[symbol] = None
+        start = time.monotonic()
+
+        def finish(task: 'asyncio.Future[None]') -> None:
+            try:
+                task.result()
+                self._logger.log_event('stop_loss_moved', symbol=symbol, reason=reason,
+                                       old_stop_loss=position.stop_loss, stop_loss=stop_loss)
+                position.stop_loss = stop_loss
+                self._save()
+            except Exception:
+                self._logger.log('ERROR', f'Stop loss of {symbol} was not moved to {stop_loss}\n\n'
+                                 + traceback.format_exc())
+
+            delay = max(start + self._MIN_STOP_LOSS_INTERVAL - time.monotonic(), 0)
+            asyncio.get_event_loop().call_later(delay, self._finish_move, position)
+
+        asyncio.ensure_future(api.replace_stop_loss_async(symbol, stop_loss)).add_done_callback(finish)
+
+    def _finish_move(self, position: Position) -> None:
+        move = self._moves.pop(position.symbol, None)
+
+        if move is not None and self._positions.get(position.symbol) is position and move[0] > position.stop_loss:
+            self._move_stop_loss(position, *move)
+
+    def _watch(self, symbol: str) -> None:
+        # price stream is needed only for trailing, breakeven is driven by filled orders
+        if self._trailing_stop != Decimal(0) and symbol not in self._socket_keys:
+            self._socket_keys[symbol] = self._start_socket(symbol, lambda msg: self._process_trade(symbol, msg))
+
+    def _save(self) -> None:
+        with open(self._file_path, 'wb') as h:
+            pickle.dump(self._positions, h)
+
+    def _load(self) -> Dict[str, Position]:
+        try:
+            with open(self._file_path, 'rb') as h:
+                return pickle.load(h)
+        except IOError:
+            return {}
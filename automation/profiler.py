@@ -0,0 +1,67 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Optional
+
+from automation.logger import Logger
+
+
+class SamplingProfiler:
+    def __init__(self, directory: str, logger: Logger, interval: float = 0.005) -> None:
+        self._directory: str = directory
+        self._logger: Logger = logger
+        self._interval: float = interval  # seconds between samples
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float) -> Optional[str]:
+        if self.running:
+            return None
+
+        file_path = os.path.join(self._directory, f'profile-{time.strftime("%Y%m%d-%H%M%S")}.folded')
+        self._thread = threading.Thread(target=self._run, args=(duration, file_path), name='profiler', daemon=True)
+        self._thread.start()
+
+        return file_path
+
+    def _run(self, duration: float, file_path: str) -> None:
+        own_thread_id = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        end = time.monotonic() + duration
+
+        while time.monotonic() < end:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_thread_id:
+                    stacks[self._collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+
+            samples += 1
+            time.sleep(self._interval)
+
+        # collapsed stack format, input for flamegraph.pl or speedscope
+        with open(file_path, 'w') as h:
+            for stack, count in stacks.most_common():
+                h.write(f'{stack} {count}\n')
+
+        self._logger.log_event('profile_written', file=file_path, samples=samples)
+
+    @staticmethod
+    def _collapse(thread_name: str, frame: Optional[FrameType]) -> str:
+        parts = []
+
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+
+        parts.append(thread_name)
+
+        return ';'.join(reversed(parts))
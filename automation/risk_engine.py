@@ -0,0 +1,153 @@
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, TYPE_CHECKING
+
+from automation.functions import parse_decimal
+from automation.order import Order
+
+if TYPE_CHECKING:
+    from automation.position_manager import Position
+
+
+class RiskEngine:
+    # exposure of positions and pending buy orders kept in memory from user data streams,
+    # every check is just few dictionary lookups
+    _DUST = Decimal('0.01')  # position with less than 1% of bought quantity is closed (fees paid in base asset)
+    _OPEN_STATUSES = ('NEW', 'PARTIALLY_FILLED')
+
+    def __init__(self, max_positions: int, max_symbol_amounts: Dict[str, Decimal],
+                 max_currency_amounts: Dict[str, Decimal], max_total_amount: Decimal,
+                 get_currency: Callable[[str], str]) -> None:
+        self._max_positions: int = max_positions  # 0 = unlimited
+        self._max_symbol_amounts: Dict[str, Decimal] = max_symbol_amounts  # missing currency = unlimited
+        self._max_currency_amounts: Dict[str, Decimal] = max_currency_amounts
+        self._max_total_amount: Decimal = max_total_amount  # USDT, 0 = unlimited
+        self._get_currency: Callable[[str], str] = get_currency
+        self._currency_prices: Dict[str, Decimal] = {'USDT': Decimal(1)}
+        self._balances: Dict[str, Decimal] = {}  # free spot balances
+        self._positions: Dict[str, List[Decimal]] = {}  # quantity, amount, bought quantity by symbol
+        self._pending: Dict[str, Dict[int, Decimal]] = {}  # amount of pending buy orders by symbol and order id
+        self._reserved: Dict[str, Decimal] = {}  # accepted signals not yet confirmed by stream
+        self._exposures: Dict[str, Decimal] = {}
+        self._currency_exposures: Dict[str, Decimal] = {}
+
+    def update_limits(self, max_positions: int, max_symbol_amounts: Dict[str, Decimal],
+                      max_currency_amounts: Dict[str, Decimal], max_total_amount: Decimal) -> None:
+        self._max_positions = max_positions
+        self._max_symbol_amounts = max_symbol_amounts
+        self._max_currency_amounts = max_currency_amounts
+        self._max_total_amount = max_total_amount
+
+    @property
+    def exposures(self) -> Dict[str, Decimal]:
+        return dict(self._currency_exposures)
+
+    def load(self, positions: Iterable['Position'], orders: Iterable[Order], balances: Dict[str, Decimal]) -> None:
+        # state before start or after takeover by standby instance, changes are received from streams
+        self._positions, self._pending, self._reserved = {}, {}, {}
+        self._exposures, self._currency_exposures = {}, {}
+
+        for position in positions:
+            self._positions[position.symbol] = [position.quantity, position.quantity * position.entry_price,
+                                                position.quantity]
+            self._refresh(position.symbol)
+
+        for order in orders:
+            self._pending.setdefault(order.symbol, {})[order.order_id] = order.quantity * order.price
+            self._refresh(order.symbol)
+
+        self._balances.update(balances)
+
+    def set_currency_price(self, currency: str, price: Decimal) -> None:
+        self._currency_prices[currency] = price
+
+    def check(self, symbol: str, amount: Decimal, futures: bool) -> Optional[str]:
+        # returns reason of rejection
+        currency = self._get_currency(symbol)
+        exposure = self._exposures.get(symbol, Decimal(0))
+
+        if self._max_positions != 0 and symbol not in self._exposures and len(self._exposures) >= self._max_positions:
+            return f'{len(self._exposures)} positions are open, max is {self._max_positions}'
+
+        max_symbol_amount = self._max_symbol_amounts.get(currency)
+
+        if max_symbol_amount is not None and exposure + amount > max_symbol_amount:
+            return f'{symbol} exposure {exposure} + {amount} exceeds {max_symbol_amount} {currency}'
+
+        currency_exposure = self._currency_exposures.get(currency, Decimal(0))
+        max_currency_amount = self._max_currency_amounts.get(currency)
+
+        if max_currency_amount is not None and currency_exposure + amount > max_currency_amount:
+            return f'{currency} exposure {currency_exposure} + {amount} exceeds {max_currency_amount} {currency}'
+
+        if self._max_total_amount != Decimal(0) and currency in self._currency_prices:
+            # currencies without known price are not counted
+            total = sum((value * self._currency_prices[c] for c, value in self._currency_exposures.items()
+                         if c in self._currency_prices), Decimal(0))
+            total_amount = amount * self._currency_prices[currency]
+
+            if total + total_amount > self._max_total_amount:
+                return f'Total exposure {total:.2f} + {total_amount:.2f} exceeds {self._max_total_amount} USDT'
+
+        if not futures and currency in self._balances and self._balances[currency] < amount:
+            return f'Free balance {self._balances[currency]} {currency} is smaller than {amount}'
+
+        return None
+
+    def reserve(self, symbol: str, amount: Decimal) -> None:
+        # counted until buy order is received from stream
+        self._reserved[symbol] = amount
+        self._refresh(symbol)
+
+    def process_order(self, msg: Dict[str, Any]) -> None:
+        # spot execution report and futures order update use same keys
+        symbol = msg['s']
+
+        if msg['S'] == Order.SIDE_BUY:
+            self._reserved.pop(symbol, None)
+            pending = self._pending.setdefault(symbol, {})
+
+            if msg['o'] == Order.TYPE_LIMIT and msg['X'] in self._OPEN_STATUSES:
+                pending[msg['i']] = (parse_decimal(msg['q']) - parse_decimal(msg['z'])) * parse_decimal(msg['p'])
+            else:
+                pending.pop(msg['i'], None)
+
+            if len(pending) == 0:
+                del self._pending[symbol]
+
+        quantity, price = parse_decimal(msg['l']), parse_decimal(msg['L'])
+
+        if quantity != Decimal(0):
+            position = self._positions.setdefault(symbol, [Decimal(0), Decimal(0), Decimal(0)])
+
+            if msg['S'] == Order.SIDE_BUY:
+                position[0] += quantity
+                position[1] += quantity * price
+                position[2] += quantity
+            elif position[0] != Decimal(0):
+                position[1] -= position[1] * min(quantity / position[0], Decimal(1))
+                position[0] -= quantity
+
+            if position[0] <= position[2] * self._DUST:
+                del self._positions[symbol]
+
+        self._refresh(symbol)
+
+    def process_balances(self, balances: Iterable[Dict[str, Any]]) -> None:
+        for balance in balances:
+            self._balances[balance['a']] = parse_decimal(balance['f'])
+
+    def _refresh(self, symbol: str) -> None:
+        position = self._positions.get(symbol)
+        exposure = sum(self._pending.get(symbol, {}).values(), Decimal(0)) + self._reserved.get(symbol, Decimal(0))
+
+        if position is not None:
+            exposure += position[1]
+
+        currency = self._get_currency(symbol)
+        old_exposure = self._exposures.pop(symbol, Decimal(0))
+
+        if exposure > Decimal(0):
+            self._exposures[symbol] = exposure
+
+        currency_exposure = self._currency_exposures.get(currency, Decimal(0))
+        self._currency_exposures[currency] = currency_exposure + exposure - old_exposure
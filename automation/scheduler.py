@@ -0,0 +1,105 @@
+import asyncio
+import heapq
+import itertools
+import traceback
+from typing import Any, Callable, List, Optional, Tuple
+
+from automation.logger import Logger
+
+
+class Job:
+    def __init__(self, name: str, callback: Callable[[], Any], interval: Optional[float], blocking: bool) -> None:
+        assert interval is None or interval > 0
+        self.name: str = name
+        self.callback: Callable[[], Any] = callback
+        self.interval: Optional[float] = interval  # None = job runs once
+        self.blocking: bool = blocking  # runs in executor, e.g. requests
+        self.cancelled: bool = False
+        self.running: bool = False
+
+    def cancel(self) -> None:
+        self.cancelled = True  # removed from heap when it is due
+
+
+class Scheduler:
+    # timed jobs of process are kept in one heap and run by one event loop timer armed for earliest job,
+    # blocking jobs run in default executor and are skipped while their previous run has not finished
+    def __init__(self, loop: asyncio.AbstractEventLoop, logger: Logger) -> None:
+        self._loop: asyncio.AbstractEventLoop = loop
+        self._logger: Logger = logger
+        self._heap: List[Tuple[float, int, Job]] = []  # loop time, sequence keeps order of same times
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def jobs(self) -> List[str]:
+        return sorted(job.name for _, _, job in self._heap if not job.cancelled)
+
+    def call_later(self, name: str, delay: float, callback: Callable[[], Any], blocking: bool = False) -> Job:
+        return self._push(self._loop.time() + delay, Job(name, callback, None, blocking))
+
+    def every(self, name: str, interval: float, callback: Callable[[], Any], blocking: bool = False,
+              delay: Optional[float] = None) -> Job:
+        # first run after interval unless delay is given
+        return self._push(self._loop.time() + (delay if delay is not None else interval),
+                          Job(name, callback, interval, blocking))
+
+    def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        self._heap = []
+
+    def _push(self, when: float, job: Job) -> Job:
+        heapq.heappush(self._heap, (when, next(self._sequence), job))
+
+        if self._heap[0][2] is job:
+            self._arm()
+
+        return job
+
+    def _arm(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+
+        self._timer = self._loop.call_at(self._heap[0][0], self._run_due) if len(self._heap) != 0 else None
+
+    def _run_due(self) -> None:
+        self._timer = None
+        now = self._loop.time()
+
+        while len(self._heap) != 0 and self._heap[0][0] <= now:
+            when, _, job = heapq.heappop(self._heap)
+
+            if job.cancelled:
+                continue
+
+            if job.interval is not None:
+                # late job is not run again to catch up missed runs
+                heapq.heappush(self._heap, (max(when + job.interval, now), next(self._sequence), job))
+
+            self._run(job)
+
+        self._arm()
+
+    def _run(self, job: Job) -> None:
+        if not job.blocking:
+            try:
+                job.callback()
+            except Exception:
+                self._logger.log('ERROR', f'Job {job.name}\n\n' + traceback.format_exc())
+        elif not job.running:
+            job.running = True
+            future = self._loop.run_in_executor(None, job.callback)
+            future.add_done_callback(lambda f: self._finish(job, f))
+        else:
+            self._logger.log_event('job_skipped', job=job.name)
+
+    def _finish(self, job: Job, future: 'asyncio.Future[None]') -> None:
+        job.running = False
+        e = future.exception() if not future.cancelled() else None
+
+        if e is not None:
+            error = ''.join(traceback.format_exception(type(e), e, e.__traceback__))
+            self._logger.log('ERROR', f'Job {job.name}\n\n{error}')
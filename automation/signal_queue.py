@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import struct
+import time
+import traceback
+from collections import deque, namedtuple
+from decimal import Decimal
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+from automation.logger import Logger
+from automation.message.buy_message import BuyMessage
+from automation.message.message import Message
+from automation.message.sell_message import SellMessage
+
+# parsed message sent from ingestion process to execution process, times are unix timestamps
+Signal = namedtuple('Signal', 'channel_id, message, received_at, sent_at, delivered_at')
+
+# frame is header followed by compact JSON array of message fields, every received frame is acknowledged by one byte
+_HEADER = struct.Struct('>Idd')  # payload length, received at, sent at
+_ACK = b'\x01'
+_BUY = 'b'
+_SELL = 's'
+
+PendingFrame = Tuple[Message, float, bytes]  # message, received at, frame
+
+
+def encode_signal(channel_id: int, message: Message, received_at: float, sent_at: float) -> bytes:
+    if isinstance(message, BuyMessage):
+        fields: List[Any] = [_BUY, message.buy_type, _format(message.buy_price),
+                             [str(target) for target in message.targets], str(message.stop_loss)]
+    elif isinstance(message, SellMessage):
+        fields = [_SELL, message.sell_type, _format(message.fraction), message.targets, message.stop_loss_to_entry]
+    else:
+        raise Exception(f'Unknown message {type(message).__name__}')
+
+    payload = json.dumps([channel_id, message.content, message.parent_content, message.symbol, *fields],
+                         separators=(',', ':')).encode()
+
+    return _HEADER.pack(len(payload), received_at, sent_at) + payload
+
+
+def decode_signal(header: bytes, payload: bytes) -> Signal:
+    _, received_at, sent_at = _HEADER.unpack(header)
+    channel_id, content, parent_content, symbol, message_type, *fields = json.loads(payload)
+
+    if message_type == _BUY:
+        buy_type, buy_price, targets, stop_loss = fields
+        message: Message = BuyMessage(content, parent_content, symbol, buy_type, _parse(buy_price),
+                                      [Decimal(target) for target in targets], Decimal(stop_loss))
+    elif message_type == _SELL:
+        sell_type, fraction, targets, stop_loss_to_entry = fields
+        message = SellMessage(content, parent_content, symbol, sell_type, _parse(fraction), targets,
+                              stop_loss_to_entry)
+    else:
+        raise Exception(f'Unknown message type {message_type}')
+
+    return Signal(channel_id, message, received_at, sent_at, time.time())
+
+
+def _format(value: Optional[Decimal]) -> Optional[str]:
+    return str(value) if value is not None else None
+
+
+def _parse(value: Optional[str]) -> Optional[Decimal]:
+    return Decimal(value) if value is not None else None
+
+
+class SignalSender:
+    # ingestion side of unix socket, frames are written without waiting for execution process,
+    # frames sent while execution process is not connected and frames not acknowledged by closed connection
+    # are sent after it connects, old buy signals are dropped, so they are not executed for different price
+    _RECONNECT_DELAY = 1  # seconds
+    _MAX_BUY_AGE = 30  # seconds since message was received
+    _MAX_PENDING = 1000  # oldest frame is dropped
+
+    def __init__(self, path: str, logger: Logger) -> None:
+        self._path: str = path
+        self._logger: Logger = logger
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: Deque[PendingFrame] = deque()
+        self._unacknowledged: Deque[PendingFrame] = deque()
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    def send(self, channel_id: int, message: Message, received_at: float) -> None:
+        pending = (message, received_at, encode_signal(channel_id, message, received_at, time.time()))
+
+        if self._writer is not None and not self._writer.is_closing():
+            self._write(self._writer, pending)
+        else:
+            if len(self._pending) >= self._MAX_PENDING:
+                self._drop(self._pending.popleft(), 'queue full')
+
+            self._pending.append(pending)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self._path)
+            except OSError:
+                await asyncio.sleep(self._RECONNECT_DELAY)
+                continue
+
+            self._logger.log_event('signal_queue_connected', pending=len(self._pending))
+            now = time.time()
+
+            while len(self._pending) != 0:
+                pending = self._pending.popleft()
+                message, received_at, _ = pending
+
+                if isinstance(message, BuyMessage) and now - received_at > self._MAX_BUY_AGE:
+                    self._drop(pending, 'expired')
+                else:
+                    self._write(writer, pending)
+
+            self._writer = writer
+
+            try:
+                while True:
+                    acknowledgements = await reader.read(1024)
+
+                    if len(acknowledgements) == 0:
+                        break  # execution process closed connection
+
+                    for _ in range(len(acknowledgements)):
+                        self._unacknowledged.popleft()
+            except ConnectionError:
+                pass
+
+            self._writer = None
+            writer.close()
+            # frames written into connection of died process may not have been received
+            self._logger.log_event('signal_queue_disconnected', unacknowledged=len(self._unacknowledged))
+            self._pending.extendleft(reversed(self._unacknowledged))
+            self._unacknowledged.clear()
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            await self._writer.drain()
+            self._writer.close()
+
+    def _write(self, writer: asyncio.StreamWriter, pending: PendingFrame) -> None:
+        writer.write(pending[2])
+        self._unacknowledged.append(pending)
+
+    def _drop(self, pending: PendingFrame, reason: str) -> None:
+        message, received_at, _ = pending
+        self._logger.log_event('signal_dropped', symbol=message.symbol, reason=reason,
+                               age_seconds=time.time() - received_at)
+
+
+class SignalReceiver:
+    # execution side of unix socket, every received signal is acknowledged and processed on event loop immediately
+    def __init__(self, path: str, callback: Callable[[Signal], None], logger: Logger) -> None:
+        self._path: str = path
+        self._callback: Callable[[Signal], None] = callback
+        self._logger: Logger = logger
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        if os.path.exists(self._path):
+            os.remove(self._path)  # left by previous process
+
+        self._server = await asyncio.start_unix_server(self._handle, self._path)
+
+    async def serve_forever(self) -> None:
+        assert self._server is not None
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            os.remove(self._path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                header = await reader.readexactly(_HEADER.size)
+                payload = await reader.readexactly(_HEADER.unpack(header)[0])
+                writer.write(_ACK)  # before processing, so signal is not sent again when processing kills process
+
+                try:
+                    self._callback(decode_signal(header, payload))
+                except Exception:
+                    self._logger.log('ERROR', traceback.format_exc())
+        except asyncio.IncompleteReadError:
+            pass  # ingestion process disconnected
+        finally:
+            writer.close()
@@ -0,0 +1,248 @@
+import fcntl
+import os
+import time
+import traceback
+from collections import deque
+from typing import Callable, Deque, IO, Optional, Set, Tuple
+
+from automation.logger import Logger
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class Lease:
+    # lock file held by active instance, kernel releases lock when process dies, so polling standby takes over
+    # within poll interval, heartbeat written into file shows whether alive holder is still running its event loop
+    def __init__(self, file_path: str) -> None:
+        self._file_path: str = file_path
+        self._handle: Optional[IO[str]] = None
+        self._locked: bool = False
+
+    @property
+    def held(self) -> bool:
+        return self._handle is not None
+
+    def try_acquire(self) -> bool:
+        if self._handle is not None:
+            return True
+
+        handle = open(self._file_path, 'a+')
+
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            return False
+
+        self._handle = handle
+        self._locked = True
+        self.heartbeat()
+
+        return True
+
+    def take_over(self) -> None:
+        # holder without heartbeat keeps lock until it exits, lock is acquired by later heartbeat
+        assert self._handle is None
+        self._handle = open(self._file_path, 'a+')
+        self.heartbeat()
+
+    def heartbeat(self) -> None:
+        assert self._handle is not None
+
+        if not self._locked:
+            try:
+                fcntl.flock(self._handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._locked = True
+            except BlockingIOError:
+                pass
+
+        self._handle.seek(0)
+        self._handle.truncate()
+        self._handle.write(f'{os.getpid()} {time.time()}')
+        self._handle.flush()
+
+    def get_heartbeat_age(self) -> Optional[float]:
+        # seconds since last heartbeat of holder
+        try:
+            with open(self._file_path) as h:
+                _, heartbeat = h.read().split()
+        except (IOError, ValueError):
+            return None
+
+        return time.time() - float(heartbeat)
+
+    def release(self) -> None:
+        if self._handle is not None:
+            if self._locked:
+                fcntl.flock(self._handle, fcntl.LOCK_UN)
+
+            self._handle.close()
+            self._handle = None
+            self._locked = False
+
+
+class Journal:
+    # keys of executed signals and order events shared by active and standby instance, key is claimed before
+    # execution under file lock, so it is executed at most once even when both instances see it,
+    # every activation writes new epoch, so instance which lost lease while it was hung can not claim keys
+    _EPOCH = '#epoch '
+    _MAX_KEYS = 10000
+    _KEPT_KEYS = 1000  # newest keys kept after compaction
+
+    def __init__(self, file_path: str) -> None:
+        self._file_path: str = file_path
+        self._keys: Set[str] = set()
+        self._offset: int = 0  # end of file read by this instance
+        self._generation: str = ''  # first line written by last compaction
+        self._epoch: int = 0  # latest epoch in file
+        self._own_epoch: Optional[int] = None  # epoch written by activation of this instance
+
+    @property
+    def fenced(self) -> bool:
+        # other instance was activated after this one
+        with open(self._file_path, 'a+') as h:
+            fcntl.flock(h, fcntl.LOCK_SH)
+            self._read(h)
+
+        return self._own_epoch is not None and self._own_epoch != self._epoch
+
+    def fence(self) -> None:
+        with open(self._file_path, 'a+') as h:
+            fcntl.flock(h, fcntl.LOCK_EX)
+            self._read(h)
+            self._epoch += 1
+            self._own_epoch = self._epoch
+            h.write(f'{self._EPOCH}{self._epoch}\n')
+            h.flush()
+            self._offset = h.tell()
+
+    def claim(self, key: str) -> bool:
+        assert '\n' not in key and not key.startswith('#')
+
+        with open(self._file_path, 'a+') as h:
+            fcntl.flock(h, fcntl.LOCK_EX)  # released by closing file
+            self._read(h)
+
+            if self._own_epoch is not None and self._own_epoch != self._epoch:
+                raise LeaseLost(f'Journal epoch {self._epoch} was written by other instance')
+
+            if key in self._keys:
+                return False
+
+            h.write(f'{key}\n')
+            h.flush()
+            self._keys.add(key)
+            self._offset = h.tell()
+
+            if len(self._keys) > self._MAX_KEYS:
+                self._compact(h)
+
+        return True
+
+    def _read(self, h: IO[str]) -> None:
+        h.seek(0)
+        first_line = h.readline().rstrip('\n')
+        generation = first_line if first_line.startswith('#') else ''
+
+        if generation != self._generation:
+            self._keys, self._offset, self._generation = set(), 0, generation  # compacted by other instance
+
+        h.seek(self._offset)
+
+        for line in h.read().splitlines():
+            if line.startswith(self._EPOCH):
+                self._epoch = int(line[len(self._EPOCH):])
+            elif not line.startswith('#'):
+                self._keys.add(line)
+
+        self._offset = h.tell()
+
+    def _compact(self, h: IO[str]) -> None:
+        h.seek(0)
+        keys = [key for key in h.read().splitlines() if not key.startswith('#')][-self._KEPT_KEYS:]
+        self._generation = f'#{os.getpid()} {time.time()}'
+        h.truncate(0)
+        h.write(''.join(f'{line}\n' for line in [self._generation, f'{self._EPOCH}{self._epoch}'] + keys))
+        h.flush()
+        self._keys, self._offset = set(keys), h.tell()
+
+
+class StandbyGate:
+    # only lease holder executes signals and order events, standby keeps recent ones and executes those not claimed
+    # by previous active instance after takeover, so nothing arriving between its death and takeover is lost,
+    # lease of holder without heartbeat is taken over and holder stops with first claim or poll after it resumes
+    def __init__(self, lease: Lease, journal: Journal, activate: Callable[[], None], stop: Callable[[], None],
+                 buffer_seconds: float, logger: Logger) -> None:
+        self._lease: Lease = lease
+        self._journal: Journal = journal
+        self._activate: Callable[[], None] = activate
+        self._stop: Callable[[], None] = stop
+        self._buffer_seconds: float = buffer_seconds
+        self._logger: Logger = logger
+        self._buffer: Deque[Tuple[float, str, Callable[[], None]]] = deque()  # received at, key, action
+
+    @property
+    def active(self) -> bool:
+        return self._lease.held
+
+    def execute_once(self, key: str, action: Callable[[], None]) -> None:
+        if not self.active:
+            now = time.monotonic()
+            self._buffer.append((now, key, action))
+
+            while self._buffer[0][0] < now - self._buffer_seconds:
+                self._buffer.popleft()
+        else:
+            try:
+                claimed = self._journal.claim(key)
+            except LeaseLost:
+                return self._lose()
+
+            if claimed:
+                action()
+            else:
+                self._logger.log_event('already_executed', key=key)
+
+    def poll(self, stale_timeout: float) -> None:
+        # called periodically by scheduler
+        if self.active:
+            if self._journal.fenced:
+                return self._lose()
+
+            self._lease.heartbeat()
+        elif self._lease.try_acquire():
+            self._take_over()
+        else:
+            age = self._lease.get_heartbeat_age()
+
+            if age is not None and age > stale_timeout:
+                self._logger.log_event('lease_holder_stale', heartbeat_age=age)
+                self._lease.take_over()
+                self._take_over()
+
+    def _take_over(self) -> None:
+        start = time.perf_counter()
+        self._journal.fence()
+        self._activate()
+        now = time.monotonic()
+        buffered = len(self._buffer)
+
+        while len(self._buffer) != 0:
+            received_at, key, action = self._buffer.popleft()
+
+            if received_at >= now - self._buffer_seconds:
+                try:
+                    self.execute_once(key, action)
+                except Exception:
+                    self._logger.log('ERROR', f'{key}\n\n' + traceback.format_exc())
+
+        self._logger.log_event('lease_acquired', activation_ms=(time.perf_counter() - start) * 1000,
+                               buffered=buffered)
+
+    def _lose(self) -> None:
+        self._lease.release()
+        self._buffer.clear()
+        self._logger.log_event('lease_lost')
+        self._stop()
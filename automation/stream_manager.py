@@ -0,0 +1,66 @@
+import asyncio
+import itertools
+import traceback
+from typing import Any, Callable, Dict, List
+
+from binance import BinanceSocketManager
+
+from automation.logger import Logger
+
+Callback = Callable[[Dict[str, Any]], None]
+
+
+class StreamManager:
+    # same interface as twisted socket manager from python-binance 0.7, but streams run on asyncio loop
+    def __init__(self, socket_manager: BinanceSocketManager, logger: Logger) -> None:
+        self._socket_manager: BinanceSocketManager = socket_manager
+        self._logger: Logger = logger
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._counter = itertools.count()
+
+    def start_user_socket(self, callback: Callback) -> str:
+        return self._start('user', self._socket_manager.user_socket(), callback)
+
+    def start_futures_user_socket(self, callback: Callback) -> str:
+        return self._start('futures_user', self._socket_manager.futures_user_socket(), callback)
+
+    def start_multiplex_socket(self, streams: List[str], callback: Callback) -> str:
+        return self._start('multiplex', self._socket_manager.multiplex_socket(streams), callback)
+
+    def stop_socket(self, key: str) -> None:
+        task = self._tasks.pop(key, None)
+
+        if task is not None:
+            task.cancel()
+
+    async def close(self) -> None:
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _start(self, name: str, socket: Any, callback: Callback) -> str:
+        key = f'{name}#{next(self._counter)}'
+        self._tasks[key] = asyncio.get_event_loop().create_task(self._consume(key, socket, callback))
+
+        return key
+
+    async def _consume(self, key: str, socket: Any, callback: Callback) -> None:
+        # socket reconnects by itself, errors are reported as messages
+        async with socket as stream:
+            while True:
+                msg = await stream.recv()
+
+                if msg is None:
+                    continue
+                elif msg.get('e') == 'error':
+                    self._logger.log_event('stream_error', stream=key, message=msg.get('m'))
+                else:
+                    try:
+                        callback(msg)
+                    except:
+                        # failing callback must not stop the stream
+                        self._logger.log('ERROR', traceback.format_exc())
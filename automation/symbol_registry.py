@@ -0,0 +1,111 @@
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from automation.api.api import ExchangeSymbol
+    from automation.api.futures_api import FuturesApi
+    from automation.api.spot_api import SpotApi
+
+ListedSymbol = namedtuple('ListedSymbol', 'symbol, base, quote, spot_info, futures_info')
+
+
+class _TrieNode:
+    __slots__ = ('children', 'symbol')
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _TrieNode] = {}
+        self.symbol: Optional[str] = None
+
+
+class SymbolRegistry:
+    # symbols listed on spot and futures market, pairs written in messages as "base/quote" are found by trie
+    QUOTES = ('USDT', 'BTC')
+    _QUOTE_ALIASES = {'USDT': ('usd',)}  # USD in message means USDT
+
+    def __init__(self) -> None:
+        self._symbols: Dict[str, ListedSymbol] = {}
+        self._trie: _TrieNode = _TrieNode()
+
+    def load(self, spot_api: 'SpotApi', futures_api: Optional['FuturesApi']) -> None:
+        self.update(spot_api.get_exchange_symbols(),
+                    futures_api.get_exchange_symbols() if futures_api is not None else [])
+
+    def update(self, spot_symbols: Iterable['ExchangeSymbol'], futures_symbols: Iterable['ExchangeSymbol']) -> None:
+        # new tables are built aside and swapped at once, so lookups running in other thread see consistent state
+        spot = {s.symbol: s for s in spot_symbols}
+        futures = {s.symbol: s for s in futures_symbols}
+        symbols: Dict[str, ListedSymbol] = {}
+
+        for symbol in spot.keys() | futures.keys():
+            exchange_symbol = spot.get(symbol) or futures[symbol]
+            symbols[symbol] = ListedSymbol(symbol, exchange_symbol.base, exchange_symbol.quote,
+                                           spot[symbol].info if symbol in spot else None,
+                                           futures[symbol].info if symbol in futures else None)
+
+        self._trie = self._build_trie(symbols.values())
+        self._symbols = symbols
+
+    def get(self, symbol: str) -> Optional[ListedSymbol]:
+        return self._symbols.get(symbol)
+
+    def get_quote(self, symbol: str) -> str:
+        listed_symbol = self._symbols.get(symbol)
+
+        if listed_symbol is None:
+            raise Exception(f'Unknown currency for {symbol}')
+
+        return listed_symbol.quote
+
+    def is_futures(self, symbol: str) -> bool:
+        listed_symbol = self._symbols.get(symbol)
+
+        return listed_symbol is not None and listed_symbol.futures_info is not None
+
+    def get_futures_symbols(self, quote: str) -> List[str]:
+        return [s.symbol for s in self._symbols.values() if s.futures_info is not None and s.quote == quote]
+
+    def find_symbols(self, normalized: str) -> List[str]:
+        # every pair starting and ending at word boundary, longest one wins
+        trie = self._trie
+        symbols = []
+
+        for start in range(len(normalized)):
+            if start != 0 and normalized[start - 1].isalnum():
+                continue
+
+            node = trie
+            found = None
+
+            for i in range(start, len(normalized)):
+                child = node.children.get(normalized[i])
+
+                if child is None:
+                    break
+
+                node = child
+
+                if node.symbol is not None and (i + 1 == len(normalized) or not normalized[i + 1].isalnum()):
+                    found = node.symbol
+
+            if found is not None:
+                symbols.append(found)
+
+        return symbols
+
+    @classmethod
+    def _build_trie(cls, symbols: Iterable[ListedSymbol]) -> _TrieNode:
+        root = _TrieNode()
+
+        for listed_symbol in symbols:
+            if listed_symbol.quote not in cls.QUOTES:
+                continue
+
+            for quote in (listed_symbol.quote.lower(), *cls._QUOTE_ALIASES.get(listed_symbol.quote, ())):
+                node = root
+
+                for char in f'{listed_symbol.base.lower()}/{quote}':
+                    node = node.children.setdefault(char, _TrieNode())
+
+                node.symbol = listed_symbol.symbol
+
+        return root
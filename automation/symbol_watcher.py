@@ -1,29 +1,168 @@
+import asyncio
+import itertools
 import json
-from typing import List
+import math
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from automation.functions import parse_decimal
+
+Callback = Callable[[Dict[str, Any]], None]
 
 
 class SymbolWatcher:
-    def __init__(self, file_path: str) -> None:
+    # symbols with pending orders or open positions and market data streams subscribed for them,
+    # streams subscribed at once are combined into multiplex sockets, a running socket is restarted only when some of
+    # its streams are removed, so streams of other sockets have no gap and unused streams are not received
+    _MAX_STREAMS_PER_SOCKET = 200
+    _MAX_SOCKETS = 10  # more sockets are packed again into fewest sockets
+    _SAVE_DELAY = 1  # seconds
+    _RESUBSCRIBE_DELAY = 0.1  # seconds, subscriptions changed at once are applied together
+
+    def __init__(self, file_path: str, start_socket: Callable[[List[str], Callback], str],
+                 stop_socket: Callable[[str], None]) -> None:
         self._file_path: str = file_path
-        self.symbols: List[str] = self._load()
+        self._start_socket: Callable[[List[str], Callback], str] = start_socket
+        self._stop_socket: Callable[[str], None] = stop_socket
+        self.symbols: Set[str] = self._load()
+        self._callbacks: Dict[str, Dict[str, Callback]] = {}  # callbacks by stream name and subscription key
+        self._streams: Dict[str, str] = {}  # stream name by subscription key
+        self._counter = itertools.count()
+        self._sockets: Dict[str, Set[str]] = {}  # streams by key of running socket
+        self._ticker_keys: Dict[str, str] = {}
+        self._prices: Dict[str, Decimal] = {}
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self._resubscribe_handle: Optional[asyncio.TimerHandle] = None
+
+    def start(self) -> None:
+        # streams run on event loop, so symbols loaded from file are watched after loop is started
+        for symbol in self.symbols:
+            self._watch_price(symbol)
 
     def add_symbol(self, symbol: str) -> None:
         if symbol not in self.symbols:
-            self.symbols.append(symbol)
-            self._save()
+            self.symbols.add(symbol)
+            self._watch_price(symbol)
+            self._schedule_save()
 
     def remove(self, symbol: str) -> None:
         if symbol in self.symbols:
             self.symbols.remove(symbol)
+
+            if symbol in self._ticker_keys:
+                self.stop_socket(self._ticker_keys.pop(symbol))
+
+            self._prices.pop(symbol, None)
+            self._schedule_save()
+
+    def get_price(self, symbol: str) -> Optional[Decimal]:
+        return self._prices.get(symbol)
+
+    def start_depth_socket(self, symbol: str, callback: Callback) -> str:
+        return self._subscribe(f'{symbol.lower()}@depth', callback)
+
+    def start_trade_socket(self, symbol: str, callback: Callback) -> str:
+        return self._subscribe(f'{symbol.lower()}@aggTrade', callback)
+
+    def start_ticker_socket(self, symbol: str, callback: Callback) -> str:
+        return self._subscribe(f'{symbol.lower()}@ticker', callback)
+
+    def start_kline_socket(self, symbol: str, callback: Callback, interval: str = '1m') -> str:
+        return self._subscribe(f'{symbol.lower()}@kline_{interval}', callback)
+
+    def stop_socket(self, key: str) -> None:
+        stream = self._streams.pop(key, None)
+
+        if stream is None:
+            return
+
+        callbacks = self._callbacks[stream]
+        del callbacks[key]
+
+        if len(callbacks) == 0:
+            del self._callbacks[stream]
+            self._schedule_resubscribe()
+
+    def flush(self) -> None:
+        if self._save_handle is not None:
+            self._save_handle.cancel()
             self._save()
 
+    def close(self) -> None:
+        self.flush()
+
+        if self._resubscribe_handle is not None:
+            self._resubscribe_handle.cancel()
+            self._resubscribe_handle = None
+
+        for key in self._sockets:
+            self._stop_socket(key)
+
+        self._sockets = {}
+
+    def _watch_price(self, symbol: str) -> None:
+        def process_ticker(msg: Dict[str, Any]) -> None:
+            self._prices[symbol] = parse_decimal(msg['c'])
+
+        self._ticker_keys[symbol] = self.start_ticker_socket(symbol, process_ticker)
+
+    def _subscribe(self, stream: str, callback: Callback) -> str:
+        key = f'{stream}#{next(self._counter)}'
+        self._streams[key] = stream
+
+        if stream not in self._callbacks:
+            self._callbacks[stream] = {}
+            self._schedule_resubscribe()
+
+        self._callbacks[stream][key] = callback
+
+        return key
+
+    def _process_message(self, msg: Dict[str, Any]) -> None:
+        for callback in list(self._callbacks.get(msg.get('stream', ''), {}).values()):
+            callback(msg['data'])
+
+    def _schedule_resubscribe(self) -> None:
+        if self._resubscribe_handle is None:
+            self._resubscribe_handle = asyncio.get_event_loop().call_later(self._RESUBSCRIBE_DELAY,
+                                                                           self._resubscribe)
+
+    def _resubscribe(self) -> None:
+        self._resubscribe_handle = None
+
+        for key, streams in list(self._sockets.items()):
+            if not streams.issubset(self._callbacks.keys()):
+                self._stop_socket(key)  # used streams are subscribed again below
+                del self._sockets[key]
+
+        # same stream subscribed again is delivered by its running socket
+        subscribed = set(itertools.chain.from_iterable(self._sockets.values()))
+        added = sorted(stream for stream in self._callbacks if stream not in subscribed)
+
+        if len(self._sockets) + math.ceil(len(added) / self._MAX_STREAMS_PER_SOCKET) > self._MAX_SOCKETS:
+            for key in self._sockets:
+                self._stop_socket(key)
+
+            self._sockets = {}
+            added = sorted(self._callbacks)
+
+        for i in range(0, len(added), self._MAX_STREAMS_PER_SOCKET):
+            socket_streams = added[i:i + self._MAX_STREAMS_PER_SOCKET]
+            self._sockets[self._start_socket(socket_streams, self._process_message)] = set(socket_streams)
+
+    def _schedule_save(self) -> None:
+        if self._save_handle is None:
+            self._save_handle = asyncio.get_event_loop().call_later(self._SAVE_DELAY, self._save)
+
     def _save(self) -> None:
+        self._save_handle = None
+
         with open(self._file_path, 'w') as h:
-            json.dump(self.symbols, h)
+            json.dump(sorted(self.symbols), h)
 
-    def _load(self) -> List[str]:
+    def _load(self) -> Set[str]:
         try:
             with open(self._file_path) as h:
-                return json.load(h)
+                return set(json.load(h))
         except IOError:
-            return []
+            return set()
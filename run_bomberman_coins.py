@@ -1,108 +1,478 @@
+import asyncio
+import json
+import os
+import signal
+import time
 import traceback
 from argparse import ArgumentParser
-from typing import Any, Dict
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING
 
-from binance.client import Client as BinanceClient
-from binance.websockets import BinanceSocketManager
-from discord import Client as DiscordClient, Message as DiscordMessage
-from twisted.internet import reactor
-from twisted.internet.error import ReactorNotRunning
+from binance import AsyncClient, BinanceSocketManager
 
-from automation.api.futures_api import FuturesApi
+from automation.api.signed_client import SignedClient
 from automation.api.spot_api import SpotApi
-from automation.bomberman_coins import BombermanCoins
-from automation.functions import load_config
-from automation.logger import Logger
+from automation.bomberman_coins import BombermanCoins, TradeAmounts
+from automation.channel_router import Channel, ChannelRouter
+from automation.config_watcher import Changes, ConfigWatcher
+from automation.control_server import ControlServer
+from automation.functions import load_config, parse_decimal
+from automation.logger import Logger, PaperLogger
+from automation.loop_watchdog import LoopWatchdog
+from automation.metrics import Metrics
 from automation.order_storage import OrderStorage
+from automation.message.message import Message
 from automation.parser.message_parser import UnknownMessage
+from automation.parser.parser import Parser
+from automation.position_manager import PositionManager
+from automation.profiler import SamplingProfiler
+from automation.risk_engine import RiskEngine
+from automation.scheduler import Scheduler
+from automation.signal_queue import Signal, SignalReceiver
+from automation.standby import Journal, Lease, StandbyGate
+from automation.stream_manager import StreamManager
+from automation.symbol_registry import SymbolRegistry
+from automation.symbol_watcher import SymbolWatcher
 
-OFFICIAL_DISCORD_CHANNEL = 759070661888704613
+if TYPE_CHECKING:
+    from discord import Client as DiscordClient, Message as DiscordMessage
+
+METRICS_INTERVAL = 10  # seconds
+LIMIT_BUY_EXPIRY_INTERVAL = 5  # seconds
+PAPER_PRICE_TIMEOUT = 10  # seconds, paper signal is skipped without streamed trade of its symbol
+PROFILE_DURATION = 30  # seconds
+SYMBOL_REGISTRY_INTERVAL = 3600  # seconds, new listings are loaded
+LEASE_POLL_INTERVAL = 0.1  # seconds, standby takes over within this time after active instance dies
+LEASE_STALE_TIMEOUT = 5  # seconds without heartbeat of active instance
+STANDBY_BUFFER_SECONDS = 30  # messages and order events received by standby are replayed for this time after takeover
+RELOADABLE_SETTINGS = ('app.spot.trade_amount', 'app.futures.trade_amount', 'app.futures.leverage',
+                       'app.futures.max_leverage', 'app.risk', 'app.prefetch', 'app.limit_buy', 'discord.channel',
+                       'discord.test_user')
 
 if __name__ == '__main__':
+    started_at = time.perf_counter()
     parser = ArgumentParser()
     parser.add_argument('--config-file')
+    parser.add_argument('--instance', help='name of standby instance, used in names of its log and socket files')
     args = parser.parse_args()
     config = load_config(args.config_file)
+    suffix = f'_{args.instance}' if args.instance is not None else ''
+    standby_config = config['app']['standby']
+    assert not (standby_config['enabled'] and config['app']['processes']['split']), \
+        'Standby is not supported with split processes'
 
-    discord_client = DiscordClient()
-    binance_client = BinanceClient(config['binance_api']['key'],
-                                   config['binance_api']['secret'])
-    binance_socket = BinanceSocketManager(binance_client)
-    spot_api = SpotApi(binance_client)
-    futures_api = FuturesApi(config['app']['futures']['margin_type'], binance_client)
-    order_storage = OrderStorage('data/orders.pickle')
-    logger = Logger('log/bomberman_coins.log',
+    # discord and binance streams share one event loop
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    discord_client: Optional['DiscordClient'] = None
+
+    # with split processes discord messages are received and parsed by run_ingestion.py, so discord is not imported
+    if not config['app']['processes']['split']:
+        from discord import Client as DiscordClient
+
+        discord_client = DiscordClient()
+
+    binance_client = SignedClient(config['binance_api']['key'],
+                                  config['binance_api']['secret'])
+    binance_client.sync_clock()
+    async_binance_client = loop.run_until_complete(AsyncClient.create(config['binance_api']['key'],
+                                                                      config['binance_api']['secret']))
+    logger = Logger(f'log/bomberman_coins{suffix}.jsonl',
                     config['email']['recipient'],
                     config['email']['host'],
                     config['email']['user'],
                     config['email']['password'])
+    binance_streams = StreamManager(BinanceSocketManager(async_binance_client), logger)
+    symbol_watcher = SymbolWatcher(f'data/symbols{suffix}.json', binance_streams.start_multiplex_socket,
+                                   binance_streams.stop_socket)
+    scheduler = Scheduler(loop, logger)  # periodic jobs
+    metrics = Metrics(f'log/metrics{suffix}.json')
+    loop_watchdog = LoopWatchdog(metrics, logger)
+    profiler = SamplingProfiler('log', logger)
+    control_server = ControlServer(f'data/control{suffix}.sock', logger)
+    signal_receiver = (SignalReceiver(config['app']['processes']['socket'], lambda signal: process_signal(signal),
+                                      logger)
+                       if config['app']['processes']['split'] else None)
+    depth_execution = config['app']['spot']['depth_execution']
+
+    if depth_execution['enabled']:
+        from automation.api.depth_spot_api import DepthSpotApi
+
+        spot_api: SpotApi = DepthSpotApi(binance_client,
+                                         symbol_watcher.start_depth_socket,
+                                         symbol_watcher.stop_socket,
+                                         depth_execution['max_slippage'],
+                                         depth_execution['max_slices'],
+                                         logger)
+    else:
+        spot_api = SpotApi(binance_client)
+
+    if config['app']['market_type'] == BombermanCoins.MARKET_TYPE_FUTURES:
+        from automation.api.futures_api import FuturesApi
+
+        futures_api: Optional[FuturesApi] = FuturesApi(config['app']['futures']['margin_type'], binance_client)
+    else:
+        futures_api = None
+
+    for api in (spot_api, futures_api):
+        if api is not None:
+            api.prefetch_enabled = config['app']['prefetch']
+
+    symbol_registry = SymbolRegistry()
+    symbol_registry.load(spot_api, futures_api)
+    Parser.symbol_registry = symbol_registry
+    order_storage = OrderStorage('data/orders.pickle')
+    position_manager = PositionManager('data/positions.pickle',
+                                       config['app']['position']['breakeven'],
+                                       config['app']['position']['trailing_stop'],
+                                       spot_api, futures_api,
+                                       symbol_watcher.start_trade_socket,
+                                       symbol_watcher.stop_socket,
+                                       logger)
+    risk_engine = RiskEngine(config['app']['risk']['max_positions'],
+                             config['app']['risk']['max_symbol_amount'],
+                             config['app']['risk']['max_currency_amount'],
+                             config['app']['risk']['max_total_amount'],
+                             symbol_registry.get_quote)
+    risk_engine.load(position_manager.get_positions(), order_storage.get_orders(), spot_api.get_balances())
     bomberman_coins = BombermanCoins(config['app']['market_type'],
                                      config['app']['spot']['trade_amount'],
                                      config['app']['futures']['trade_amount'],
                                      config['app']['futures']['leverage'],
                                      config['app']['futures']['max_leverage'],
-                                     spot_api, futures_api, order_storage, logger)
-    discord_channel = config['discord']['channel']
-    test_user = config['discord'].get('test_user')
+                                     spot_api, futures_api, order_storage, position_manager, symbol_watcher,
+                                     symbol_registry, risk_engine, logger)
+    channel_router = ChannelRouter.from_config(config['discord'], metrics)
+    bomberman_coins.limit_buy_ttl = config['app']['limit_buy']['ttl'] * 3600
+    bomberman_coins.cancel_limit_buy_above_target = config['app']['limit_buy']['cancel_above_target']
+    paper_config = config['app']['paper']
+    paper_bomberman_coins: Optional[BombermanCoins] = None
+
+    if paper_config['enabled']:
+        # second instance trades same parsed messages on simulated exchange with shared symbol infos and market data,
+        # its state lives only until restart
+        from automation.api.paper_api import PaperFuturesApi, PaperSpotApi
+        from automation.paper_exchange import PaperExchange, PriceUnavailable
+
+        paper_directory = TemporaryDirectory()
+        paper_logger = PaperLogger(f'log/paper{suffix}.jsonl')
+        paper_exchange = PaperExchange(f'log/paper_ledger{suffix}.jsonl',
+                                       symbol_watcher.start_trade_socket,
+                                       symbol_watcher.stop_socket,
+                                       lambda futures, msg: loop.call_soon(process_paper_api_message, futures, msg))
+        paper_spot_api = PaperSpotApi(binance_client, spot_api, paper_exchange)
+        paper_futures_api = (PaperFuturesApi(binance_client, futures_api, paper_exchange)
+                             if futures_api is not None else None)
+        paper_position_manager = PositionManager(os.path.join(paper_directory.name, 'positions.pickle'),
+                                                 config['app']['position']['breakeven'],
+                                                 config['app']['position']['trailing_stop'],
+                                                 paper_spot_api, paper_futures_api,
+                                                 symbol_watcher.start_trade_socket,
+                                                 symbol_watcher.stop_socket,
+                                                 paper_logger)
+        paper_risk_engine = RiskEngine(config['app']['risk']['max_positions'],
+                                       config['app']['risk']['max_symbol_amount'],
+                                       config['app']['risk']['max_currency_amount'],
+                                       config['app']['risk']['max_total_amount'],
+                                       symbol_registry.get_quote)
+        paper_bomberman_coins = BombermanCoins(
+            config['app']['market_type'],
+            paper_config['spot']['trade_amount'],
+            paper_config['futures']['trade_amount'],
+            paper_config['futures']['leverage'],
+            paper_config['futures']['max_leverage'],
+            paper_spot_api, paper_futures_api,
+            OrderStorage(os.path.join(paper_directory.name, 'orders.pickle')),
+            paper_position_manager, None, symbol_registry, paper_risk_engine, paper_logger,
+        )
+        # paper instance has no symbol watcher, so its limit buys are cancelled only by TTL, not above target
+        paper_bomberman_coins.limit_buy_ttl = bomberman_coins.limit_buy_ttl
 
 
-    @discord_client.event
-    async def on_message(message: DiscordMessage) -> None:
+    async def on_ready() -> None:
+        logger.log_event('ready', startup_seconds=time.perf_counter() - started_at)
+
+
+    async def on_message(message: 'DiscordMessage') -> None:
         content, parent_content = '', None
+        channel = channel_router.get(message.channel.id, str(message.author))
 
-        try:
-            if discord_channel != OFFICIAL_DISCORD_CHANNEL:
-                if test_user is not None and str(message.author) != test_user:
-                    return
+        if channel is None:
+            return
 
-            if message.channel.id == discord_channel:
-                content = message.content
+        try:
+            start = time.perf_counter()
+            content = message.content
 
-                if message.reference is not None and message.reference.resolved is not None:
-                    parent_content = message.reference.resolved.content
+            if message.reference is not None and message.reference.resolved is not None:
+                parent_content = message.reference.resolved.content
 
-                bomberman_coins.process_channel_message(content, parent_content)
+            parsed_message = channel_router.parse(channel, content, parent_content)
+            execute_once(f'message:{message.id}', lambda: process_message(parsed_message, channel))
+            metrics.observe(f'channel_{channel.name}_process_seconds', time.perf_counter() - start)
         except UnknownMessage:
             logger.log('UNKNOWN MESSAGE', Logger.join_contents(content, parent_content))
         except:
             logger.log('ERROR', Logger.join_contents(content, parent_content) + '\n\n' + traceback.format_exc())
 
 
+    if discord_client is not None:
+        discord_client.event(on_ready)
+        discord_client.event(on_message)
+
+
+    def process_signal(signal: Signal) -> None:
+        start = time.perf_counter()
+        message = signal.message
+        channel = channel_router.find(signal.channel_id)
+
+        try:
+            assert channel is not None, f'Unknown channel {signal.channel_id}'
+            process_message(message, channel)
+        except:
+            logger.log('ERROR', Logger.join_contents(message.content, message.parent_content) + '\n\n'
+                       + traceback.format_exc())
+
+        # times of ingestion process are compared by wall clock of same machine
+        metrics.observe('signal_queue_seconds', signal.delivered_at - signal.sent_at)
+        metrics.observe('signal_execution_seconds', time.perf_counter() - start)
+        metrics.observe('signal_end_to_end_seconds', time.time() - signal.received_at)
+
+
+    def process_message(message: Message, channel: Channel) -> None:
+        if paper_bomberman_coins is not None:
+            # paper instance runs after live one returns, so it does not delay live orders
+            loop.call_soon(process_paper_message, message, channel.trade_amounts)
+
+        bomberman_coins.process_message(message, channel.trade_amounts)
+
+
     def process_api_spot_message(msg: Dict[str, Any]) -> None:
         try:
-            bomberman_coins.process_api_spot_message(msg)
+            execute_once(f'spot:{msg["e"]}:{msg["E"]}:{msg.get("i")}:{msg.get("X")}:{msg.get("z")}',
+                         lambda: bomberman_coins.process_api_spot_message(msg))
         except:
             logger.log('ERROR', traceback.format_exc())
 
 
     def process_api_futures_message(msg: Dict[str, Any]) -> None:
         try:
-            bomberman_coins.process_api_futures_message(msg)
+            execute_once(f'futures:{msg["e"]}:{msg["E"]}:{msg["o"]["i"] if "o" in msg else None}',
+                         lambda: bomberman_coins.process_api_futures_message(msg))
         except:
             logger.log('ERROR', traceback.format_exc())
 
 
-    try:
-        binance_socket.start_user_socket(process_api_spot_message)
+    def execute_once(key: str, action: Callable[[], None]) -> None:
+        # both instances receive same messages and order events, key identifies them in journal
+        if standby_gate is not None:
+            standby_gate.execute_once(key, action)
+        else:
+            action()
+
+
+    def activate() -> None:
+        # standby loads orders and positions saved by previous active instance before it starts trading
+        if standby_gate is not None:
+            bomberman_coins.reload()
+            risk_engine.load(position_manager.get_positions(), order_storage.get_orders(), spot_api.get_balances())
+
+        bomberman_coins.watch_symbols()
+        position_manager.start()
+        scheduler.every('limit_buy_expiry', LIMIT_BUY_EXPIRY_INTERVAL, bomberman_coins.expire_limit_orders)
+
+        if paper_bomberman_coins is not None:
+            paper_position_manager.start()
+            scheduler.every('paper_limit_buy_expiry', LIMIT_BUY_EXPIRY_INTERVAL,
+                            paper_bomberman_coins.expire_limit_orders)
+
+
+    def stop() -> None:
+        # other instance took over lease while this one was hung, so this one must not trade anymore
+        main_task.cancel()
+
+
+    if standby_config['enabled']:
+        # instance acquiring lease trades, other one keeps caches and streams warm until lease is released
+        lease = Lease(standby_config['lease_file'])
+        standby_gate: Optional[StandbyGate] = StandbyGate(lease, Journal(standby_config['journal_file']), activate,
+                                                          stop, STANDBY_BUFFER_SECONDS, logger)
+    else:
+        standby_gate = None
+
+
+    def process_paper_message(message: Message, trade_amounts: Optional[TradeAmounts]) -> None:
+        # channel trade amounts override paper trade amounts too, so both instances trade same channels
+        assert paper_bomberman_coins is not None
+
+        try:
+            paper_bomberman_coins.process_message(message, trade_amounts)
+        except PriceUnavailable as e:
+            # message is processed again after first streamed trade of symbol, so price is not requested
+            symbol = e.symbol
+            paper_exchange.wait_price(symbol, PAPER_PRICE_TIMEOUT,
+                                      lambda available: process_paper_price(message, trade_amounts, symbol, available))
+        except:
+            paper_logger.log('ERROR', Logger.join_contents(message.content, message.parent_content) + '\n\n'
+                             + traceback.format_exc())
+
+
+    def process_paper_price(message: Message, trade_amounts: Optional[TradeAmounts], symbol: str,
+                            available: bool) -> None:
+        if available:
+            process_paper_message(message, trade_amounts)
+        else:
+            paper_logger.log_event('paper_signal_skipped', symbol=symbol, reason='no streamed price')
+
+
+    def process_paper_api_message(futures: bool, msg: Dict[str, Any]) -> None:
+        assert paper_bomberman_coins is not None
+
+        try:
+            if futures:
+                paper_bomberman_coins.process_api_futures_message(msg)
+            else:
+                paper_bomberman_coins.process_api_spot_message(msg)
+        except:
+            paper_logger.log('ERROR', traceback.format_exc())
+
+
+    def write_metrics() -> None:
+        for name, api in (('spot', spot_api), ('futures', futures_api)):
+            if api is not None:
+                metrics.set_gauge(f'{name}_used_weight', api.rate_limiter.used_weight)
+                metrics.set_gauge(f'{name}_used_orders', api.rate_limiter.used_orders)
+                metrics.set_gauge(f'{name}_throttled', api.rate_limiter.throttled)
+                metrics.set_gauge(f'{name}_circuits', api.circuit_states)
+                metrics.set_gauge(f'{name}_hedged', api.hedged)
+
+        metrics.set_gauge('risk_exposures', risk_engine.exposures)
+        metrics.set_gauge('channel_unknown_rates', channel_router.get_unknown_rates())
+        metrics.set_gauge('scheduled_jobs', scheduler.jobs)
+
+        if standby_gate is not None:
+            metrics.set_gauge('standby_active', standby_gate.active)
+
+        metrics.write()
+
+
+    def apply_config(new_config: Dict[str, Any], changes: Changes) -> Callable[[], None]:
+        # all values are read and validated before anything is applied, so failed reload keeps previous config
+        app_config = new_config['app']
+        settings = (app_config['spot']['trade_amount'], app_config['futures']['trade_amount'],
+                    app_config['futures']['leverage'], app_config['futures']['max_leverage'])
+        BombermanCoins.check_settings(*settings)
+        limits = (app_config['risk']['max_positions'], app_config['risk']['max_symbol_amount'],
+                  app_config['risk']['max_currency_amount'], app_config['risk']['max_total_amount'])
+        channels = ChannelRouter.parse_channels(new_config['discord'])
+        prefetch_enabled = bool(app_config['prefetch'])
+        limit_buy_ttl = app_config['limit_buy']['ttl'] * 3600
+        cancel_limit_buy_above_target = bool(app_config['limit_buy']['cancel_above_target'])
+        restart_required = [key for key in changes.keys() if not key.startswith(RELOADABLE_SETTINGS)]
+
+        def commit() -> None:
+            bomberman_coins.update_settings(*settings)
+            risk_engine.update_limits(*limits)
+            channel_router.update_channels(channels)
+
+            for api in (spot_api, futures_api):
+                if api is not None:
+                    api.prefetch_enabled = prefetch_enabled
+
+            bomberman_coins.limit_buy_ttl = limit_buy_ttl
+            bomberman_coins.cancel_limit_buy_above_target = cancel_limit_buy_above_target
+
+            if paper_bomberman_coins is not None:
+                paper_bomberman_coins.limit_buy_ttl = limit_buy_ttl
+
+            if len(restart_required) != 0:
+                logger.log_event('config_restart_required', keys=restart_required)
+
+        return commit
+
+
+    config_watcher = ConfigWatcher(args.config_file, config, apply_config, logger)
+
+
+    def profile(args: List[str]) -> str:
+        file_path = profiler.start(float(args[0]) if len(args) != 0 else PROFILE_DURATION)
+
+        return f'Profiling into {file_path}' if file_path is not None else 'Profiler is already running'
+
+
+    control_server.add_command('profile', profile)
+    control_server.add_command('metrics', lambda args: json.dumps(metrics.snapshot(), default=str))
+    control_server.add_command('reload', lambda args: config_watcher.reload())
+
+
+    async def run() -> None:
+        loop_watchdog.start()
+        await control_server.start()
+        loop.add_signal_handler(signal.SIGUSR1, profiler.start, PROFILE_DURATION)
+        scheduler.every('metrics', METRICS_INTERVAL, write_metrics)
+        scheduler.every('config', config_watcher.interval, config_watcher.check)
+        scheduler.every('symbol_registry', SYMBOL_REGISTRY_INTERVAL,
+                        lambda: symbol_registry.load(spot_api, futures_api), blocking=True)
+        scheduler.every('clock_sync', SignedClient.CLOCK_SYNC_INTERVAL, binance_client.refresh_clock, blocking=True)
+        binance_streams.start_user_socket(process_api_spot_message)
+        symbol_watcher.start()
+        symbol_watcher.start_ticker_socket('BTCUSDT', lambda msg: risk_engine.set_currency_price(
+            'BTC', parse_decimal(msg['c'])))
+
+        if standby_gate is not None:
+            gate = standby_gate
+            gate.poll(LEASE_STALE_TIMEOUT)  # free lease is acquired at once
+            scheduler.every('lease', LEASE_POLL_INTERVAL, lambda: gate.poll(LEASE_STALE_TIMEOUT))
+        else:
+            activate()
 
         if config['app']['market_type'] == BombermanCoins.MARKET_TYPE_FUTURES:
-            # there is no method for listening future changes in binance socket manager
-            binance_socket._start_futures_socket(
-                binance_client._request_futures_api('post', 'listenKey')['listenKey'],
-                process_api_futures_message,
-            )
-
-        binance_socket.start()
-        discord_client.run(config['discord']['token'], bot=False)
+            binance_streams.start_futures_user_socket(process_api_futures_message)
+
+        if signal_receiver is not None:
+            await signal_receiver.start()
+            logger.log_event('ready', startup_seconds=time.perf_counter() - started_at)
+            await signal_receiver.serve_forever()
+        elif discord_client is not None:
+            await discord_client.start(config['discord']['token'], bot=False)
+
+
+    async def close() -> None:
+        loop_watchdog.stop()
+        scheduler.close()
+        metrics.write()
+        await control_server.close()
+
+        if signal_receiver is not None:
+            await signal_receiver.close()
+        elif discord_client is not None:
+            await discord_client.close()
+
+        if paper_bomberman_coins is not None:
+            paper_exchange.close()
+            paper_logger.close()
+            paper_directory.cleanup()
+
+        if standby_gate is not None:
+            lease.release()
+
+        symbol_watcher.close()
+        await binance_streams.close()
+        await async_binance_client.close_connection()
+
+
+    main_task = loop.create_task(run())
+
+    try:
+        loop.run_until_complete(main_task)
     except KeyboardInterrupt:
         exit(0)
+    except asyncio.CancelledError:
+        logger.log('TERMINATED', 'Lease was taken over by other instance')
+        exit(1)
     except:
         logger.log('TERMINATED', traceback.format_exc())
         exit(1)
     finally:
-        binance_socket.close()
-
-        try:
-            reactor.stop()  # type: ignore
-        except ReactorNotRunning:
-            pass
+        loop.run_until_complete(close())
+        logger.close()
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import time
+import traceback
+from argparse import ArgumentParser
+from typing import Any, Callable, Dict, Optional
+
+from binance.client import Client
+from discord import Client as DiscordClient, Message as DiscordMessage
+
+from automation.api.spot_api import SpotApi
+from automation.bomberman_coins import BombermanCoins
+from automation.channel_router import ChannelRouter
+from automation.config_watcher import Changes, ConfigWatcher
+from automation.control_server import ControlServer
+from automation.functions import load_config
+from automation.logger import Logger
+from automation.loop_watchdog import LoopWatchdog
+from automation.metrics import Metrics
+from automation.parser.message_parser import UnknownMessage
+from automation.parser.parser import Parser
+from automation.scheduler import Scheduler
+from automation.signal_queue import SignalSender
+from automation.symbol_registry import SymbolRegistry
+
+METRICS_INTERVAL = 10  # seconds
+SYMBOL_REGISTRY_INTERVAL = 3600  # seconds, new listings are loaded
+RELOADABLE_SETTINGS = ('discord.channel', 'discord.test_user')
+
+if __name__ == '__main__':
+    # receives and parses discord messages, parsed messages are executed by run_bomberman_coins.py, so discord,
+    # parsing, emails and logging of this process do not delay orders
+    started_at = time.perf_counter()
+    parser = ArgumentParser()
+    parser.add_argument('--config-file')
+    args = parser.parse_args()
+    config = load_config(args.config_file)
+    assert config['app']['processes']['split'], 'Processes are not split in config'
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    discord_client = DiscordClient()
+    binance_client = Client()  # only public exchange info is loaded
+    logger = Logger('log/ingestion.jsonl',
+                    config['email']['recipient'],
+                    config['email']['host'],
+                    config['email']['user'],
+                    config['email']['password'])
+    scheduler = Scheduler(loop, logger)
+    metrics = Metrics('log/ingestion_metrics.json')
+    loop_watchdog = LoopWatchdog(metrics, logger)
+    control_server = ControlServer('data/ingestion.sock', logger)
+    signal_sender = SignalSender(config['app']['processes']['socket'], logger)
+    spot_api = SpotApi(binance_client)
+
+    if config['app']['market_type'] == BombermanCoins.MARKET_TYPE_FUTURES:
+        from automation.api.futures_api import FuturesApi
+
+        futures_api: Optional[FuturesApi] = FuturesApi(config['app']['futures']['margin_type'], binance_client)
+    else:
+        futures_api = None
+
+    symbol_registry = SymbolRegistry()
+    symbol_registry.load(spot_api, futures_api)
+    Parser.symbol_registry = symbol_registry
+    channel_router = ChannelRouter.from_config(config['discord'], metrics)
+
+
+    @discord_client.event
+    async def on_ready() -> None:
+        logger.log_event('ready', startup_seconds=time.perf_counter() - started_at)
+
+
+    @discord_client.event
+    async def on_message(message: DiscordMessage) -> None:
+        received_at = time.time()
+        content, parent_content = '', None
+        channel = channel_router.get(message.channel.id, str(message.author))
+
+        if channel is None:
+            return
+
+        try:
+            start = time.perf_counter()
+            content = message.content
+
+            if message.reference is not None and message.reference.resolved is not None:
+                parent_content = message.reference.resolved.content
+
+            parsed_message = channel_router.parse(channel, content, parent_content)
+            signal_sender.send(channel.channel_id, parsed_message, received_at)
+            metrics.observe('signal_ingestion_seconds', time.perf_counter() - start)
+        except UnknownMessage:
+            logger.log('UNKNOWN MESSAGE', Logger.join_contents(content, parent_content))
+        except:
+            logger.log('ERROR', Logger.join_contents(content, parent_content) + '\n\n' + traceback.format_exc())
+
+
+    def write_metrics() -> None:
+        metrics.set_gauge('signal_queue_connected', signal_sender.connected)
+        metrics.set_gauge('channel_unknown_rates', channel_router.get_unknown_rates())
+        metrics.write()
+
+
+    def apply_config(new_config: Dict[str, Any], changes: Changes) -> Callable[[], None]:
+        # channels are parsed before they are applied, so failed reload keeps previous ones
+        channels = ChannelRouter.parse_channels(new_config['discord'])
+        restart_required = [key for key in changes.keys()
+                            if key.startswith(('discord', 'app.processes')) and not key.startswith(RELOADABLE_SETTINGS)]
+
+        def commit() -> None:
+            channel_router.update_channels(channels)
+
+            if len(restart_required) != 0:
+                logger.log_event('config_restart_required', keys=restart_required)
+
+        return commit
+
+
+    config_watcher = ConfigWatcher(args.config_file, config, apply_config, logger)
+    control_server.add_command('metrics', lambda args: json.dumps(metrics.snapshot(), default=str))
+    control_server.add_command('reload', lambda args: config_watcher.reload())
+
+
+    async def run() -> None:
+        loop_watchdog.start()
+        await control_server.start()
+        scheduler.every('metrics', METRICS_INTERVAL, write_metrics)
+        scheduler.every('config', config_watcher.interval, config_watcher.check)
+        scheduler.every('symbol_registry', SYMBOL_REGISTRY_INTERVAL,
+                        lambda: symbol_registry.load(spot_api, futures_api), blocking=True)
+        loop.create_task(signal_sender.run())
+        await discord_client.start(config['discord']['token'], bot=False)
+
+
+    async def close() -> None:
+        loop_watchdog.stop()
+        scheduler.close()
+        metrics.write()
+        await control_server.close()
+        await discord_client.close()
+        await signal_sender.close()
+
+
+    try:
+        loop.run_until_complete(run())
+    except KeyboardInterrupt:
+        exit(0)
+    except:
+        logger.log('TERMINATED', traceback.format_exc())
+        exit(1)
+    finally:
+        loop.run_until_complete(close())
+        logger.close()
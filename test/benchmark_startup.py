@@ -0,0 +1,83 @@
+import re
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+from collections import defaultdict
+from tempfile import TemporaryDirectory
+from typing import Callable, Dict, List, Tuple
+
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+# milliseconds including interpreter, python-binance alone takes ~1 s because its package imports AsyncClient
+IMPORT_BUDGET = 1500
+
+
+def measure_imports(module: str) -> Dict[str, float]:
+    # self time of every imported module summed by top level package, in milliseconds
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                             stderr=subprocess.PIPE, universal_newlines=True)
+
+    if process.returncode != 0:
+        print(f'Import of {module} failed, timings are incomplete:\n{process.stderr.splitlines()[-1]}')
+
+    packages: Dict[str, float] = defaultdict(float)
+
+    for line in process.stderr.splitlines():
+        m = IMPORT_TIME.match(line)
+
+        if m is not None:
+            packages[m.group(4).split('.')[0]] += int(m.group(1)) / 1000
+
+    return packages
+
+
+def measure_inits(config_file: str) -> List[Tuple[str, float]]:
+    from automation.functions import load_config
+    from automation.logger import Logger
+    from automation.order_storage import OrderStorage
+    from automation.parser.message_parser import MessageParser
+
+    with TemporaryDirectory() as directory:
+        logger: List[Logger] = []
+        steps: List[Tuple[str, Callable[[], object]]] = [
+            ('load_config', lambda: load_config(config_file)),
+            ('Logger', lambda: logger.append(Logger(f'{directory}/log.jsonl', '', '', '', ''))),
+            ('OrderStorage', lambda: OrderStorage(f'{directory}/orders.pickle')),
+            ('first parse', lambda: MessageParser.parse('OCEAN/USDT Vstup: market 1. target: 1.16 Stoploss: 0.85',
+                                                        None)),
+        ]
+        timings = []
+
+        for name, step in steps:
+            start = time.perf_counter()
+            step()
+            timings.append((name, (time.perf_counter() - start) * 1000))
+
+        logger[0].close()
+
+    return timings
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--config-file', default='config.yaml.example')
+    parser.add_argument('--module', default='run_bomberman_coins')
+    parser.add_argument('--budget', type=float, default=IMPORT_BUDGET, help='maximum import time in milliseconds')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    imports = measure_imports(args.module)
+    import_duration = (time.perf_counter() - start) * 1000
+    print(f'Import of {args.module} took {import_duration:.0f} ms (including interpreter), budget {args.budget:.0f} ms')
+
+    for package, duration in sorted(imports.items(), key=lambda item: item[1], reverse=True)[:20]:
+        print(f'{duration:10.1f} ms  {package}')
+
+    print('\nInit')
+
+    for name, duration in measure_inits(args.config_file):
+        print(f'{duration:10.1f} ms  {name}')
+
+    if import_duration > args.budget:
+        print(f'\nImport exceeded budget by {import_duration - args.budget:.0f} ms')
+        sys.exit(1)
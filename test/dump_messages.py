@@ -0,0 +1,28 @@
+import json
+
+from discord import Client
+
+from automation.functions import load_config
+
+if __name__ == '__main__':
+    config = load_config()
+    dc = Client()
+
+
+    @dc.event
+    async def on_ready() -> None:
+        channel = dc.get_channel(config['discord']['channel'])
+        messages = []
+
+        async for message in channel.history(limit=None):
+            parent_content = message.reference.resolved.content if message.reference is not None else None
+            messages.append(dict(id=message.id, content=message.content, parent_content=parent_content))
+
+        with open('data/messages.json', 'w') as h:
+            json.dump(messages, h, indent=1)
+
+        print(f'Dumped {len(messages)} messages')
+        await dc.close()
+
+
+    dc.run(config['discord']['token'], bot=False)
@@ -0,0 +1,38 @@
+import time
+from argparse import ArgumentParser
+
+from automation.parser.corpus import diff_results, load_corpus, load_results, parse_corpus, save_results
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--corpus', default='data/messages.json')
+    parser.add_argument('--baseline', default='data/messages_baseline.json')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    messages = load_corpus(args.corpus)
+    contents = {message_id: (content, parent_content) for message_id, content, parent_content in messages}
+    start = time.perf_counter()
+    results = parse_corpus(messages, args.workers, args.chunk_size)
+    duration = time.perf_counter() - start
+    print(f'Parsed {len(results)} messages in {duration:.2f}s')
+
+    if args.save_baseline:
+        save_results(args.baseline, results)
+        print(f'Baseline saved to {args.baseline}')
+        exit(0)
+
+    baseline = load_results(args.baseline)
+    diff = diff_results(baseline, results)
+
+    for category, message_ids in diff.items():
+        print(f'\n===== {category.replace("_", " ").upper()}: {len(message_ids)}')
+
+        for message_id in message_ids:
+            content, parent_content = contents[message_id]
+            print(f'\n--- {message_id}\n{content}\n-----\n{parent_content}')
+            print(f'baseline: {baseline.get(message_id)}\ncurrent:  {results[message_id]}')
+
+    exit(1 if len(diff['newly_unknown']) != 0 or len(diff['changed']) != 0 else 0)
@@ -0,0 +1,66 @@
+import os
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from automation.channel_router import ChannelRouter, OFFICIAL_CHANNEL
+from automation.message.buy_message import BuyMessage
+from automation.message.unknown_message import UnknownMessage
+from automation.metrics import Metrics
+
+BUY_CONTENT = '''
+    16.12.20 IRIS/BTC
+    Vstup : 281
+    1. target : 310
+    Stoploss : 260
+'''
+
+
+class TestChannelRouter(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.metrics = Metrics(os.path.join(self.directory.name, 'metrics.json'))
+        self.router = ChannelRouter.from_config({
+            'channel': OFFICIAL_CHANNEL,
+            'test_user': 'tester#1',  # ignored for official channel
+            'channels': {
+                1: {'name': 'sells', 'parsers': ['sell'], 'test_user': 'tester#1'},
+                2: {'trade_amount': {'spot': {'USDT': Decimal(50)}}},
+            },
+        }, self.metrics)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_get(self):
+        self.assertEqual(self.router.get(OFFICIAL_CHANNEL, 'someone#2').name, 'main')
+        self.assertIsNone(self.router.get(1, 'someone#2'))
+        self.assertEqual(self.router.get(1, 'tester#1').name, 'sells')
+        self.assertEqual(self.router.get(2, 'someone#2').trade_amounts, {'SPOT': {'USDT': Decimal(50)}})
+        self.assertIsNone(self.router.get(3, 'tester#1'))
+
+    def test_parse(self):
+        main = self.router.get(OFFICIAL_CHANNEL, 'someone#2')
+        sells = self.router.get(1, 'tester#1')
+        self.assertIsInstance(self.router.parse(main, BUY_CONTENT, None), BuyMessage)
+
+        with self.assertRaises(UnknownMessage):
+            self.router.parse(sells, BUY_CONTENT, None)  # channel has only sell parser
+
+        self.assertEqual(self.router.get_unknown_rates(), {'main': 0.0, 'sells': 1.0, '2': 0.0})
+        counters = self.metrics.snapshot()['counters']
+        self.assertEqual(counters['channel_main_messages'], 1)
+        self.assertEqual(counters['channel_sells_unknown_messages'], 1)
+
+    def test_update_channels(self):
+        sells = self.router.get(1, 'tester#1')
+
+        with self.assertRaises(UnknownMessage):
+            self.router.parse(sells, BUY_CONTENT, None)
+
+        channels = ChannelRouter.parse_channels({'channel': OFFICIAL_CHANNEL,
+                                                 'channels': {1: {'name': 'sells', 'parsers': ['buy']}}})
+        self.router.update_channels(channels)
+        self.assertIs(self.router.get(1, 'someone#2'), sells)  # counters continue
+        self.assertIsInstance(self.router.parse(sells, BUY_CONTENT, None), BuyMessage)
+        self.assertEqual(self.router.get_unknown_rates(), {'main': 0.0, 'sells': 0.5})
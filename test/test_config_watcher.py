@@ -0,0 +1,92 @@
+import os
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List, Tuple
+from unittest import TestCase
+
+import yaml
+
+from automation.channel_router import ChannelRouter
+from automation.config_watcher import ConfigWatcher, diff_configs
+from automation.functions import load_config
+from automation.logger import Logger
+
+
+class TestConfigWatcher(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.logger = Logger(os.path.join(self.directory.name, 'log.jsonl'), '', '', '', '')
+        self.file_name = os.path.join(self.directory.name, 'config.yaml')
+        self.write_config(100)
+        self.applied: List[Tuple[Dict[str, Any], Dict[str, Any], Any]] = []
+
+    def tearDown(self):
+        self.logger.close()
+        self.directory.cleanup()
+
+    def write_config(self, amount: Any, parsers: Any = None) -> None:
+        with open('config.yaml.example') as h:
+            config = yaml.safe_load(h)
+
+        config['app']['spot']['trade_amount']['USDT'] = amount
+
+        if parsers is not None:
+            config['discord']['channels'] = {1: {'name': 'other', 'parsers': parsers}}
+
+        with open(self.file_name, 'w') as h:
+            yaml.safe_dump(config, h)
+
+    def apply(self, config: Dict[str, Any], changes: Dict[str, Any]) -> Callable[[], None]:
+        assert config['app']['spot']['trade_amount']['USDT'] > 0
+        channels = ChannelRouter.parse_channels(config['discord'])  # last step, raises for unknown parser
+
+        return lambda: self.applied.append((config, changes, channels))
+
+    def test_diff_configs(self):
+        changes = diff_configs(dict(a=dict(b=1, c=2), d=3), dict(a=dict(b=1, c=4), e=5))
+        self.assertEqual(changes, {'a.c': (2, 4), 'd': (3, None), 'e': (None, 5)})
+
+    def test_reload(self):
+        # absolute path is kept by path join in config loading
+        watcher = ConfigWatcher(self.file_name, load_config(self.file_name), self.apply, self.logger)
+        self.assertEqual(watcher.reload(), 'No changes')
+
+        self.write_config(200)
+        self.assertEqual(watcher.reload(), 'app.spot.trade_amount.USDT: 100 -> 200')
+        self.assertEqual(self.applied[0][1], {'app.spot.trade_amount.USDT': (Decimal(100), Decimal(200))})
+
+        # invalid config is not applied and next valid one is compared with last applied one
+        self.write_config(-1)
+        self.assertEqual(watcher.reload(), 'Config is not valid, previous one is used')
+        self.write_config(300)
+        self.assertEqual(watcher.reload(), 'app.spot.trade_amount.USDT: 200 -> 300')
+
+    def test_failed_last_step(self):
+        watcher = ConfigWatcher(self.file_name, load_config(self.file_name), self.apply, self.logger)
+        self.write_config(200, ['buy', 'unknown'])
+        self.assertEqual(watcher.reload(), 'Config is not valid, previous one is used')
+        self.assertEqual(self.applied, [])  # trade amount of valid first step is not applied either
+
+        self.write_config(200, ['buy'])
+        self.assertIn('app.spot.trade_amount.USDT: 100 -> 200', watcher.reload())
+        self.assertEqual(len(self.applied), 1)
+
+    def test_old_config(self):
+        # config written before optional sections were added
+        with open('config.yaml.example') as h:
+            config = yaml.safe_load(h)
+
+        for key in ('position', 'risk', 'limit_buy', 'prefetch', 'processes', 'standby', 'paper'):
+            del config['app'][key]
+
+        del config['app']['spot']['depth_execution']
+
+        with open(self.file_name, 'w') as h:
+            yaml.safe_dump(config, h)
+
+        config = load_config(self.file_name)
+        self.assertFalse(config['app']['spot']['depth_execution']['enabled'])
+        self.assertEqual(config['app']['risk']['max_total_amount'], Decimal(0))
+        self.assertEqual(config['app']['limit_buy']['ttl'], 0)
+        self.assertFalse(config['app']['paper']['enabled'])
+        self.assertFalse(config['app']['standby']['enabled'])
@@ -0,0 +1,31 @@
+from unittest import TestCase
+
+from automation.parser.corpus import TYPE_BUY, TYPE_SELL, TYPE_UNKNOWN, diff_results, parse_chunk, parse_corpus
+
+
+class TestCorpus(TestCase):
+    MESSAGES = [
+        ('1', '17.02.21 OCEAN/USDT\nVstup : market\n1. target : 1.16\nStoploss : 0.85', None),
+        ('2', 'predajte teraz sme +13%.', '01.03.21 WNXM/USD'),
+        ('3', 'dobre rano', None),
+    ]
+
+    def test_parse_chunk(self):
+        results = parse_chunk(self.MESSAGES)
+        self.assertEqual(results['1'], dict(type=TYPE_BUY, symbol='OCEANUSDT', buy_type='market', buy_price=None,
+                                            targets=['1.16'], stop_loss='0.85'))
+        self.assertEqual(results['2'], dict(type=TYPE_SELL, symbol='WNXMUSDT', sell_type='market'))
+        self.assertEqual(results['3'], dict(type=TYPE_UNKNOWN))
+
+    def test_parse_corpus(self):
+        self.assertEqual(parse_corpus(self.MESSAGES, workers=2, chunk_size=1), parse_chunk(self.MESSAGES))
+
+    def test_diff_results(self):
+        baseline = parse_chunk(self.MESSAGES)
+        results = dict(baseline)
+        results['1'] = dict(results['1'], stop_loss='0.8')
+        results['2'] = dict(type=TYPE_UNKNOWN)
+        results['3'] = dict(type=TYPE_SELL, symbol='XUSDT', sell_type='market')
+        results['4'] = dict(type=TYPE_UNKNOWN)
+        diff = diff_results(baseline, results)
+        self.assertEqual(diff, dict(newly_unknown=['2'], newly_parsed=['3'], changed=['1'], added=['4']))
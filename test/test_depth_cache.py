@@ -0,0 +1,158 @@
+import asyncio
+import os
+import threading
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List
+from unittest import TestCase
+
+from automation.api.api import SymbolInfo
+from automation.api.depth_spot_api import DepthSpotApi
+from automation.depth_cache import DepthCache, DepthCacheManager
+from automation.logger import PaperLogger
+
+SNAPSHOT = dict(lastUpdateId=10, bids=[['0.99', '5'], ['0.98', '10']], asks=[['1.01', '4'], ['1.02', '8']])
+
+
+class DepthClient:
+    def __init__(self, calls: List[str]) -> None:
+        self.calls: List[str] = calls
+
+    def get_order_book(self, **kwargs: Any) -> Dict[str, Any]:
+        self.calls.append('order_book')
+
+        return SNAPSHOT
+
+    def create_order(self, **kwargs: Any) -> Dict[str, Any]:
+        self.calls.append('slice')
+        quantity = min(kwargs['quantity'], Decimal(2))  # rest of order is expired
+
+        return dict(symbol=kwargs['symbol'], side=kwargs['side'], type=kwargs['type'], status='EXPIRED', orderId=1,
+                    executedQty=str(quantity), cummulativeQuoteQty=str(quantity * kwargs['price']))
+
+
+    def order_market_buy(self, **kwargs: Any) -> Dict[str, Any]:
+        self.calls.append(f'market {kwargs["quoteOrderQty"]}')
+
+        return dict(symbol=kwargs['symbol'], side='BUY', type='MARKET', status='FILLED', orderId=2, executedQty='1',
+                    cummulativeQuoteQty=str(kwargs['quoteOrderQty']))
+
+
+class TestDepthCache(TestCase):
+    SNAPSHOT = SNAPSHOT
+
+    def test_snapshot(self):
+        cache = DepthCache('XUSDT')
+        self.assertFalse(cache.ready)
+        cache.apply_diff(dict(U=9, u=11, b=[['0.99', '0']], a=[['1.00', '1']]))
+        cache.apply_snapshot(self.SNAPSHOT)
+        self.assertTrue(cache.ready)
+        self.assertEqual(cache.get_bids(), [(Decimal('0.98'), Decimal('10'))])
+        self.assertEqual(cache.get_asks(), [(Decimal('1.00'), Decimal('1')), (Decimal('1.01'), Decimal('4')),
+                                            (Decimal('1.02'), Decimal('8'))])
+
+    def test_diff(self):
+        cache = DepthCache('XUSDT')
+        cache.apply_snapshot(self.SNAPSHOT)
+        self.assertTrue(cache.apply_diff(dict(U=5, u=10, b=[['0.5', '1']], a=[])))  # already in snapshot
+        self.assertTrue(cache.apply_diff(dict(U=11, u=12, b=[['0.97', '3']], a=[['1.01', '0']])))
+        self.assertEqual(cache.get_bids()[-1], (Decimal('0.97'), Decimal('3')))
+        self.assertEqual(cache.get_asks(), [(Decimal('1.02'), Decimal('8'))])
+
+    def test_gap(self):
+        cache = DepthCache('XUSDT')
+        cache.apply_snapshot(self.SNAPSHOT)
+        self.assertFalse(cache.apply_diff(dict(U=15, u=16, b=[], a=[])))
+        self.assertFalse(cache.ready)
+
+    def test_manager(self):
+        loads: List[str] = []
+        loaded = threading.Event()
+        callbacks: List[Callable[[Dict[str, Any]], None]] = []
+
+        def load_snapshot(symbol: str) -> Dict[str, Any]:
+            loads.append(symbol)
+            loaded.wait(1)
+
+            return self.SNAPSHOT
+
+        def start_socket(symbol: str, callback: Callable[[Dict[str, Any]], None]) -> str:
+            callbacks.append(callback)
+
+            return symbol
+
+        async def run() -> None:
+            manager = DepthCacheManager(load_snapshot, start_socket, lambda key: None)
+            manager.watch('XUSDT')
+            callbacks[0](dict(e='depthUpdate', U=9, u=11, b=[], a=[['1.00', '1']]))
+            callbacks[0](dict(e='depthUpdate', U=12, u=12, b=[['0.97', '3']], a=[]))  # buffered while loading
+            await asyncio.sleep(0.05)  # loop is not blocked by request
+            self.assertIsNone(manager.get('XUSDT'))
+            loaded.set()
+            cache = await manager.wait('XUSDT', 1)
+            assert cache is not None
+            self.assertEqual(cache.get_asks()[0], (Decimal('1.00'), Decimal('1')))
+            self.assertEqual(cache.get_bids()[-1], (Decimal('0.97'), Decimal('3')))
+
+        asyncio.run(run())
+        self.assertEqual(loads, ['XUSDT'])
+
+
+class TestDepthSpotApi(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.logger = PaperLogger(os.path.join(self.directory.name, 'log.jsonl'))
+        self.calls: List[str] = []
+        self.callbacks: List[Callable[[Dict[str, Any]], None]] = []
+        self.api = DepthSpotApi(DepthClient(self.calls), self.start_socket, lambda key: None,  # type: ignore
+                                Decimal(1), 3, self.logger)
+        self.api._symbol_infos['XUSDT'] = SymbolInfo(2, 3, Decimal(1))
+        self.api._SLICE_DELAY = 0.1
+
+    def tearDown(self):
+        self.logger.close()
+        self.directory.cleanup()
+
+    def start_socket(self, symbol: str, callback: Callable[[Dict[str, Any]], None]) -> str:
+        self.callbacks.append(callback)
+
+        return symbol
+
+    def test_market_buy(self):
+        async def run() -> None:
+            loop = asyncio.get_running_loop()
+            self.api.prefetch_enabled = False
+            self.api.prefetch('XUSDT')  # stream is started when signal is accepted
+            # first diff is received while order waits for order book
+            loop.call_later(0.02, self.callbacks[0], dict(e='depthUpdate', U=11, u=11, b=[], a=[]))
+            loop.call_later(0.18, self.calls.append, 'loop')
+            order = await self.api.market_buy_async('XUSDT', Decimal(7))
+            self.assertEqual(order.quantity, Decimal(6))
+
+        asyncio.run(run())
+        # event loop runs between slices
+        self.assertEqual(self.calls, ['order_book', 'slice', 'slice', 'loop', 'slice'])
+
+    def test_market_buy_remainder(self):
+        async def run() -> None:
+            self.api._max_slices = 1
+            self.api.watch_depth('XUSDT')
+            self.callbacks[0](dict(e='depthUpdate', U=11, u=11, b=[], a=[]))
+            order = await self.api.market_buy_async('XUSDT', Decimal(7))
+            self.assertEqual(order.quantity, Decimal(3))  # amount out of slippage is bought by market order
+
+        asyncio.run(run())
+        self.assertEqual(self.calls, ['order_book', 'slice', 'market 4.96'])
+
+    def test_market_sell_dust(self):
+        async def run() -> None:
+            self.api.watch_depth('XUSDT')
+            self.callbacks[0](dict(e='depthUpdate', U=11, u=11, b=[], a=[]))
+            order = await self.api.market_sell_async('XUSDT', Decimal('4.5'))
+            self.assertEqual(order.quantity, Decimal(4))  # remainder under min notional is not sent
+
+        asyncio.run(run())
+        self.assertEqual(self.calls, ['order_book', 'slice', 'slice'])
+
+        with open(os.path.join(self.directory.name, 'log.jsonl')) as h:
+            self.assertIn('depth_dust', h.read())
@@ -0,0 +1,96 @@
+import time
+from decimal import Decimal
+from threading import Thread
+from typing import Any, Dict, List, Optional
+from unittest import TestCase
+
+from binance.exceptions import BinanceAPIException
+
+from automation.api.futures_api import FuturesApi
+from automation.order import Order
+
+EXCHANGE_INFO = {
+    'symbols': [
+        {'symbol': 'XUSDT', 'status': 'TRADING', 'baseAsset': 'X', 'quoteAsset': 'USDT', 'quantityPrecision': 2,
+         'pricePrecision': 3, 'filters': [{'filterType': 'MIN_NOTIONAL', 'notional': '5'}]},
+    ],
+}
+
+
+class FakeResponse:
+    status_code = 400
+    headers: Dict[str, str] = {}
+
+
+class StopOrderClient:
+    # exchange allows one close position stop order per symbol
+    def __init__(self) -> None:
+        self.calls: List[str] = []
+        self.stop_price: Optional[str] = '9'
+        self.fail: bool = False
+        self.delay: float = 0
+
+    def futures_exchange_info(self) -> Dict[str, Any]:
+        return EXCHANGE_INFO
+
+    def futures_get_open_orders(self, symbol: str) -> List[Dict[str, Any]]:
+        self.calls.append('open_orders')
+        time.sleep(self.delay)
+
+        return [dict(orderId=1, type=Order.TYPE_STOP_MARKET, stopPrice=self.stop_price)] if self.stop_price else []
+
+    def futures_cancel_order(self, symbol: str, orderId: int) -> Dict[str, Any]:
+        self.calls.append('cancel')
+        self.stop_price = None
+
+        return dict(orderId=orderId, status=Order.STATUS_CANCELED)
+
+    def futures_cancel_orders(self, symbol: str, orderidlist: List[int]) -> List[Dict[str, Any]]:
+        self.calls.append('cancel targets')
+
+        return [dict(orderId=order_id, origQty='1', executedQty='0') for order_id in orderidlist]
+
+    def futures_create_order(self, stopPrice: Decimal, **kwargs: Any) -> Dict[str, Any]:
+        self.calls.append(f'create {stopPrice}')
+
+        if self.stop_price is not None:
+            raise BinanceAPIException(FakeResponse(), 400, '{"code": -4130, "msg": "Open stop order exists."}')
+
+        if self.fail:
+            self.fail = False
+            raise BinanceAPIException(FakeResponse(), 400, '{"code": -2021, "msg": "Order would trigger."}')
+
+        self.stop_price = str(stopPrice)
+
+        return dict(status=Order.STATUS_NEW)
+
+
+class TestFuturesApi(TestCase):
+    def setUp(self):
+        self.client = StopOrderClient()
+        self.api = FuturesApi(FuturesApi.MARGIN_TYPE_ISOLATED, self.client)  # type: ignore
+
+    def test_replace_stop_loss(self):
+        self.api.replace_stop_loss('XUSDT', Decimal('9.5'))
+        self.assertEqual(self.client.calls, ['open_orders', 'cancel', 'create 9.500'])
+        self.assertEqual(self.client.stop_price, '9.500')
+
+    def test_failed_stop_loss_is_restored(self):
+        self.client.fail = True
+
+        with self.assertRaises(BinanceAPIException):
+            self.api.replace_stop_loss('XUSDT', Decimal('9.5'))
+
+        self.assertEqual(self.client.calls, ['open_orders', 'cancel', 'create 9.500', 'create 9'])
+        self.assertEqual(self.client.stop_price, '9')
+
+    def test_replacement_is_not_interleaved(self):
+        # sell signal on event loop waits for stop loss replaced in thread
+        self.client.delay = 0.1
+        thread = Thread(target=self.api.replace_stop_loss, args=('XUSDT', Decimal('9.5')))
+        thread.start()
+        time.sleep(0.05)
+        self.api.cancel_target_orders('XUSDT', [Order('XUSDT', Order.SIDE_SELL, Order.TYPE_LIMIT, Order.STATUS_NEW, 2,
+                                                      None, Decimal(1), Decimal(11))])
+        thread.join()
+        self.assertEqual(self.client.calls, ['open_orders', 'cancel', 'create 9.500', 'cancel targets'])
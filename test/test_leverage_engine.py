@@ -0,0 +1,31 @@
+from decimal import Decimal
+from unittest import TestCase
+
+from automation.api.api import SymbolInfo
+from automation.api.futures_api import FuturesApi
+from automation.leverage_engine import LeverageEngine
+
+
+class TestLeverageEngine(TestCase):
+    def setUp(self):
+        self.futures_api = FuturesApi(FuturesApi.MARGIN_TYPE_ISOLATED, client=None)
+        # symbol infos are cached from futures exchange info
+        self.futures_api._FuturesApi__symbol_infos['XUSDT'] = SymbolInfo(2, 2, Decimal(10))  # type: ignore
+
+    def test_leverage(self):
+        engine = LeverageEngine(self.futures_api, max_leverage=10)
+        targets = [Decimal(12), Decimal(14)]
+        self.assertEqual(engine.get_leverage('XUSDT', Decimal(100), Decimal(10), targets, Decimal(9)), 5)
+        self.assertEqual(engine.get_leverage('XUSDT', Decimal(100), Decimal(10), targets, Decimal(8)), 5)
+
+        engine = LeverageEngine(self.futures_api, max_leverage=3)
+        self.assertEqual(engine.get_leverage('XUSDT', Decimal(100), Decimal(10), targets, Decimal(9)), 3)
+
+    def test_single_leverage(self):
+        engine = LeverageEngine(self.futures_api, max_leverage=125)
+        calls = []
+        get_buy_order_amounts = self.futures_api.get_buy_order_amounts
+        self.futures_api.get_buy_order_amounts = lambda *args, **kwargs: (  # type: ignore
+            calls.append(args[1]) or get_buy_order_amounts(*args, **kwargs))
+        engine.get_leverage('XUSDT', Decimal(100), Decimal(10), [Decimal(12), Decimal(14)], Decimal(9))
+        self.assertEqual(calls, [Decimal(10)])  # only chosen leverage is computed
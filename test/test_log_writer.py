@@ -0,0 +1,51 @@
+import gzip
+import json
+import os
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase
+
+from automation.log_writer import LogWriter
+
+
+class TestLogWriter(TestCase):
+    def test_write(self):
+        with TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'test.jsonl')
+            writer = LogWriter(file_path)
+            threads = [Thread(target=lambda t=t: [writer.write(dict(thread=t, i=i)) for i in range(100)])
+                       for t in range(4)]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+            writer.close()
+
+            with open(file_path) as h:
+                records = [json.loads(line) for line in h]
+
+            self.assertEqual(len(records), 400)
+
+            for t in range(4):
+                self.assertEqual([r['i'] for r in records if r['thread'] == t], list(range(100)))
+
+    def test_rotate(self):
+        with TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'test.jsonl')
+
+            for i in range(2):
+                writer = LogWriter(file_path, max_bytes=100)
+                writer.write(dict(message='x' * 60, i=i))
+                writer.close()
+
+            rotated = sorted(name for name in os.listdir(directory) if name.endswith('.gz'))
+            self.assertEqual(len(rotated), 1)
+
+            with gzip.open(os.path.join(directory, rotated[0]), 'rt') as h:
+                self.assertEqual(json.loads(h.read())['i'], 0)
+
+            with open(file_path) as h:
+                self.assertEqual(json.loads(h.read())['i'], 1)
@@ -0,0 +1,38 @@
+import asyncio
+import json
+import os
+import time
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from automation.logger import Logger
+from automation.loop_watchdog import LoopWatchdog
+from automation.metrics import Metrics
+
+
+class TestLoopWatchdog(TestCase):
+    def test_blocked_loop(self):
+        with TemporaryDirectory() as directory:
+            log_file = os.path.join(directory, 'log.jsonl')
+            logger = Logger(log_file, '', '', '', '')
+            metrics = Metrics(os.path.join(directory, 'metrics.json'))
+            watchdog = LoopWatchdog(metrics, logger, interval=0.01, threshold=0.1)
+
+            async def run() -> None:
+                watchdog.start()
+                await asyncio.sleep(0.05)
+                time.sleep(0.3)  # blocking call
+                await asyncio.sleep(0.05)
+                watchdog.stop()
+
+            asyncio.run(run())
+            logger.close()
+            snapshot = metrics.snapshot()
+            self.assertEqual(snapshot['counters']['loop_blocked'], 1)
+            self.assertGreaterEqual(snapshot['histograms']['loop_lag_seconds']['max'], 0.2)
+
+            with open(log_file) as h:
+                events = [json.loads(line) for line in h]
+
+            self.assertEqual(events[0]['event'], 'loop_blocked')
+            self.assertIn('time.sleep(0.3)', events[0]['stack'])
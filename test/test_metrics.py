@@ -0,0 +1,21 @@
+from unittest import TestCase
+
+from automation.metrics import Metrics
+
+
+class TestMetrics(TestCase):
+    def test_snapshot(self):
+        metrics = Metrics('metrics.json')
+        metrics.increment('messages')
+        metrics.increment('messages', 2)
+        metrics.set_gauge('used_weight', 10)
+
+        for value in (0.002, 0.003, 0.2, 20):
+            metrics.observe('latency', value, buckets=(0.01, 1))
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters'], dict(messages=3))
+        self.assertEqual(snapshot['gauges'], dict(used_weight=10))
+        self.assertEqual(snapshot['histograms']['latency']['count'], 4)
+        self.assertEqual(snapshot['histograms']['latency']['max'], 20)
+        self.assertEqual(snapshot['histograms']['latency']['buckets'], {'le_0.01': 2, 'le_1': 1, 'inf': 1})
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import os
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List, Tuple
+from unittest import TestCase
+
+from automation.api.api import SymbolInfo
+from automation.api.paper_api import PaperSpotApi
+from automation.order import Order
+from automation.paper_exchange import PaperExchange, PriceUnavailable
+
+
+class LiveApi:
+    @staticmethod
+    def get_symbol_info(symbol: str) -> SymbolInfo:
+        return SymbolInfo(2, 2, Decimal(10))
+
+
+class TestPaperExchange(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.ledger_file = os.path.join(self.directory.name, 'ledger.jsonl')
+        self.sockets: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self.events: List[Tuple[bool, Dict[str, Any]]] = []
+        self.exchange = PaperExchange(self.ledger_file, self.start_socket, self.sockets.pop,  # type: ignore
+                                      lambda futures, msg: self.events.append((futures, msg)))
+        self.api = PaperSpotApi(None, LiveApi(), self.exchange)  # type: ignore
+
+    def tearDown(self):
+        self.exchange.close()
+        self.directory.cleanup()
+
+    def start_socket(self, symbol, callback):
+        self.sockets[symbol] = callback
+        return symbol
+
+    def trade(self, price: str) -> None:
+        self.sockets['XUSDT']({'p': price})
+
+    def test_spot_trade(self):
+        buy_order = self.api.limit_buy('XUSDT', Decimal(10), Decimal(100))
+        self.assertEqual(buy_order.status, Order.STATUS_NEW)
+        self.trade('10.5')
+        self.assertEqual(self.exchange.get_position_quantity('XUSDT', False), Decimal(0))
+        self.trade('9.9')
+        self.assertEqual(self.events[-1][1]['X'], Order.STATUS_FILLED)
+        self.assertEqual(self.events[-1][1]['L'], '10.00')  # limit price
+        self.assertEqual(self.exchange.get_position_quantity('XUSDT', False), Decimal(10))
+
+        self.api.oco_sell('XUSDT', Decimal(10), [Decimal(11), Decimal(12)], Decimal(9))
+        self.trade('11.1')
+        filled = [msg for _, msg in self.events if msg['X'] == Order.STATUS_FILLED and msg['S'] == Order.SIDE_SELL]
+        self.assertEqual([(msg['o'], msg['l']) for msg in filled], [(Order.TYPE_LIMIT_MAKER, '5.00')])
+        self.assertEqual(self.events[-1][1]['X'], Order.STATUS_CANCELED)  # stop loss of same OCO
+        sell_order = Order('XUSDT', Order.SIDE_SELL, Order.TYPE_LIMIT_MAKER, Order.STATUS_FILLED, filled[0]['i'], 1,
+                           Decimal(5), Decimal(11))
+        self.assertEqual(self.api.get_sell_order_pnl(sell_order), Decimal(5))
+
+        self.assertEqual(self.api.cancel_open_orders('XUSDT'), Decimal(5))
+        self.assertNotIn('XUSDT', self.sockets)  # nothing to fill
+        market_order = self.api.market_sell('XUSDT', Decimal(5))
+        self.assertEqual(market_order.price, Decimal('11.1'))  # last trade
+        self.assertEqual(self.exchange.get_position_quantity('XUSDT', False), Decimal(0))
+
+        self.exchange.close()
+
+        with open(self.ledger_file) as h:
+            ledger = [json.loads(line) for line in h]
+
+        self.assertEqual([(row['side'], row['price'], row['pnl']) for row in ledger],
+                         [('BUY', '10', None), ('SELL', '11', '5'), ('SELL', '11.1', '5.5')])
+
+    def test_futures_stop_loss(self):
+        self.exchange.market_order('XUSDT', True, Order.SIDE_BUY, Decimal(10), Decimal(10))
+        self.exchange.limit_order('XUSDT', True, Order.SIDE_SELL, Order.TYPE_STOP_MARKET, Decimal(0), Decimal(9),
+                                  Decimal(9))
+        self.exchange.limit_order('XUSDT', True, Order.SIDE_SELL, Order.TYPE_LIMIT, Decimal(10), Decimal(12))
+        self.trade('8.9')
+
+        filled = [msg['o'] for futures, msg in self.events if msg['o']['X'] == Order.STATUS_FILLED]
+        self.assertEqual([(msg['o'], msg['ot'], msg['l']) for msg in filled],
+                         [(Order.TYPE_MARKET, Order.TYPE_MARKET, '10'),
+                          (Order.TYPE_MARKET, Order.TYPE_STOP_MARKET, '10')])
+        self.assertEqual(self.events[-1][1]['o']['X'], Order.STATUS_CANCELED)  # target of closed position
+        self.assertEqual(self.exchange.get_open_orders('XUSDT', True), [])
+
+    def test_no_exchange_requests(self):
+        with self.assertRaises(Exception):
+            self.api.get_oco_sell_orders('XUSDT')  # not simulated method would send request
+
+    def test_cancel_limit_buy(self):
+        buy_order = self.api.limit_buy('XUSDT', Decimal(10), Decimal(100))
+        self.assertEqual(self.api.cancel_limit_buy('XUSDT', buy_order.order_id), Decimal(0))
+        self.assertEqual(self.events[-1][1]['X'], Order.STATUS_CANCELED)
+
+        buy_order = self.api.limit_buy('XUSDT', Decimal(10), Decimal(100))
+        self.trade('9.9')
+        self.assertIsNone(self.api.cancel_limit_buy('XUSDT', buy_order.order_id))  # filled, event is processed
+
+    def test_wait_price(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        available: List[bool] = []
+
+        with self.assertRaises(PriceUnavailable):
+            self.api.market_buy('XUSDT', Decimal(100))  # live price is not requested
+
+        self.exchange.wait_price('XUSDT', 0.05, available.append)
+        self.trade('10')
+        self.assertEqual(available, [True])
+        self.assertNotIn('XUSDT', self.sockets)
+        self.assertEqual(self.api.market_buy('XUSDT', Decimal(100)).quantity, Decimal(10))
+
+        self.exchange.wait_price('YUSDT', 0.05, available.append)
+        loop.run_until_complete(asyncio.sleep(0.1))
+        self.assertEqual(available, [True, False])
+        self.assertNotIn('YUSDT', self.sockets)
+
+        loop.close()
+        asyncio.set_event_loop(None)
+
+    def test_limit_buy_is_not_cancelled(self):
+        self.exchange.market_order('XUSDT', False, Order.SIDE_BUY, Decimal(10), Decimal(10))
+        self.api.oco_sell('XUSDT', Decimal(10), [Decimal(11)], Decimal(9))
+        buy_order = self.api.limit_buy('XUSDT', Decimal(8), Decimal(80))
+        self.assertEqual(self.api.cancel_open_orders('XUSDT'), Decimal(10))
+        self.assertEqual([order.order_id for order in self.exchange.get_open_orders('XUSDT', False)],
+                         [buy_order.order_id])
+
+    def test_oco_sell_of_small_quantity(self):
+        self.exchange.market_order('XUSDT', False, Order.SIDE_BUY, Decimal(2), Decimal(10))
+        self.api.oco_sell('XUSDT', Decimal(2), [Decimal(11), Decimal(12)], Decimal(9))  # halves are under min notional
+
+        orders = self.exchange.get_open_orders('XUSDT', False)
+        self.assertEqual(sorted((order.type, order.price, order.quantity) for order in orders),
+                         [(Order.TYPE_LIMIT_MAKER, Decimal(11), Decimal(2)),
+                          (Order.TYPE_STOP_LOSS_LIMIT, Decimal(9), Decimal(2))])
+
+    def test_resize_target_orders(self):
+        self.exchange.market_order('XUSDT', False, Order.SIDE_BUY, Decimal(10), Decimal(10))
+        self.api.oco_sell('XUSDT', Decimal(10), [Decimal(11), Decimal(12)], Decimal(9))
+        self.assertEqual(self.api.resize_target_orders('XUSDT', Decimal(1) / 2), Decimal(5))
+
+        orders = self.exchange.get_open_orders('XUSDT', False)
+        self.assertEqual(sorted((order.type, order.price, order.quantity) for order in orders),
+                         [(Order.TYPE_LIMIT_MAKER, Decimal(11), Decimal('2.5')),
+                          (Order.TYPE_LIMIT_MAKER, Decimal(12), Decimal('2.5')),
+                          (Order.TYPE_STOP_LOSS_LIMIT, Decimal(9), Decimal('2.5')),
+                          (Order.TYPE_STOP_LOSS_LIMIT, Decimal(9), Decimal('2.5'))])
@@ -0,0 +1,126 @@
+import asyncio
+import os
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List, Tuple
+from unittest import TestCase
+
+from automation.logger import Logger
+from automation.order import Order
+from automation.position_manager import PositionManager
+
+
+class ReplacingApi:
+    def __init__(self) -> None:
+        self.replaced: List[Tuple[str, Decimal]] = []
+
+    def replace_stop_loss(self, symbol: str, stop_loss: Decimal) -> None:
+        self.replaced.append((symbol, stop_loss))
+
+    async def replace_stop_loss_async(self, symbol: str, stop_loss: Decimal) -> None:
+        self.replace_stop_loss(symbol, stop_loss)
+
+
+class TestPositionManager(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.logger = Logger(os.path.join(self.directory.name, 'log.jsonl'), '', '', '', '')
+        self.api = ReplacingApi()
+        self.sockets: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        self.logger.close()
+        self.directory.cleanup()
+
+    def create_manager(self, breakeven: bool, trailing_stop: Decimal) -> PositionManager:
+        def start_socket(symbol, callback):
+            self.sockets[symbol] = callback
+            return symbol
+
+        manager = PositionManager(os.path.join(self.directory.name, 'positions.pickle'), breakeven, trailing_stop,
+                                  self.api, None, start_socket, self.sockets.pop, self.logger)  # type: ignore
+        manager._MIN_STOP_LOSS_INTERVAL = 0.05
+
+        return manager
+
+    def wait(self, seconds: float = 0.01) -> None:
+        self.loop.run_until_complete(asyncio.sleep(seconds))
+
+    @staticmethod
+    def create_order(order_type: str, price: Decimal) -> Order:
+        return Order('XUSDT', Order.SIDE_SELL, order_type, Order.STATUS_FILLED, 1, 1, Decimal(1), price)
+
+    def test_breakeven(self):
+        manager = self.create_manager(breakeven=True, trailing_stop=Decimal(0))
+        manager.open('XUSDT', False, Decimal(10), Decimal(1), [Decimal(11), Decimal(12), Decimal(13)], Decimal(9))
+        self.assertEqual(self.sockets, {})
+
+        manager.process_filled_sell_order(self.create_order(Order.TYPE_LIMIT_MAKER, Decimal(11)))
+        manager.process_filled_sell_order(self.create_order(Order.TYPE_LIMIT_MAKER, Decimal(12)))
+        self.wait(0.1)
+        self.assertEqual(self.api.replaced, [('XUSDT', Decimal(10))])
+
+        # state is persisted
+        position = self.create_manager(breakeven=True, trailing_stop=Decimal(0)).get('XUSDT')
+        assert position is not None
+        self.assertEqual(position.targets, [Decimal(13)])
+        self.assertEqual(position.stop_loss, Decimal(10))
+
+        manager.process_filled_sell_order(self.create_order(Order.TYPE_STOP_LOSS_LIMIT, Decimal(10)))
+        self.assertIsNone(manager.get('XUSDT'))
+
+    def test_trailing_stop(self):
+        manager = self.create_manager(breakeven=False, trailing_stop=Decimal(10))
+        manager.open('XUSDT', False, Decimal(10), Decimal(1), [Decimal(20)], Decimal(8))
+
+        for price in ('9', '10', '9.5', '8.9'):
+            self.sockets['XUSDT'](dict(p=price))
+
+        self.assertEqual(self.api.replaced, [])
+        self.sockets['XUSDT'](dict(p='10'))
+        self.sockets['XUSDT'](dict(p='9.5'))
+        self.sockets['XUSDT'](dict(p='12'))
+        self.sockets['XUSDT'](dict(p='12.01'))  # too small move
+        self.wait()
+        self.assertEqual(self.api.replaced, [('XUSDT', Decimal('10.8'))])
+
+        # moves within minimum interval are replaced by latest one
+        self.sockets['XUSDT'](dict(p='13'))
+        self.sockets['XUSDT'](dict(p='14'))
+        self.wait()
+        self.assertEqual(len(self.api.replaced), 1)
+        self.wait(0.1)
+        self.assertEqual(self.api.replaced, [('XUSDT', Decimal('10.8')), ('XUSDT', Decimal('12.6'))])
+        position = manager.get('XUSDT')
+        assert position is not None
+        self.assertEqual(position.stop_loss, Decimal('12.6'))
+
+        manager.close('XUSDT')
+        self.assertEqual(self.sockets, {})
+
+    def test_trailing_stop_below_stop_price(self):
+        manager = self.create_manager(breakeven=False, trailing_stop=Decimal('0.5'))
+        manager.open('XUSDT', False, Decimal(10), Decimal(1), [Decimal(20)], Decimal(8))
+        self.sockets['XUSDT'](dict(p='12'))
+        self.wait()
+        self.assertEqual(self.api.replaced, [('XUSDT', Decimal('11.88'))])  # 1% below price
+        manager.close('XUSDT')
+
+    def test_partial_sell(self):
+        manager = self.create_manager(breakeven=True, trailing_stop=Decimal(0))
+        manager.open('XUSDT', False, Decimal(10), Decimal(1), [Decimal(11), Decimal(12)], Decimal(9))
+        manager.process_partial_sell('XUSDT', [Decimal(11)])
+        manager.move_stop_loss_to_entry('XUSDT')
+        self.wait()
+        position = manager.get('XUSDT')
+        assert position is not None
+        self.assertEqual(position.targets, [Decimal(12)])
+        self.assertEqual(position.initial_targets, [Decimal(11), Decimal(12)])
+        self.assertEqual(self.api.replaced, [('XUSDT', Decimal(10))])
+
+        manager.process_partial_sell('XUSDT', [Decimal(12)])
+        self.assertIsNone(manager.get('XUSDT'))
@@ -0,0 +1,74 @@
+import time
+from typing import Any, Dict, List
+from unittest import TestCase
+
+from automation.api.spot_api import SpotApi
+
+SYMBOL_INFO = {
+    'filters': [
+        {'filterType': 'LOT_SIZE', 'stepSize': '0.01000000'},
+        {'filterType': 'PRICE_FILTER', 'tickSize': '0.00100000'},
+        {'filterType': 'MIN_NOTIONAL', 'minNotional': '10.00000000'},
+    ],
+}
+
+
+class SlowClient:
+    def __init__(self) -> None:
+        self.calls: List[str] = []
+        self.fail: bool = False
+
+    def get_symbol_ticker(self, symbol: str) -> Dict[str, Any]:
+        self.calls.append('ticker')
+        time.sleep(0.2)
+
+        if self.fail:
+            raise Exception('Ticker failed')
+
+        return dict(price='2')
+
+    def get_symbol_info(self, symbol: str) -> Dict[str, Any]:
+        self.calls.append('symbol_info')
+        time.sleep(0.2)
+
+        return SYMBOL_INFO
+
+
+class TestPrefetch(TestCase):
+    def setUp(self):
+        self.client = SlowClient()
+        self.api = SpotApi(self.client)  # type: ignore
+        self.api._RETRY_DELAY = 0
+        self.api._HEDGE_AFTER = 1
+
+    def test_prefetch(self):
+        start = time.perf_counter()
+        self.api.prefetch('XUSDT')
+        self.assertEqual(str(self.api.get_current_price('XUSDT')), '2')
+        self.assertEqual(self.api.get_symbol_info('XUSDT').price_precision, 3)
+        self.assertLess(time.perf_counter() - start, 0.35)  # lookups were sent concurrently
+        self.assertEqual(sorted(self.client.calls), ['symbol_info', 'ticker'])
+
+        timing = self.api.finish_prefetch('XUSDT')
+        self.assertGreater(timing['saved_ms'], 100)
+        self.assertEqual(self.api.finish_prefetch('XUSDT'), {})
+
+        self.api.prefetch('XUSDT')  # symbol info is cached
+        self.assertEqual(str(self.api.get_current_price('XUSDT')), '2')
+        self.assertEqual(self.client.calls.count('symbol_info'), 1)
+        self.api.finish_prefetch('XUSDT')
+
+    def test_failed_prefetch(self):
+        self.client.fail = True
+        self.api.prefetch('XUSDT')
+
+        with self.assertRaises(Exception):
+            self.api.get_current_price('XUSDT')  # failed lookup is sent again
+
+        self.assertEqual(self.client.calls.count('ticker'), 2)
+
+    def test_disabled(self):
+        self.api.prefetch_enabled = False
+        self.api.prefetch('XUSDT')
+        self.assertEqual(self.client.calls, [])
+        self.assertEqual(self.api.finish_prefetch('XUSDT'), {})
@@ -0,0 +1,41 @@
+import os
+import threading
+import time
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from automation.logger import Logger
+from automation.profiler import SamplingProfiler
+
+
+class TestSamplingProfiler(TestCase):
+    def test_profile(self):
+        def busy_worker() -> None:
+            end = time.monotonic() + 0.3
+
+            while time.monotonic() < end:
+                pass
+
+        with TemporaryDirectory() as directory:
+            logger = Logger(os.path.join(directory, 'log.jsonl'), '', '', '', '')
+            profiler = SamplingProfiler(directory, logger, interval=0.001)
+            worker = threading.Thread(target=busy_worker, name='worker')
+            worker.start()
+            file_path = profiler.start(0.1)
+            self.assertIsNotNone(file_path)
+            self.assertTrue(profiler.running)
+            self.assertIsNone(profiler.start(0.1))
+            worker.join()
+
+            while profiler.running:
+                time.sleep(0.01)
+
+            logger.close()
+
+            with open(file_path) as h:
+                lines = h.read().splitlines()
+
+            worker_stacks = [line for line in lines if line.startswith('worker;')]
+            self.assertNotEqual(len(worker_stacks), 0)
+            self.assertIn('busy_worker (test_profiler.py:', worker_stacks[0])
+            self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in lines))
@@ -0,0 +1,56 @@
+from threading import Thread
+from unittest import TestCase
+
+from requests import Response
+
+from automation.api.rate_limiter import RateLimiter, RateLimitExceeded
+
+
+class TestRateLimiter(TestCase):
+    @staticmethod
+    def _response(status_code: int = 200, **headers: str) -> Response:
+        response = Response()
+        response.status_code = status_code
+        response.headers.update(headers)
+
+        return response
+
+    def test_update(self):
+        limiter = RateLimiter(1000, 50, 10, 'X-MBX-ORDER-COUNT-10S')
+        limiter.acquire(RateLimiter.PRIORITY_ENTRY, weight=10, orders=1)
+        self.assertEqual(limiter.used_weight, 10)
+        self.assertEqual(limiter.used_orders, 1)
+
+        limiter.update(self._response(**{'X-MBX-USED-WEIGHT-1M': '300', 'X-MBX-ORDER-COUNT-10S': '5'}))
+        self.assertEqual(limiter.used_weight, 300)
+        self.assertEqual(limiter.used_orders, 5)
+
+    def test_low_priority_throttled(self):
+        limiter = RateLimiter(1000, 50, 10, 'X-MBX-ORDER-COUNT-10S')
+        limiter.update(self._response(**{'X-MBX-USED-WEIGHT-1M': '700'}))
+
+        # protective and entry requests still fit into their share of limit
+        limiter.acquire(RateLimiter.PRIORITY_PROTECTIVE, weight=1, orders=1)
+        limiter.acquire(RateLimiter.PRIORITY_ENTRY, weight=1, orders=1)
+
+        # informational request is dropped instead of blocking event loop
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire(RateLimiter.PRIORITY_INFO, weight=1, orders=0)
+
+        self.assertEqual(limiter.throttled[RateLimiter.PRIORITY_INFO], 1)
+        limiter.acquire(RateLimiter.PRIORITY_PROTECTIVE, weight=1, orders=1)
+        self.assertEqual(limiter.used_weight, 703)
+
+        thread = Thread(target=limiter.acquire, args=(RateLimiter.PRIORITY_ENTRY, 200, 0), daemon=True)
+        thread.start()
+        thread.join(0.2)
+        self.assertTrue(thread.is_alive())
+
+    def test_banned(self):
+        limiter = RateLimiter(1000, 50, 10, 'X-MBX-ORDER-COUNT-10S')
+        limiter.update(self._response(429, **{'Retry-After': '60'}))
+
+        thread = Thread(target=limiter.acquire, args=(RateLimiter.PRIORITY_PROTECTIVE, 1, 1), daemon=True)
+        thread.start()
+        thread.join(0.2)
+        self.assertTrue(thread.is_alive())
@@ -0,0 +1,97 @@
+import os
+import statistics
+import time
+from typing import Optional
+from unittest import skipIf, TestCase
+
+from hypothesis import given, settings, strategies as st
+
+from automation.message.buy_message import BuyMessage
+from automation.message.unknown_message import UnknownMessage
+from automation.parser.corpus import load_corpus
+from automation.parser.message_parser import MessageParser
+from automation.parser.regex_guard import audit_pattern, compile_pattern, MAX_CONTENT_LENGTH
+
+PARSE_BUDGET = 0.1  # seconds per message, super-linear backtracking takes seconds on messages this long
+PARSE_RUNS = 5  # median of runs, so one slow run on a busy machine does not fail the test
+SKIP_FUZZ = os.environ.get('SKIP_FUZZ_TESTS') == '1'
+CORPUS_FILE = 'data/messages.json'
+MESSAGES = [
+    '17.02.21 OCEAN/USDT\nVstup : market\n1. target : 1.16\nStoploss : 0.85',
+    '16.12.20 IRIS/BTC\nLimitný vstup : 281\n1. target : 310\n2. target : 330\nStoploss : 260',
+    '05.03.21 LINA/USDT\nVstup: 0.058\nTake profit: 0.07/-10 %',
+    'uzavrite zvyšok, stoploss posuňte na vstup 2. target',
+    'predajte teraz sme +13%.',
+]
+# words of parsed messages, so generated text reaches deeper into patterns than random characters
+TOKENS = ['vstup', 'limitny', 'prikaz', 'market', 'target', 'take profit', 'stoploss', 'stop loss', 'na vstup',
+          'uzavrite', 'zvysok', 'polovicu', 'ocean', '/usdt', '/btc', '/usd', ':', '/', '.', '-', '%', ' ', '\t',
+          '\n', '1', '0.5', 'a', 'š']
+
+
+def truncate(content: str) -> str:
+    # longer messages are rejected before any pattern runs, so generated ones are kept within the limit
+    return content[:MAX_CONTENT_LENGTH]
+
+
+class TestRegexGuard(TestCase):
+    def parse(self, content: str, parent_content: Optional[str] = None) -> None:
+        durations = []
+
+        for _ in range(PARSE_RUNS):
+            start = time.perf_counter()
+
+            try:
+                MessageParser.parse(content, parent_content)
+            except (UnknownMessage, AssertionError):
+                pass  # only unknown messages and failed parser assertions are allowed, other errors fail the test
+
+            durations.append(time.perf_counter() - start)
+
+        self.assertLess(statistics.median(durations), PARSE_BUDGET, repr(content[:100]))
+
+    def test_audit_pattern(self):
+        self.assertEqual(audit_pattern(r'x(a+)+b'), ['nested unbounded quantifier'])
+        self.assertEqual(audit_pattern(r'(?:x|(?:ab*)*)c'), ['nested unbounded quantifier'])
+        self.assertEqual(audit_pattern(r'(\s*):'), ['leading unbounded quantifier'])
+        self.assertEqual(audit_pattern(r'(?<!\w)\w+/usdt'), [])
+        self.assertEqual(audit_pattern(r'[ \t]+'), [])
+        self.assertEqual(audit_pattern(r'x(a{1,3})+b'), [])
+
+        with self.assertRaises(AssertionError):
+            compile_pattern(r'(a*)*b')
+
+    def test_content_length(self):
+        # longest allowed message is parsed, one more character is unknown message before any pattern runs
+        self.assertIsInstance(MessageParser.parse(MESSAGES[0].ljust(MAX_CONTENT_LENGTH), None), BuyMessage)
+
+        with self.assertRaises(UnknownMessage):
+            MessageParser.parse(MESSAGES[0].ljust(MAX_CONTENT_LENGTH + 1), None)
+
+        with self.assertRaises(UnknownMessage):
+            MessageParser.parse(MESSAGES[0] + ' ' * MAX_CONTENT_LENGTH, None)
+
+    def test_pathological_messages(self):
+        for content in ('\n' * MAX_CONTENT_LENGTH, ' \n' * (MAX_CONTENT_LENGTH // 2), 'a' * MAX_CONTENT_LENGTH,
+                        'vstup:' * (MAX_CONTENT_LENGTH // 6), 'stoploss ' * (MAX_CONTENT_LENGTH // 9) + 'uzavrite',
+                        '1.' * (MAX_CONTENT_LENGTH // 2), 'target:1' * (MAX_CONTENT_LENGTH // 8)):
+            self.parse(content, content)
+
+    def test_corpus(self):
+        messages = load_corpus(CORPUS_FILE) if os.path.exists(CORPUS_FILE) else []
+
+        for content in MESSAGES + [content for _, content, _ in messages]:
+            self.parse(content)
+
+    @skipIf(SKIP_FUZZ, 'SKIP_FUZZ_TESTS is set')
+    @settings(max_examples=300, deadline=None)
+    @given(st.lists(st.sampled_from(TOKENS), max_size=MAX_CONTENT_LENGTH // 4).map(''.join).map(truncate),
+           st.one_of(st.none(), st.sampled_from(MESSAGES)))
+    def test_generated_messages(self, content: str, parent_content: Optional[str]):
+        self.parse(content, parent_content)
+
+    @skipIf(SKIP_FUZZ, 'SKIP_FUZZ_TESTS is set')
+    @settings(max_examples=300, deadline=None)
+    @given(st.sampled_from(MESSAGES), st.text(max_size=200), st.integers(min_value=1, max_value=100))
+    def test_mutated_messages(self, message: str, text: str, repeat: int):
+        self.parse(truncate((message + text) * repeat))
@@ -0,0 +1,111 @@
+import time
+from typing import Any, Dict, List
+from unittest import TestCase
+
+from binance.exceptions import BinanceAPIException
+from requests.exceptions import ConnectionError
+
+from automation.api.rate_limiter import RateLimiter
+from automation.api.resilience import CircuitBreaker, CircuitOpenError
+from automation.api.spot_api import SpotApi
+
+
+class UnreliableClient:
+    def __init__(self) -> None:
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.ticker_calls: List[float] = []
+        self.cancelled: List[int] = []
+
+    def order_market_buy(self, **kwargs: Any) -> Dict[str, Any]:
+        # order is created but response is lost
+        self.orders[kwargs['newClientOrderId']] = dict(symbol=kwargs['symbol'], status='FILLED')
+        raise ConnectionError()
+
+    def get_order(self, symbol: str, origClientOrderId: str) -> Dict[str, Any]:
+        if origClientOrderId not in self.orders:
+            raise BinanceAPIException(FakeResponse(), 400, '{"code": -2013, "msg": "Order does not exist."}')
+
+        return self.orders[origClientOrderId]
+
+    def cancel_order(self, symbol: str, orderId: int) -> Dict[str, Any]:
+        # order is cancelled but response is lost, repeated cancel does not find it
+        if orderId in self.cancelled:
+            raise BinanceAPIException(FakeResponse(), 400, '{"code": -2011, "msg": "Unknown order sent."}')
+
+        self.cancelled.append(orderId)
+        raise ConnectionError()
+
+    def get_symbol_ticker(self, symbol: str) -> Dict[str, Any]:
+        self.ticker_calls.append(time.time())
+
+        if len(self.ticker_calls) == 1:
+            time.sleep(0.5)
+            return dict(price='1')
+
+        return dict(price='2')
+
+
+class FakeResponse:
+    status_code = 400
+    headers: Dict[str, str] = {}
+
+
+class TestResilience(TestCase):
+    def setUp(self):
+        self.client = UnreliableClient()
+        self.api = SpotApi(self.client)  # type: ignore
+        self.api._RETRY_DELAY = 0
+        self.api._HEDGE_AFTER = 0.05
+
+    def test_circuit_breaker(self):
+        circuit = CircuitBreaker('test', failure_threshold=2, reset_timeout=0.1)
+        circuit.record_failure()
+        circuit.check()
+        circuit.record_failure()
+        self.assertEqual(circuit.state, CircuitBreaker.STATE_OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            circuit.check()
+
+        time.sleep(0.1)
+        self.assertEqual(circuit.state, CircuitBreaker.STATE_HALF_OPEN)
+        circuit.record_success()
+        self.assertEqual(circuit.state, CircuitBreaker.STATE_CLOSED)
+
+    def test_order_is_not_duplicated(self):
+        info = self.api._request(RateLimiter.PRIORITY_ENTRY, self.client.order_market_buy, orders=1,
+                                 client_order_id_key='newClientOrderId', symbol='XUSDT')
+        self.assertEqual(info, dict(symbol='XUSDT', status='FILLED'))
+        self.assertEqual(len(self.client.orders), 1)
+        self.assertEqual(self.api.circuit_states['order_market_buy'], CircuitBreaker.STATE_CLOSED)
+
+    def test_order_without_client_id_is_not_retried(self):
+        with self.assertRaises(ConnectionError):
+            self.api._request(RateLimiter.PRIORITY_ENTRY, self.client.order_market_buy, orders=1,
+                              newClientOrderId='a', symbol='XUSDT')
+
+        self.assertEqual(len(self.client.orders), 1)
+
+    def test_hedged_request(self):
+        start = time.time()
+        self.assertEqual(self.api.get_current_price('XUSDT'), 2)
+        self.assertLess(time.time() - start, 0.4)
+        self.assertEqual(self.api.hedged, 1)
+
+    def test_cancel_is_retried(self):
+        self.assertIsNone(self.api._request(RateLimiter.PRIORITY_PROTECTIVE, self.client.cancel_order, cancel=True,
+                                            symbol='XUSDT', orderId=1))
+        self.assertEqual(self.client.cancelled, [1])
+
+        with self.assertRaises(ConnectionError):
+            self.api._request(RateLimiter.PRIORITY_PROTECTIVE, self.client.cancel_order, retry=False, symbol='XUSDT',
+                              orderId=2)
+
+        with self.assertRaises(BinanceAPIException):
+            self.api._request(RateLimiter.PRIORITY_PROTECTIVE, self.client.cancel_order, cancel=True, symbol='XUSDT',
+                              orderId=1)  # unknown order of first attempt is error
+
+    def test_prefetched_price_is_not_hedged(self):
+        self.api.prefetch('XUSDT')
+        self.assertEqual(self.api.get_current_price('XUSDT'), 1)
+        self.assertEqual(self.api.hedged, 0)
@@ -0,0 +1,69 @@
+from decimal import Decimal
+from unittest import TestCase
+
+from automation.order import Order
+from automation.risk_engine import RiskEngine
+
+
+def execution_report(symbol, side, order_type, status, order_id, quantity, price, last_quantity='0',
+                     last_price='0', filled='0'):
+    return {'s': symbol, 'S': side, 'o': order_type, 'X': status, 'i': order_id, 'q': quantity, 'p': price,
+            'l': last_quantity, 'L': last_price, 'z': filled}
+
+
+class TestRiskEngine(TestCase):
+    def setUp(self):
+        self.engine = RiskEngine(2, {'USDT': Decimal(150)}, {'USDT': Decimal(250)}, Decimal(300),
+                                 lambda symbol: 'BTC' if symbol.endswith('BTC') else 'USDT')
+
+    def test_symbol_limit(self):
+        self.assertIsNone(self.engine.check('XUSDT', Decimal(100), False))
+        self.engine.reserve('XUSDT', Decimal(100))
+        self.assertIn('XUSDT exposure', self.engine.check('XUSDT', Decimal(100), False))
+
+    def test_max_positions_and_currency_limit(self):
+        self.engine.reserve('XUSDT', Decimal(100))
+        self.engine.reserve('YUSDT', Decimal(100))
+        self.assertIn('positions', self.engine.check('ZUSDT', Decimal(10), False))
+        self.assertIn('USDT exposure', self.engine.check('XUSDT', Decimal(60), False))
+        self.assertIsNone(self.engine.check('XUSDT', Decimal(40), False))
+
+    def test_total_limit(self):
+        self.engine.set_currency_price('BTC', Decimal(50000))
+        self.engine.reserve('XBTC', Decimal('0.004'))
+        self.assertIn('Total exposure', self.engine.check('XUSDT', Decimal(150), False))
+        self.assertIsNone(self.engine.check('XUSDT', Decimal(100), False))
+
+    def test_balance(self):
+        self.engine.process_balances([{'a': 'USDT', 'f': '50.00000000', 'l': '0.00000000'}])
+        self.assertIn('Free balance', self.engine.check('XUSDT', Decimal(100), False))
+        self.assertIsNone(self.engine.check('XUSDT', Decimal(100), True))  # futures use margin
+
+    def test_orders_from_stream(self):
+        self.engine.reserve('XUSDT', Decimal(100))
+        self.engine.process_order(execution_report('XUSDT', Order.SIDE_BUY, Order.TYPE_LIMIT, 'NEW', 1, '10.0', '10.0'))
+        self.assertEqual(self.engine.exposures, {'USDT': Decimal(100)})  # reservation replaced by order
+
+        self.engine.process_order(execution_report('XUSDT', Order.SIDE_BUY, Order.TYPE_LIMIT, 'PARTIALLY_FILLED', 1,
+                                                   '10.0', '10.0', '4.0', '9.0', '4.0'))
+        self.assertEqual(self.engine.exposures, {'USDT': Decimal(96)})  # 60 pending + 36 bought
+
+        self.engine.process_order(execution_report('XUSDT', Order.SIDE_BUY, Order.TYPE_LIMIT, 'FILLED', 1,
+                                                   '10.0', '10.0', '6.0', '10.0', '10.0'))
+        self.assertEqual(self.engine.exposures, {'USDT': Decimal(96)})
+
+        self.engine.process_order(execution_report('XUSDT', Order.SIDE_SELL, Order.TYPE_LIMIT_MAKER, 'FILLED', 2,
+                                                   '5.0', '12.0', '5.0', '12.0', '5.0'))
+        self.assertEqual(self.engine.exposures, {'USDT': Decimal(48)})
+
+        self.engine.process_order(execution_report('XUSDT', Order.SIDE_SELL, Order.TYPE_STOP_LOSS_LIMIT, 'FILLED', 3,
+                                                   '4.99', '8.0', '4.99', '8.0', '4.99'))
+        self.assertEqual(self.engine.exposures, {'USDT': Decimal(0)})  # dust left after fees is not position
+        self.assertIsNone(self.engine.check('YUSDT', Decimal(100), False))
+        self.assertIsNone(self.engine.check('ZUSDT', Decimal(100), False))
+
+    def test_canceled_order(self):
+        self.engine.process_order(execution_report('XUSDT', Order.SIDE_BUY, Order.TYPE_LIMIT, 'NEW', 1, '10.0', '10.0'))
+        self.engine.process_order(execution_report('XUSDT', Order.SIDE_BUY, Order.TYPE_LIMIT, 'CANCELED', 1,
+                                                   '10.0', '10.0'))
+        self.assertEqual(self.engine.exposures, {'USDT': Decimal(0)})
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import os
+import time
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List
+from unittest import TestCase
+
+from automation.logger import PaperLogger
+from automation.scheduler import Scheduler
+
+
+class TestScheduler(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.log_file = os.path.join(self.directory.name, 'log.jsonl')
+        self.logger = PaperLogger(self.log_file)  # errors are not sent by email
+        self.calls: List[str] = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get_events(self) -> List[Dict[str, Any]]:
+        self.logger.close()
+
+        with open(self.log_file) as h:
+            return [json.loads(line) for line in h]
+
+    def test_order(self):
+        async def run() -> None:
+            scheduler = Scheduler(asyncio.get_running_loop(), self.logger)
+            scheduler.call_later('c', 0.08, lambda: self.calls.append('c'))
+            scheduler.call_later('a', 0.02, lambda: self.calls.append('a'))
+            job = scheduler.call_later('x', 0.04, lambda: self.calls.append('x'))
+            scheduler.every('b', 0.05, lambda: self.calls.append('b'))
+            job.cancel()
+            self.assertEqual(scheduler.jobs, ['a', 'b', 'c'])
+            await asyncio.sleep(0.12)
+            self.assertEqual(scheduler.jobs, ['b'])
+            scheduler.close()
+
+        asyncio.run(run())
+        self.assertEqual(self.calls, ['a', 'b', 'c', 'b'])
+
+    def test_failed_job(self):
+        async def run() -> None:
+            scheduler = Scheduler(asyncio.get_running_loop(), self.logger)
+            scheduler.every('failing', 0.05, lambda: 1 / 0, delay=0)
+            scheduler.every('working', 0.05, lambda: self.calls.append('working'))
+            await asyncio.sleep(0.125)
+            scheduler.close()
+
+        asyncio.run(run())
+        self.assertEqual(self.calls, ['working', 'working'])  # failing job does not stop other jobs
+        errors = [event['body'] for event in self.get_events() if event.get('subject') == 'ERROR']
+        self.assertEqual(len(errors), 3)
+        self.assertIn('ZeroDivisionError', errors[0])
+
+    def test_blocking_job(self):
+        def block() -> None:
+            self.calls.append('block')
+            time.sleep(0.05)
+
+        async def run() -> None:
+            scheduler = Scheduler(asyncio.get_running_loop(), self.logger)
+            scheduler.every('block', 0.02, block, blocking=True, delay=0)
+            await asyncio.sleep(0.03)
+            self.calls.append('loop')  # loop is not blocked by job
+            await asyncio.sleep(0.06)
+            scheduler.close()
+
+        asyncio.run(run())
+        self.assertEqual(self.calls[:2], ['block', 'loop'])
+        self.assertIn('job_skipped', [event['event'] for event in self.get_events()])  # previous run not finished
@@ -1,3 +1,4 @@
+from decimal import Decimal
 from unittest import TestCase
 
 from automation.message.sell_message import SellMessage
@@ -7,16 +8,31 @@ from automation.parser.sell_message_parser import SellMessageParser
 
 class TestBuyMessageParser(TestCase):
     def test_zvysok(self):
-        with self.assertRaises(UnknownMessage):
-            SellMessageParser.parse(
-                content='1. target uzavrite uz teraz. zvysok obchodu nechajte bezat a stoploss dajte na vstup',
-                parent_content=None,
-            )
+        msg = SellMessageParser.parse(
+            content='1. target uzavrite uz teraz. zvysok obchodu nechajte bezat a stoploss dajte na vstup',
+            parent_content='11.03.21 HARD/USDT',
+        )
+        self.assertEqual(msg.symbol, 'HARDUSDT')
+        self.assertEqual(msg.sell_type, SellMessage.SELL_PARTIAL)
+        self.assertEqual(msg.targets, [1])
+        self.assertIsNone(msg.fraction)
+        self.assertTrue(msg.stop_loss_to_entry)
 
     def test_polovicu(self):
+        msg = SellMessageParser.parse(
+            content='KEY/USDT uzavrite polovicu pozície už teraz. Stoploss posuňte na vstup. Nejdem to riskovať.',
+            parent_content=None,
+        )
+        self.assertEqual(msg.symbol, 'KEYUSDT')
+        self.assertEqual(msg.sell_type, SellMessage.SELL_PARTIAL)
+        self.assertEqual(msg.fraction, Decimal('0.5'))
+        self.assertIsNone(msg.targets)
+        self.assertTrue(msg.stop_loss_to_entry)
+
+    def test_zvysok_without_target(self):
         with self.assertRaises(UnknownMessage):
             SellMessageParser.parse(
-                content='KEY/USDT uzavrite polovicu pozície už teraz. Stoploss posuňte na vstup. Nejdem to riskovať.',
+                content='KEY/USDT uzavrite cast obchodu, zvysok nechajte bezat',
                 parent_content=None,
             )
 
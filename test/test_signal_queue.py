@@ -0,0 +1,132 @@
+import asyncio
+import json
+import os
+import time
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+from typing import List
+from unittest import TestCase
+
+from automation.logger import Logger
+from automation.message.buy_message import BuyMessage
+from automation.message.sell_message import SellMessage
+from automation.signal_queue import decode_signal, encode_signal, Signal, SignalReceiver, SignalSender
+
+
+class TestSignalQueue(TestCase):
+    BUY = BuyMessage('content', None, 'XUSDT', BuyMessage.BUY_LIMIT, Decimal('0.5'), [Decimal(1), Decimal('1.5')],
+                     Decimal('0.00000012'))
+    SELL = SellMessage('zvysok', 'parent', 'XUSDT', SellMessage.SELL_PARTIAL, targets=[1, 2], stop_loss_to_entry=True)
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.logger = Logger(os.path.join(self.directory.name, 'log.jsonl'), '', '', '', '')
+
+    def tearDown(self):
+        self.logger.close()
+        self.directory.cleanup()
+
+    def test_encoding(self):
+        frame = encode_signal(7, self.BUY, 1.5, 2.5)
+        signal = decode_signal(frame[:20], frame[20:])  # 20 bytes of header
+        self.assertEqual((signal.channel_id, signal.received_at, signal.sent_at), (7, 1.5, 2.5))
+        self.assertEqual(vars(signal.message), vars(self.BUY))
+
+        frame = encode_signal(7, self.SELL, 1.5, 2.5)
+        self.assertEqual(vars(decode_signal(frame[:20], frame[20:]).message), vars(self.SELL))
+
+    def test_queue(self):
+        path = os.path.join(self.directory.name, 'signals.sock')
+        signals: List[Signal] = []
+        receiver = SignalReceiver(path, signals.append, self.logger)
+        sender = SignalSender(path, self.logger)
+        sender._RECONNECT_DELAY = 0.01
+
+        async def run() -> None:
+            task = asyncio.create_task(sender.run())
+            sender.send(1, self.BUY, time.time())  # kept until execution process listens
+            await asyncio.sleep(0.05)
+            await receiver.start()
+
+            while not sender.connected:
+                await asyncio.sleep(0.01)
+
+            sender.send(2, self.SELL, time.time())
+
+            while len(signals) != 2:
+                await asyncio.sleep(0.01)
+
+            await receiver.close()
+            await sender.close()
+            task.cancel()
+
+        asyncio.run(asyncio.wait_for(run(), 5))
+        self.assertEqual([(signal.channel_id, type(signal.message)) for signal in signals],
+                         [(1, BuyMessage), (2, SellMessage)])
+        self.assertLessEqual(signals[1].sent_at, signals[1].delivered_at)
+
+    def test_expired_buy(self):
+        path = os.path.join(self.directory.name, 'signals.sock')
+        signals: List[Signal] = []
+        receiver = SignalReceiver(path, signals.append, self.logger)
+        sender = SignalSender(path, self.logger)
+        sender._RECONNECT_DELAY = 0.01
+
+        async def run() -> None:
+            task = asyncio.create_task(sender.run())
+            sender.send(1, self.BUY, time.time() - 60)  # buy received while execution process was not running
+            sender.send(2, self.SELL, time.time() - 60)
+            await receiver.start()
+
+            while len(signals) != 1:
+                await asyncio.sleep(0.01)
+
+            await receiver.close()
+            await sender.close()
+            task.cancel()
+
+        asyncio.run(asyncio.wait_for(run(), 5))
+        self.assertEqual([signal.channel_id for signal in signals], [2])
+        self.logger.close()
+
+        with open(os.path.join(self.directory.name, 'log.jsonl')) as h:
+            dropped = [event for event in map(json.loads, h) if event.get('event') == 'signal_dropped']
+
+        self.assertEqual([(event['symbol'], event['reason']) for event in dropped], [('XUSDT', 'expired')])
+
+    def test_unacknowledged(self):
+        path = os.path.join(self.directory.name, 'signals.sock')
+        signals: List[Signal] = []
+        receiver = SignalReceiver(path, signals.append, self.logger)
+        sender = SignalSender(path, self.logger)
+        sender._RECONNECT_DELAY = 0.01
+
+        async def run() -> None:
+            received = asyncio.Event()
+
+            async def die(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+                await reader.read(1)  # execution process dies before frame is acknowledged
+                received.set()
+                writer.close()
+
+            server = await asyncio.start_unix_server(die, path)
+            task = asyncio.create_task(sender.run())
+
+            while not sender.connected:
+                await asyncio.sleep(0.01)
+
+            sender.send(1, self.BUY, time.time())
+            await received.wait()
+            server.close()
+            await server.wait_closed()
+            await receiver.start()
+
+            while len(signals) != 1:
+                await asyncio.sleep(0.01)
+
+            await receiver.close()
+            await sender.close()
+            task.cancel()
+
+        asyncio.run(asyncio.wait_for(run(), 5))
+        self.assertEqual([signal.channel_id for signal in signals], [1])  # sent again to new process
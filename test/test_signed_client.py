@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import TestCase
+
+from binance.client import Client
+from requests import Response
+
+from automation.api.signed_client import SignedClient
+
+
+class TestSignedClient(TestCase):
+    def test_same_request_as_client(self):
+        client = Client('key', 'secret', ping=False)
+        signed_client = SignedClient('key', 'secret', ping=False)
+
+        for _ in range(2):  # second request uses cached parameter order
+            data = dict(symbol='XUSDT', side='SELL', quantity=Decimal('1.5'), price=None, timestamp=1)
+            self.assertEqual(signed_client._order_params(data), client._order_params(data))
+            self.assertEqual(signed_client._generate_signature(data), client._generate_signature(data))
+            data['signature'] = 'abc'
+            self.assertEqual(signed_client._order_params(data), client._order_params(data))
+
+    def test_response_of_thread(self):
+        signed_client = SignedClient('key', 'secret', ping=False)
+        responses = [Response(), Response()]
+
+        def request(response: Response) -> Response:
+            for hook in signed_client.session.hooks['response']:
+                hook(response)
+
+            return signed_client.pop_response()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(list(executor.map(request, responses)), responses)
+
+        self.assertIsNone(signed_client.pop_response())
@@ -0,0 +1,95 @@
+from decimal import Decimal
+from typing import Any, Dict, List
+from unittest import TestCase
+
+from automation.api.api import SymbolInfo
+from automation.api.spot_api import SpotApi
+from automation.order import Order
+
+
+class OcoClient:
+    # open OCO sell orders and pending limit buy of one symbol
+    def __init__(self) -> None:
+        self.orders: List[Dict[str, Any]] = []
+        self.deleted: List[Dict[str, Any]] = []
+        self.created: List[Dict[str, Any]] = []
+        self.failing_creates: List[int] = []  # numbers of create requests which fail
+        self._next_id = 1
+        self.add_oco(Decimal(2), Decimal(11), Decimal(9))
+        self.add_oco(Decimal(2), Decimal(12), Decimal(9))
+        self.orders.append(self.create_info(Order.SIDE_BUY, Order.TYPE_LIMIT, Decimal(1), Decimal(8), -1))
+
+    def create_info(self, side: str, order_type: str, quantity: Decimal, price: Decimal,
+                    order_list_id: int) -> Dict[str, Any]:
+        self._next_id += 1
+
+        return dict(symbol='XUSDT', side=side, type=order_type, status=Order.STATUS_NEW, orderId=self._next_id,
+                    orderListId=order_list_id, origQty=str(quantity), executedQty='0', price=str(price))
+
+    def add_oco(self, quantity: Decimal, price: Decimal, stop_loss: Decimal) -> None:
+        order_list_id = self._next_id
+        self.orders += [self.create_info(Order.SIDE_SELL, Order.TYPE_LIMIT_MAKER, quantity, price, order_list_id),
+                        self.create_info(Order.SIDE_SELL, Order.TYPE_STOP_LOSS_LIMIT, quantity, stop_loss,
+                                         order_list_id)]
+
+    def get_open_orders(self, symbol: str) -> List[Dict[str, Any]]:
+        return list(self.orders)
+
+    def _delete(self, path: str, signed: bool, data: Dict[str, Any]) -> Dict[str, Any]:
+        assert path == 'orderList', f'Got {path}'
+        self.deleted.append(data)
+        reports = [info for info in self.orders if info['orderListId'] == data['orderListId']]
+        self.orders = [info for info in self.orders if info not in reports]
+
+        return dict(listStatusType='ALL_DONE', orderReports=reports)
+
+    def order_oco_sell(self, **kwargs: Any) -> Dict[str, Any]:
+        self.created.append(kwargs)
+
+        if len(self.created) in self.failing_creates:
+            raise Exception('Create failed')
+
+        self.add_oco(kwargs['quantity'], kwargs['price'], kwargs['stopLimitPrice'])
+
+        return dict(listStatusType='EXEC_STARTED')
+
+
+class TestSpotApi(TestCase):
+    def setUp(self):
+        self.client = OcoClient()
+        self.api = SpotApi(self.client)  # type: ignore
+        self.api._symbol_infos['XUSDT'] = SymbolInfo(2, 2, Decimal(10))
+
+    def get_open_orders(self) -> List[tuple]:
+        return sorted((info['side'], info['type'], info['origQty'], info['price']) for info in self.client.orders)
+
+    def test_limit_buy_is_not_cancelled(self):
+        self.assertEqual(self.api.cancel_open_orders('XUSDT'), Decimal(4))
+        self.assertEqual(len(self.client.deleted), 2)  # OCO order lists only
+        self.assertEqual(self.get_open_orders(), [(Order.SIDE_BUY, Order.TYPE_LIMIT, '1', '8')])
+
+    def test_replace_stop_loss(self):
+        self.api.replace_stop_loss('XUSDT', Decimal(10))
+        self.assertEqual(self.get_open_orders(), [(Order.SIDE_BUY, Order.TYPE_LIMIT, '1', '8'),
+                                                  (Order.SIDE_SELL, Order.TYPE_LIMIT_MAKER, '2', '11'),
+                                                  (Order.SIDE_SELL, Order.TYPE_LIMIT_MAKER, '2', '12'),
+                                                  (Order.SIDE_SELL, Order.TYPE_STOP_LOSS_LIMIT, '2', '10.00'),
+                                                  (Order.SIDE_SELL, Order.TYPE_STOP_LOSS_LIMIT, '2', '10.00')])
+
+    def test_failed_resize_is_restored(self):
+        original_orders = self.get_open_orders()
+        self.client.failing_creates = [2]
+
+        with self.assertRaises(Exception):
+            self.api.resize_target_orders('XUSDT', Decimal(1) / 2)
+
+        # first resized target is cancelled and both original ones are created again
+        self.assertEqual([kwargs['quantity'] for kwargs in self.client.created], [Decimal(1), Decimal(1), Decimal(2),
+                                                                                  Decimal(2)])
+        self.assertEqual(self.get_open_orders(), original_orders)
+
+    def test_unprotected_position(self):
+        self.client.failing_creates = [2, 4]
+
+        with self.assertRaisesRegex(Exception, 'Position XUSDT is without stop loss for quantity 2'):
+            self.api.replace_stop_loss('XUSDT', Decimal(10))
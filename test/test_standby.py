@@ -0,0 +1,99 @@
+import json
+import os
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List
+from unittest import TestCase
+
+from automation.logger import PaperLogger
+from automation.standby import Journal, Lease, StandbyGate
+
+
+class TestStandby(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.lease_file = os.path.join(self.directory.name, 'active.lock')
+        self.journal_file = os.path.join(self.directory.name, 'journal.log')
+        self.log_file = os.path.join(self.directory.name, 'log.jsonl')
+        self.logger = PaperLogger(self.log_file)  # errors are not sent by email
+        self.calls: List[str] = []
+
+    def tearDown(self):
+        self.logger.close()
+        self.directory.cleanup()
+
+    def get_events(self) -> List[Dict[str, Any]]:
+        self.logger.close()
+
+        with open(self.log_file) as h:
+            return [json.loads(line) for line in h]
+
+    def create_gate(self, lease: Lease, name: str) -> StandbyGate:
+        return StandbyGate(lease, Journal(self.journal_file), lambda: self.calls.append(name),
+                           lambda: self.calls.append(f'{name} stopped'), 30, self.logger)
+
+    def test_lease(self):
+        active, standby = Lease(self.lease_file), Lease(self.lease_file)
+        self.assertTrue(active.try_acquire())
+        self.assertFalse(standby.try_acquire())
+        self.assertLess(standby.get_heartbeat_age(), 1)
+        active.release()  # same as exit of active process
+        self.assertTrue(standby.try_acquire())
+        self.assertFalse(active.try_acquire())
+        standby.release()
+
+    def test_journal(self):
+        first, second = Journal(self.journal_file), Journal(self.journal_file)
+        self.assertTrue(first.claim('message:1'))
+        self.assertFalse(second.claim('message:1'))
+        self.assertTrue(second.claim('message:2'))
+        self.assertFalse(first.claim('message:2'))
+
+        first._MAX_KEYS, first._KEPT_KEYS = 3, 2
+        self.assertTrue(first.claim('message:3'))
+        self.assertTrue(first.claim('message:4'))  # compacted
+        self.assertFalse(second.claim('message:4'))
+        self.assertTrue(second.claim('message:5'))
+        self.assertFalse(first.claim('message:5'))
+
+    def test_takeover(self):
+        active_lease = Lease(self.lease_file)
+        active_lease.try_acquire()
+        active = self.create_gate(active_lease, 'active')
+        standby = self.create_gate(Lease(self.lease_file), 'standby')
+
+        for gate in (active, standby):
+            gate.execute_once('message:1', lambda: self.calls.append('message:1'))  # received by both
+
+        standby.poll(5)
+        self.assertFalse(standby.active)
+        standby.execute_once('message:2', lambda: self.calls.append('message:2'))  # active died before receiving it
+        standby.execute_once('message:3', lambda: 1 / 0)
+        active_lease.release()
+        standby.poll(5)
+        self.assertTrue(standby.active)
+        standby.execute_once('message:4', lambda: self.calls.append('message:4'))
+        self.assertEqual(self.calls, ['message:1', 'standby', 'message:2', 'message:4'])
+
+        events = self.get_events()
+        self.assertEqual([event['key'] for event in events if event['event'] == 'already_executed'], ['message:1'])
+        self.assertEqual([event['buffered'] for event in events if event['event'] == 'lease_acquired'], [3])
+        self.assertIn('ZeroDivisionError', [event['body'] for event in events if event.get('subject') == 'ERROR'][0])
+
+    def test_stale_takeover(self):
+        active_lease, standby_lease = Lease(self.lease_file), Lease(self.lease_file)
+        active, standby = self.create_gate(active_lease, 'active'), self.create_gate(standby_lease, 'standby')
+        active.poll(5)
+        standby.poll(5)
+        self.assertEqual(self.calls, ['active'])
+
+        standby.poll(-1)  # active instance is hung
+        self.assertTrue(standby.active)
+        self.assertFalse(standby_lease._locked)  # lock is still held by hung one
+        active.execute_once('message:1', lambda: self.calls.append('message:1'))  # fenced after it resumes
+        self.assertFalse(active.active)
+        standby.execute_once('message:1', lambda: self.calls.append('message:1'))
+        standby.poll(5)
+        self.assertTrue(standby_lease._locked)
+        self.assertEqual(self.calls, ['active', 'standby', 'active stopped', 'message:1'])
+        self.assertIn('lease_lost', [event['event'] for event in self.get_events()])
+        standby_lease.release()
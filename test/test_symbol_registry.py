@@ -0,0 +1,45 @@
+from decimal import Decimal
+from unittest import TestCase
+
+from automation.api.api import ExchangeSymbol, SymbolInfo
+from automation.parser.buy_message_parser import BuyMessageParser
+from automation.parser.parser import Parser
+from automation.symbol_registry import SymbolRegistry
+
+
+class TestSymbolRegistry(TestCase):
+    def setUp(self):
+        info = SymbolInfo(2, 4, Decimal(10))
+        self.registry = SymbolRegistry()
+        self.registry.update(
+            [ExchangeSymbol('OCEANUSDT', 'OCEAN', 'USDT', info), ExchangeSymbol('BTCUSDT', 'BTC', 'USDT', info),
+             ExchangeSymbol('WBTCBTC', 'WBTC', 'BTC', info), ExchangeSymbol('ETHBNB', 'ETH', 'BNB', info)],
+            [ExchangeSymbol('BTCUSDT', 'BTC', 'USDT', info)],
+        )
+
+    def tearDown(self):
+        Parser.symbol_registry = None
+
+    def test_lookup(self):
+        self.assertEqual(self.registry.get_quote('WBTCBTC'), 'BTC')
+        self.assertEqual(self.registry.get_quote('BTCUSDT'), 'USDT')
+        self.assertTrue(self.registry.is_futures('BTCUSDT'))
+        self.assertFalse(self.registry.is_futures('OCEANUSDT'))
+        self.assertEqual(self.registry.get_futures_symbols('USDT'), ['BTCUSDT'])
+
+        with self.assertRaises(Exception):
+            self.registry.get_quote('XUSDT')
+
+    def test_find_symbols(self):
+        self.assertEqual(self.registry.find_symbols('ocean/usdt vstup:market'), ['OCEANUSDT'])
+        self.assertEqual(self.registry.find_symbols('(ocean/usd)'), ['OCEANUSDT'])
+        self.assertEqual(self.registry.find_symbols('wbtc/btc a btc/usdt'), ['WBTCBTC', 'BTCUSDT'])
+        self.assertEqual(self.registry.find_symbols('xocean/usdt ocean/usdc eth/bnb'), [])
+
+    def test_parser(self):
+        content = 'OCEAN/USDT Vstup: market 1. target: 1.16 Stoploss: 0.85'
+        Parser.symbol_registry = self.registry
+        self.assertEqual(BuyMessageParser.parse(content, None).symbol, 'OCEANUSDT')
+
+        with self.assertRaises(AssertionError):
+            BuyMessageParser.parse(content.replace('OCEAN', 'NOTLISTED'), None)
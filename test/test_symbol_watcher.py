@@ -0,0 +1,93 @@
+import asyncio
+import itertools
+import json
+import os
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List
+from unittest import TestCase
+
+from automation.symbol_watcher import SymbolWatcher
+
+
+class TestSymbolWatcher(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, 'symbols.json')
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.sockets: Dict[str, List[str]] = {}
+        self.callback: Any = None
+        self.counter = itertools.count()
+        self.watcher = self.create_watcher()
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        self.directory.cleanup()
+
+    def create_watcher(self) -> SymbolWatcher:
+        def start_socket(streams, callback):
+            key = str(next(self.counter))
+            self.sockets[key] = streams
+            self.callback = callback
+            return key
+
+        return SymbolWatcher(self.file_path, start_socket, self.sockets.pop)  # type: ignore
+
+    def wait(self, seconds: float) -> None:
+        self.loop.run_until_complete(asyncio.sleep(seconds))
+
+    def test_subscriptions(self):
+        received = []
+        self.watcher.add_symbol('XUSDT')
+        key = self.watcher.start_depth_socket('XUSDT', received.append)
+        y_key = self.watcher.start_depth_socket('YUSDT', received.append)
+        self.wait(0.2)
+        # streams subscribed at once share one socket
+        self.assertEqual(list(self.sockets.values()), [['xusdt@depth', 'xusdt@ticker', 'yusdt@depth']])
+
+        self.callback(dict(stream='xusdt@ticker', data=dict(c='1.50')))
+        self.callback(dict(stream='xusdt@depth', data=dict(u=1)))
+        self.assertEqual(self.watcher.get_price('XUSDT'), Decimal('1.5'))
+        self.assertEqual(received, [dict(u=1)])
+
+        self.watcher.stop_socket(key)
+        self.watcher.remove('XUSDT')
+        z_key = self.watcher.start_depth_socket('ZUSDT', received.append)
+        self.wait(0.2)
+        # socket with removed streams is restarted without them
+        self.assertEqual(self.sockets, {'1': ['yusdt@depth', 'zusdt@depth']})
+        self.assertIsNone(self.watcher.get_price('XUSDT'))
+        self.callback(dict(stream='xusdt@depth', data=dict(u=2)))
+        self.assertEqual(received, [dict(u=1)])
+
+        # running socket is kept, only added stream gets new socket
+        self.watcher.start_depth_socket('WUSDT', received.append)
+        self.wait(0.2)
+        self.assertEqual(self.sockets, {'1': ['yusdt@depth', 'zusdt@depth'], '2': ['wusdt@depth']})
+
+        self.watcher.stop_socket(y_key)
+        self.watcher.stop_socket(z_key)
+        self.wait(0.2)
+        self.assertEqual(self.sockets, {'2': ['wusdt@depth']})
+
+    def test_socket_count_is_bounded(self):
+        self.watcher._MAX_SOCKETS = 2
+
+        for symbol in ('XUSDT', 'YUSDT', 'ZUSDT'):
+            self.watcher.start_depth_socket(symbol, lambda msg: None)
+            self.wait(0.2)
+
+        self.assertEqual(list(self.sockets.values()), [['xusdt@depth', 'yusdt@depth', 'zusdt@depth']])
+
+    def test_batched_persistence(self):
+        self.watcher.add_symbol('XUSDT')
+        self.watcher.add_symbol('YUSDT')
+        self.assertFalse(os.path.exists(self.file_path))
+        self.watcher.flush()
+
+        with open(self.file_path) as h:
+            self.assertEqual(json.load(h), ['XUSDT', 'YUSDT'])
+
+        self.assertEqual(self.create_watcher().symbols, {'XUSDT', 'YUSDT'})